@@ -40,11 +40,19 @@ LOGGING = {
         },
     },
     'handlers': {
+        # Records are queued in the request and written in batches by a background thread
         'file': {
             'level': 'INFO',
-            'class': 'logging.FileHandler',
+            'class': 'twitter.log_handlers.AsyncFileHandler',
             'filename': os.path.join(BASE_DIR, 'twitter/twitter_logs.log'),
             'formatter': 'json',
+            'queue_size': int(os.environ.get('TWITTER_LOGS_QUEUE_SIZE', 10000)),
+            'batch_size': int(os.environ.get('TWITTER_LOGS_BATCH_SIZE', 500)),
+            'flush_interval': float(os.environ.get('TWITTER_LOGS_FLUSH_INTERVAL', 0.5)),
+            # block, sync or drop
+            'overflow': os.environ.get('TWITTER_LOGS_OVERFLOW', 'block'),
+            # Every gunicorn worker appends to a twitter_logs.<n>.log no other running worker writes to
+            'per_process': os.environ.get('TWITTER_LOGS_PER_PROCESS', '') == 'True',
         },
     },
     'loggers': {
@@ -76,12 +84,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so the time and queries of every other middleware are counted
+    'twitter.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Needs the user, requests without X-Profile or ?profile= pass straight through
+    'twitter.middleware.ProfileMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -129,6 +141,52 @@ DATABASES = {
 }
 
 
+# Caches
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+
+# Timelines, sessions and users are cached on disk so every worker sees the same invalidations
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'auth': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('TWITTER_AUTH_CACHE', os.path.join(BASE_DIR, 'twitter', 'auth_cache')),
+        'TIMEOUT': 3600,
+        # Every set lists the whole directory to see if it is full, keep it small
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        },
+    },
+    'timeline': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('TWITTER_TIMELINE_CACHE', os.path.join(BASE_DIR, 'twitter', 'timeline_cache')),
+        'TIMEOUT': 86400,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+}
+
+
+# Per view histograms of every worker, written at most every TWITTER_METRICS_FLUSH_INTERVAL seconds
+TWITTER_METRICS_DIR = os.environ.get('TWITTER_METRICS_DIR', os.path.join(BASE_DIR, 'twitter', 'metrics'))
+TWITTER_METRICS_FLUSH_INTERVAL = float(os.environ.get('TWITTER_METRICS_FLUSH_INTERVAL', 5))
+
+
+# Profiles asked for by superadmins, only the newest TWITTER_PROFILES_KEEP are kept
+TWITTER_PROFILES_DIR = os.environ.get('TWITTER_PROFILES_DIR', os.path.join(BASE_DIR, 'twitter', 'profiles'))
+TWITTER_PROFILES_KEEP = int(os.environ.get('TWITTER_PROFILES_KEEP', 50))
+
+
+# Sessions are read from the auth cache and written through to the database
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_CACHE_ALIAS = 'auth'
+
+# The user of a session is read from the auth cache too
+AUTHENTICATION_BACKENDS = ['twitter.auth_backends.CachedModelBackend']
+
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
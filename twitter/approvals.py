@@ -0,0 +1,433 @@
+import json
+import logging
+from datetime import timedelta
+
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import User, Tweet, UpdateTweet, DeleteTweet, CreateTweet, UpdateUser
+from .serializers import UPDATE_TWEET_FIELDS, DELETE_TWEET_FIELDS, CREATE_TWEET_FIELDS, UPDATE_USER_FIELDS, serialize_values
+from .auth_backends import invalidate_users
+from .timelines import invalidate_timelines
+
+#Initializing logger
+logger = logging.getLogger('twitter_logs')
+
+#Failed transactions are reported to the default handlers, not the audit log
+errors = logging.getLogger(__name__)
+
+#Rows written per query by the bulk operations
+BULK_BATCH = 500
+
+#How long a claimed request is kept away from other superadmins
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+#Most requests claimed at once
+CLAIM_MAX = 100
+
+#Most requests answered by one response by filter, the rest wait for the next call
+FILTER_MAX = 2000
+
+#Responses by filter list each request only when at most this many were answered
+FILTER_LISTED = 20
+
+#Rounds of the claim fallback for databases without SKIP LOCKED
+CLAIM_ATTEMPTS = 5
+
+
+#Id of a request as sent by the client, None if it cannot be one
+def request_id(value):
+	try:
+		return int(value)
+	except (TypeError, ValueError):
+		return None
+
+
+#Requests referenced by the responses, loaded and locked with a single query
+def load_requests(queryset, responses):
+	ids = {request_id(response.get('request_id')) for response in responses}
+	ids.discard(None)
+	if connection.features.has_select_for_update_of:
+		queryset = queryset.select_for_update(of=('self',))
+	else:
+		queryset = queryset.select_for_update()
+	return queryset.in_bulk(ids)
+
+
+#Requests nobody holds a live claim on
+def unclaimed(now):
+	return Q(claimed_at__isnull=True) | Q(claimed_at__lt=now-CLAIM_TIMEOUT)
+
+
+#Why a superadmin cannot respond to a request, None if they can
+def response_error(req, u, now):
+	if req.responded:
+		return "Request already responded."
+	if req.claimed_by_id not in (None, u.id) and req.claimed_at is not None and req.claimed_at >= now-CLAIM_TIMEOUT:
+		return "Request claimed by another superadmin."
+	return None
+
+
+#Error of a body which is not a list of responses, None if it is one
+def responses_error(responses):
+	if not isinstance(responses, list) or not all(isinstance(response, dict) for response in responses):
+		return "Body must be a list of responses."
+	return None
+
+
+#Names longer than the user table accepts would fail every response of the batch
+def name_error(upuser):
+	for field in ('first_name', 'last_name'):
+		max_length = User._meta.get_field(field).max_length
+		if len(getattr(upuser, 'new_'+field)) > max_length:
+			return "new_{} must be at most {} characters.".format(field, max_length)
+	return None
+
+
+def saved(response):
+	return {"request_id": response.get('request_id'), "message": "Response saved."}
+
+
+#Responses which were saved turn into failures when the transaction is rolled back
+def failed(results):
+	return [{"request_id": result['request_id'], "error": "Response failed."} if 'message' in result else result for result in results]
+
+
+#Write the audit logs of the responses once they are committed
+def write_logs(logs):
+	for message, extra in logs:
+		logger.info(message, extra=extra)
+
+
+#Superadmin responding to requests related to user details
+def respond_user_updates(u, responses):
+	results = []
+	logs = []
+	try:
+		now = timezone.now()
+		with transaction.atomic():
+			requests = load_requests(UpdateUser.objects.select_related('admin', 'user'), responses)
+			answered = []
+			users = {}
+			granted = set()
+			for response in responses:
+				upuser = requests.get(request_id(response.get('request_id')))
+
+				#Check if request_id is valid
+				if upuser is None:
+					results.append({"request_id": response.get('request_id'), "error": "Id not present."})
+					continue
+
+				#Each request is answered once, and only by the superadmin holding its claim
+				error = response_error(upuser, u, now)
+				if error is not None:
+					results.append({"request_id": response.get('request_id'), "error": error})
+					continue
+
+				#The request stays pending when its names do not fit
+				if response.get('action_granted', False):
+					error = name_error(upuser)
+					if error is not None:
+						results.append({"request_id": response.get('request_id'), "error": error})
+						continue
+
+				#Several requests for the same user update a single instance
+				user = users.setdefault(upuser.user_id, upuser.user)
+				upuser.responded = True
+				answered.append(upuser)
+				if not response.get('action_granted', False):
+					logs.append(('Superadmin:{} rejected request to update User:{} details from Admin:{}'.format(u.username, user.username, upuser.admin.username), {'source': u.username, 'log_type': 'audit', 'object': 'user:{}'.format(upuser.admin.username)}))
+				else:
+					#Assigning changes
+					upuser.action_granted = True
+					granted.add(user.id)
+					if len(upuser.new_first_name):
+						user.first_name = upuser.new_first_name
+					if len(upuser.new_last_name):
+						user.last_name = upuser.new_last_name
+					if len(upuser.new_bio):
+						user.bio = upuser.new_bio
+					logs.append(('Superadmin:{} approved request to update User:{} details from Admin:{}'.format(u.username, user.username, upuser.admin.username), {'source': u.username, 'log_type': 'audit', 'object': 'user:{}'.format(upuser.admin.username)}))
+				results.append(saved(response))
+
+			User.objects.bulk_update([users[user_id] for user_id in granted], ['first_name', 'last_name', 'bio'], batch_size=BULK_BATCH)
+			invalidate_users(granted)
+			UpdateUser.objects.bulk_update(answered, ['responded', 'action_granted'], batch_size=BULK_BATCH)
+	except DatabaseError:
+		errors.exception('Responses of Superadmin:%s failed', u.username)
+		return failed(results)
+
+	write_logs(logs)
+	return results
+
+
+#Superadmin responding to requests related to tweets update
+def respond_tweet_updates(u, responses):
+	results = []
+	logs = []
+	try:
+		now = timezone.now()
+		with transaction.atomic():
+			requests = load_requests(UpdateTweet.objects.select_related('admin', 'tweet'), responses)
+			answered = []
+			tweets = {}
+			updated = {}
+			for response in responses:
+				update_tweet = requests.get(request_id(response.get('request_id')))
+
+				#Check if request_id is valid or not
+				if update_tweet is None:
+					results.append({"request_id": response.get('request_id'), "error": "Id not present."})
+					continue
+
+				#Each request is answered once, and only by the superadmin holding its claim
+				error = response_error(update_tweet, u, now)
+				if error is not None:
+					results.append({"request_id": response.get('request_id'), "error": error})
+					continue
+
+				update_tweet.responded = True
+				answered.append(update_tweet)
+				tweet = tweets.setdefault(update_tweet.tweet_id, update_tweet.tweet)
+
+				#if action granted then update tweet
+				if response.get('action_granted', False):
+					tweet.tweet = update_tweet.new_tweet
+					update_tweet.action_granted = True
+					updated[tweet.id] = tweet
+					logs.append(('Superadmin:{} approved request to update Tweet:{} from Admin:{}'.format(u.username, tweet.id, update_tweet.admin.username), {'source': u.username, 'log_type': 'audit', 'object': 'user:{}'.format(update_tweet.admin.username)}))
+				else:
+					logs.append(('Superadmin:{} rejected request to update Tweet:{} from Admin:{}'.format(u.username, tweet.id, update_tweet.admin.username), {'source': u.username, 'log_type': 'audit', 'object': 'user:{}'.format(update_tweet.admin.username)}))
+				results.append(saved(response))
+
+			UpdateTweet.objects.bulk_update(answered, ['responded', 'action_granted'], batch_size=BULK_BATCH)
+			Tweet.objects.bulk_update(list(updated.values()), ['tweet'], batch_size=BULK_BATCH)
+			invalidate_timelines([tweet.user_id for tweet in updated.values()])
+	except DatabaseError:
+		errors.exception('Responses of Superadmin:%s failed', u.username)
+		return failed(results)
+
+	write_logs(logs)
+	return results
+
+
+#Superadmin responding to requests related to tweets delete
+def respond_tweet_deletes(u, responses):
+	results = []
+	logs = []
+	try:
+		now = timezone.now()
+		with transaction.atomic():
+			requests = load_requests(DeleteTweet.objects.select_related('admin', 'tweet'), responses)
+			answered = []
+			deleted = set()
+			owners = set()
+			for response in responses:
+				delete_tweet = requests.get(request_id(response.get('request_id')))
+
+				#Check if request_id is valid
+				if delete_tweet is None:
+					results.append({"request_id": response.get('request_id'), "error": "Id not present"})
+					continue
+
+				#Each request is answered once, and only by the superadmin holding its claim
+				error = response_error(delete_tweet, u, now)
+				if error is not None:
+					results.append({"request_id": response.get('request_id'), "error": error})
+					continue
+
+				delete_tweet.responded = True
+				answered.append(delete_tweet)
+				admin = delete_tweet.admin
+				if response.get('action_granted', False):
+					delete_tweet.action_granted = True
+					deleted.add(delete_tweet.tweet_id)
+					owners.add(delete_tweet.tweet.user_id)
+					logs.append(('Superadmin:{} approved request to delete Tweet:{} from Admin:{}'.format(u.username, delete_tweet.tweet_id, admin.username), {'source': u.username, 'log_type': 'audit', 'object': 'user:{}'.format(admin.username)}))
+				else:
+					logs.append(('Superadmin:{} rejected request to delete Tweet:{} from Admin:{}'.format(u.username, delete_tweet.tweet_id, admin.username), {'source': u.username, 'log_type': 'audit', 'object': 'user:{}'.format(admin.username)}))
+				results.append(saved(response))
+
+			#Deleting the tweets also removes the requests made for them
+			DeleteTweet.objects.bulk_update(answered, ['responded', 'action_granted'], batch_size=BULK_BATCH)
+			Tweet.objects.filter(id__in=deleted).delete()
+			invalidate_timelines(owners)
+	except DatabaseError:
+		errors.exception('Responses of Superadmin:%s failed', u.username)
+		return failed(results)
+
+	write_logs(logs)
+	return results
+
+
+#Superadmin responding to requests related to tweets create
+def respond_tweet_creates(u, responses):
+	results = []
+	logs = []
+	try:
+		now = timezone.now()
+		with transaction.atomic():
+			requests = load_requests(CreateTweet.objects.select_related('admin'), responses)
+			answered = []
+			users = User.objects.in_bulk({r.userid for r in requests.values()})
+			decisions = []
+			for response in responses:
+				create_tweet = requests.get(request_id(response.get('request_id')))
+
+				#Check if request_id is valid
+				if create_tweet is None:
+					results.append({"request_id": response.get('request_id'), "error": "Id not present."})
+					continue
+
+				#Each request is answered once, and only by the superadmin holding its claim
+				error = response_error(create_tweet, u, now)
+				if error is not None:
+					results.append({"request_id": response.get('request_id'), "error": error})
+					continue
+
+				#Posting new tweet if granted, the request stays pending if its user is gone
+				granted = bool(response.get('action_granted', False))
+				tweet = None
+				if granted:
+					user = users.get(create_tweet.userid)
+					if user is None:
+						results.append({"request_id": response.get('request_id'), "error": "Response failed."})
+						continue
+					tweet = Tweet(user=user, tweet=create_tweet.tweet)
+				decisions.append((create_tweet, tweet))
+				create_tweet.responded = True
+				answered.append(create_tweet)
+				create_tweet.action_granted = granted
+				results.append(saved(response))
+
+			#Ids of new tweets are needed for the logs, backends not returning them insert one by one
+			tweets = [tweet for _, tweet in decisions if tweet is not None]
+			if connection.features.can_return_ids_from_bulk_insert:
+				Tweet.objects.bulk_create(tweets, batch_size=BULK_BATCH)
+			else:
+				for tweet in tweets:
+					tweet.save()
+			invalidate_timelines([tweet.user_id for tweet in tweets])
+			for create_tweet, tweet in decisions:
+				admin = create_tweet.admin
+				if tweet is not None:
+					logs.append(('Superadmin:{} approved request to create new Tweet:{} from Admin:{}'.format(u.username, tweet.id, admin.username), {'source': u.username, 'log_type': 'audit', 'object': 'user:{}'.format(admin.username)}))
+				else:
+					logs.append(('Superadmin:{} rejected request to create new Tweet from Admin:{}'.format(u.username, admin.username), {'source': u.username, 'log_type': 'audit', 'object': 'user:{}'.format(admin.username)}))
+			CreateTweet.objects.bulk_update(answered, ['responded', 'action_granted'], batch_size=BULK_BATCH)
+	except DatabaseError:
+		errors.exception('Responses of Superadmin:%s failed', u.username)
+		return failed(results)
+
+	write_logs(logs)
+	return results
+
+
+#Every type of request with the lookup of the user it is made for, how it is shown and its responding function
+REQUEST_TYPES = {
+	'update_user': (UpdateUser, 'user__username', (UPDATE_USER_FIELDS, 'update'), respond_user_updates),
+	'update_tweet': (UpdateTweet, 'tweet__user__username', (UPDATE_TWEET_FIELDS, 'update'), respond_tweet_updates),
+	'delete_tweet': (DeleteTweet, 'tweet__user__username', (DELETE_TWEET_FIELDS, 'delete'), respond_tweet_deletes),
+	'create_tweet': (CreateTweet, None, (CREATE_TWEET_FIELDS, 'create'), respond_tweet_creates),
+}
+
+#Keys allowed in the filter of a response
+FILTER_KEYS = ('admin', 'user', 'before', 'after')
+
+
+#Pending requests of a type matching a filter, ValueError if the filter is not valid
+def filter_requests(request_type, filters):
+	if request_type not in REQUEST_TYPES:
+		raise ValueError('type must be one of {}.'.format(', '.join(REQUEST_TYPES)))
+	if not isinstance(filters, dict) or not filters:
+		raise ValueError('Provide atleast one filter.')
+	for key in filters:
+		if key not in FILTER_KEYS:
+			raise ValueError('Unknown filter {}.'.format(key))
+
+	model, user_lookup, _, _ = REQUEST_TYPES[request_type]
+	requests = model.objects.filter(responded=False)
+	if 'admin' in filters:
+		requests = requests.filter(admin__username=filters['admin'])
+	if 'user' in filters:
+		if user_lookup is None:
+			requests = requests.filter(userid__in=User.objects.filter(username=filters['user']).values('id'))
+		else:
+			requests = requests.filter(**{user_lookup: filters['user']})
+
+	#Times are ISO 8601, in UTC unless they carry an offset
+	for key, lookup in (('before', 'timestamp__lt'), ('after', 'timestamp__gt')):
+		if key in filters:
+			try:
+				timestamp = parse_datetime(filters[key])
+			except (TypeError, ValueError):
+				timestamp = None
+			if timestamp is None:
+				raise ValueError('{} must be a date and time like 2020-12-20 14:18.'.format(key))
+			if timezone.is_naive(timestamp):
+				timestamp = timezone.make_aware(timestamp, timezone.utc)
+			requests = requests.filter(**{lookup: timestamp})
+	return requests
+
+
+#Superadmin responding to the oldest pending requests of a type matching a filter
+def respond_by_filter(u, request_type, granted, filters):
+	requests = filter_requests(request_type, filters)
+
+	#Requests claimed by other superadmins are left to them
+	requests = requests.filter(unclaimed(timezone.now()) | Q(claimed_by=u))
+	ids = list(requests.order_by('timestamp').values_list('id', flat=True)[:FILTER_MAX])
+
+	#The matching requests go through the same set based path as explicit responses, a batch per transaction
+	respond = REQUEST_TYPES[request_type][3]
+	results = []
+	for start in range(0, len(ids), BULK_BATCH):
+		results += respond(u, [{"request_id": i, "action_granted": granted} for i in ids[start:start + BULK_BATCH]])
+	failed = [result for result in results if 'error' in result]
+	count = len(results) - len(failed)
+
+	#log
+	logger.info('Superadmin:{} {} {} {} requests matching filter {}'.format(u.username, 'approved' if granted else 'rejected', count, request_type, json.dumps(filters, sort_keys=True)), extra={'source': u.username, 'log_type': 'audit'})
+
+	summary = {"count": count, "failed": len(failed), "remaining": requests.count()}
+	if len(results) <= FILTER_LISTED:
+		summary["responses"] = results
+	else:
+		summary["errors"] = failed[:FILTER_LISTED]
+	return summary
+
+
+#Superadmin claiming the oldest pending requests of a type nobody else is working on
+def claim_requests(u, request_type, count):
+	if request_type not in REQUEST_TYPES:
+		raise ValueError('type must be one of {}.'.format(', '.join(REQUEST_TYPES)))
+	if not isinstance(count, int) or isinstance(count, bool) or not 0 < count <= CLAIM_MAX:
+		raise ValueError('count must be between 1 and {}.'.format(CLAIM_MAX))
+
+	model, _, (fields, action), _ = REQUEST_TYPES[request_type]
+	now = timezone.now()
+	pending = model.objects.filter(responded=False).filter(unclaimed(now)).order_by('timestamp')
+	if connection.features.has_select_for_update_skip_locked:
+		#Rows being claimed by another transaction are skipped instead of waited for
+		with transaction.atomic():
+			ids = list(pending.select_for_update(skip_locked=True).values_list('id', flat=True)[:count])
+			model.objects.filter(id__in=ids).update(claimed_by=u, claimed_at=now)
+	else:
+		#Without row locks only the rows still unclaimed when the update runs are taken
+		ids = []
+		for _ in range(CLAIM_ATTEMPTS):
+			candidates = list(pending.exclude(id__in=ids).values_list('id', flat=True)[:count-len(ids)])
+			if not candidates:
+				break
+			model.objects.filter(id__in=candidates, responded=False).filter(unclaimed(now)).update(claimed_by=u, claimed_at=now)
+			ids += model.objects.filter(id__in=candidates, claimed_by=u, claimed_at=now).values_list('id', flat=True)
+			if len(ids) >= count:
+				break
+
+	requests = serialize_values(model.objects.filter(id__in=ids).order_by('timestamp'), fields, action=action)
+
+	#log
+	logger.info('Superadmin:{} claimed {} {} requests'.format(u.username, len(requests), request_type), extra={'source': u.username, 'log_type': 'audit'})
+	return requests, now+CLAIM_TIMEOUT
@@ -1,5 +1,12 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
 
 
 class TwitterConfig(AppConfig):
     name = 'twitter'
+
+    def ready(self):
+        from .auth_backends import user_changed
+        post_save.connect(user_changed, sender=settings.AUTH_USER_MODEL, dispatch_uid='twitter_user_saved')
+        post_delete.connect(user_changed, sender=settings.AUTH_USER_MODEL, dispatch_uid='twitter_user_deleted')
@@ -0,0 +1,41 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+from django.db import transaction
+
+UserModel = get_user_model()
+
+#Cache alias holding sessions and users, see CACHES in settings
+AUTH_CACHE = 'auth'
+
+
+def user_key(user_id):
+	return 'user:{}'.format(user_id)
+
+
+#Drop cached users whose row changed
+#Dropped again after commit, a request reading the row before then caches the old user
+def invalidate_users(user_ids):
+	keys = [user_key(user_id) for user_id in set(user_ids)]
+	if keys:
+		caches[AUTH_CACHE].delete_many(keys)
+		transaction.on_commit(lambda: caches[AUTH_CACHE].delete_many(keys))
+
+
+#Model backend reading the user of a session from the cache instead of the database
+class CachedModelBackend(ModelBackend):
+
+	def get_user(self, user_id):
+		cache = caches[AUTH_CACHE]
+		user = cache.get(user_key(user_id))
+		if user is None:
+			try:
+				user = UserModel._default_manager.get(pk=user_id)
+			except UserModel.DoesNotExist:
+				return None
+			cache.set(user_key(user_id), user)
+		return user if self.user_can_authenticate(user) else None
+
+#Users saved or deleted one by one are dropped from the cache, bulk writes call invalidate_users
+def user_changed(sender, instance, **kwargs):
+	invalidate_users([instance.pk])
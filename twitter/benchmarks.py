@@ -0,0 +1,222 @@
+import json
+import logging
+import math
+import os
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import views
+from .log_handlers import AsyncFileHandler
+from .models import User, Tweet, UpdateTweet, DeleteTweet, CreateTweet, UpdateUser
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+#Results are written here unless another file is given
+RESULTS_DIR = os.path.join(APP_DIR, 'benchmarks')
+
+#Requests sent to an endpoint before timing it
+WARMUP = 2
+
+#Pending requests answered by one respond request
+RESPOND_BATCH = 50
+
+#Host in ALLOWED_HOSTS, the benchmark runs outside of the test runner
+HOST = '127.0.0.1'
+
+
+def percentile(values, q):
+	ordered = sorted(values)
+	return ordered[max(math.ceil(q*len(ordered))-1, 0)]
+
+
+#Logged in clients of a normal user with the most tweets, an admin and a superadmin
+def clients(prefix):
+	users = User.objects.filter(username__startswith=prefix)
+	normal = users.filter(is_staff=False).annotate(count=Count('tweets')).order_by('-count').first()
+	admin = users.filter(is_staff=True, is_superuser=False).first()
+	superadmin = users.filter(is_superuser=True).first()
+	if normal is None or admin is None or superadmin is None:
+		raise ValueError('Generate a dataset with users, admins and superadmins first.')
+
+	logged_in = {}
+	for role, user in (('user', normal), ('admin', admin), ('superadmin', superadmin)):
+		client = Client(SERVER_NAME=HOST)
+		client.force_login(user)
+		logged_in[role] = client
+	return logged_in, normal
+
+
+#Approves or rejects the oldest pending requests of a model, the responses are rolled back by send
+def respond_body(model, granted):
+	ids = model.objects.filter(responded=False).order_by('timestamp').values_list('id', flat=True)[:RESPOND_BATCH]
+	return json.dumps([{"request_id": request_id, "action_granted": granted} for request_id in ids])
+
+
+#Respond endpoints of every request type, approving and rejecting
+def respond_endpoints():
+	urls = (
+		('respond_users', UpdateUser),
+		('respond_tweets_update', UpdateTweet),
+		('respond_tweets_delete', DeleteTweet),
+		('respond_tweets_create', CreateTweet),
+	)
+	return [
+		('{}_{}'.format(url, action), 'superadmin', lambda url=url, model=model, granted=granted: ('put', reverse(url), respond_body(model, granted)), True)
+		for url, model in urls
+		for action, granted in (('approve', True), ('reject', False))
+	]
+
+
+#Endpoints timed, with the role sending them, a function giving method, url and body of one request
+#and whether its changes are rolled back so every run sees the same data
+def endpoints(normal):
+	user_ids = list(User.objects.filter(is_staff=False).values_list('id', flat=True)[:100])
+	return [
+		('stweets', 'user', lambda: ('get', reverse('stweets'), None), False),
+		('usertweets', 'admin', lambda: ('get', reverse('usertweets', args=[normal.id]), None), False),
+		('alluserprofile', 'admin', lambda: ('get', reverse('alluserprofile'), None), False),
+		('alluserprofile_search', 'admin', lambda: ('get', reverse('alluserprofile') + '?q=ma', None), False),
+		('userprofiles', 'admin', lambda: ('post', reverse('userprofiles'), json.dumps({"user_ids": user_ids})), False),
+		('request_tweets', 'superadmin', lambda: ('get', reverse('request_tweets'), None), False),
+		('request_user', 'superadmin', lambda: ('get', reverse('request_user'), None), False),
+	] + respond_endpoints() + [
+		('logs', 'superadmin', lambda: ('get', reverse('logs') + '?limit=100', None), False),
+		('logs_query', 'superadmin', lambda: ('post', reverse('logs_query'), json.dumps({"query": {"log_type": "audit"}, "group_by": "source", "top": 10})), False),
+		#Counts of a generated log file must not reach the rollup tables superadmins read
+		('logs_rollups', 'superadmin', lambda: ('get', reverse('logs_rollups') + '?period=day', None), True),
+	]
+
+
+def send(client, method, url, body, rollback=False):
+	if rollback:
+		with transaction.atomic():
+			try:
+				return send(client, method, url, body)
+			finally:
+				transaction.set_rollback(True)
+	if body is None:
+		response = getattr(client, method)(url)
+	else:
+		response = getattr(client, method)(url, body, content_type='application/json')
+	#Read streamed bodies so they are part of the time
+	if response.streaming:
+		return sum(len(chunk) for chunk in response.streaming_content)
+	return len(response.content)
+
+
+#Latency percentiles, throughput, query count and peak memory of one endpoint
+def measure(client, build, requests, rollback=False):
+	for _ in range(WARMUP):
+		send(client, *build(), rollback=rollback)
+
+	seconds = []
+	queries = []
+	size = 0
+	for _ in range(requests):
+		request = build()
+		with CaptureQueriesContext(connection) as context:
+			started = time.perf_counter()
+			size = send(client, *request, rollback=rollback)
+			seconds.append(time.perf_counter()-started)
+		queries.append(len(context.captured_queries))
+
+	#Memory is traced in a separate request as tracing slows everything down
+	request = build()
+	tracemalloc.start()
+	try:
+		send(client, *request, rollback=rollback)
+		peak = tracemalloc.get_traced_memory()[1]
+	finally:
+		tracemalloc.stop()
+
+	return {
+		"requests": requests,
+		"throughput": requests/sum(seconds),
+		"p50": percentile(seconds, 0.5),
+		"p95": percentile(seconds, 0.95),
+		"p99": percentile(seconds, 0.99),
+		"max": max(seconds),
+		"queries": max(queries),
+		"peak_memory": peak,
+		"response_bytes": size,
+	}
+
+
+#Size of the dataset the numbers were measured on
+def dataset():
+	return {
+		"users": User.objects.count(),
+		"tweets": Tweet.objects.count(),
+		"pending_update_tweet": UpdateTweet.objects.filter(responded=False).count(),
+		"pending_delete_tweet": DeleteTweet.objects.filter(responded=False).count(),
+		"pending_create_tweet": CreateTweet.objects.filter(responded=False).count(),
+		"pending_update_user": UpdateUser.objects.filter(responded=False).count(),
+	}
+
+
+#Records written by the views during a run go to a file of its own, never to the live log file
+@contextmanager
+def benchmark_logs(path):
+	logger = logging.getLogger('twitter_logs')
+	live = logger.handlers
+	handler = AsyncFileHandler(path)
+	if live:
+		handler.setFormatter(live[0].formatter)
+	logger.handlers = [handler]
+	try:
+		yield
+	finally:
+		logger.handlers = live
+		handler.close()
+
+
+#Log endpoints read log_file instead of the live log file if it is given
+def run(prefix, requests, only=None, log_file=None):
+	logged_in, normal = clients(prefix)
+	results = {
+		"timestamp": datetime.now(timezone.utc).isoformat(),
+		"database": connection.vendor,
+		"dataset": dataset(),
+		"endpoints": {},
+	}
+	live = views.LOG_FILE
+	if log_file is not None:
+		views.LOG_FILE = log_file
+	try:
+		with tempfile.TemporaryDirectory() as directory, benchmark_logs(os.path.join(directory, 'benchmark_logs.log')):
+			for name, role, build, rollback in endpoints(normal):
+				if only and name not in only:
+					continue
+				results["endpoints"][name] = measure(logged_in[role], build, requests, rollback)
+	finally:
+		views.LOG_FILE = live
+	return results
+
+
+def save(results, path=None):
+	if path is None:
+		os.makedirs(RESULTS_DIR, exist_ok=True)
+		path = os.path.join(RESULTS_DIR, 'benchmark-{}.json'.format(datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')))
+	with open(path, 'w') as f:
+		json.dump(results, f, indent=2)
+	return path
+
+
+#Change of p95, throughput and queries of every endpoint from an earlier run, as ratios new/old
+def compare(old, new):
+	changes = {}
+	for name, result in new["endpoints"].items():
+		before = old["endpoints"].get(name)
+		if before is None:
+			continue
+		changes[name] = {key: result[key]/before[key] if before[key] else None for key in ("p95", "throughput", "queries", "peak_memory")}
+	return changes
@@ -0,0 +1,225 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from itertools import chain, count
+
+#Locks telling which worker writes which log file, without them every worker gets a file named by its pid
+try:
+	import fcntl
+except ImportError:
+	fcntl = None
+
+from .logstore import worker_numbers, worker_path
+from .metrics import add_log_time
+
+#What happens to a record when the queue is full
+#block: wait for the writer, sync: write it from the caller, drop: count it and report later
+OVERFLOW_POLICIES = ('block', 'sync', 'drop')
+
+
+#Number and open file of the first per process log file no running worker holds the lock of
+#Files of workers which exited are appended to by the next worker, so there are never more files than workers
+def lock_worker_file(path):
+	if fcntl is None:
+		return os.getpid(), None
+	tried = set()
+	for number in chain(worker_numbers(path), count()):
+		if number in tried:
+			continue
+		tried.add(number)
+		f = open(worker_path(path, number), 'a+b')
+		try:
+			fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+		except OSError:
+			f.close()
+			continue
+
+		#End the partial record of a worker which crashed while writing
+		if f.seek(0, os.SEEK_END) > 0:
+			f.seek(-1, os.SEEK_END)
+			if f.read(1) != b'\n':
+				f.write(b'\n')
+				f.flush()
+		return number, f
+
+
+#File handler which formats and writes records in batches from a background thread
+#With per_process every worker writes to a file no other running worker writes to, see lock_worker_file
+class AsyncFileHandler(logging.FileHandler):
+
+	def __init__(self, filename, mode='a', encoding=None, delay=True, queue_size=10000, batch_size=500, flush_interval=0.5, overflow='block', per_process=False):
+		if overflow not in OVERFLOW_POLICIES:
+			raise ValueError('overflow must be one of {}'.format(', '.join(OVERFLOW_POLICIES)))
+		super().__init__(filename, mode, encoding, delay)
+		self.queue_size = queue_size
+		self.batch_size = batch_size
+		self.flush_interval = flush_interval
+		self.overflow = overflow
+		self.per_process = per_process
+		self.path = self.baseFilename
+		self.dropped = 0
+		self.closed = False
+		self.pid = None
+		self.worker_file = None
+		self.queue = None
+		self.writer = None
+		self.start_lock = threading.Lock()
+
+		#Drain the queue on worker shutdown
+		atexit.register(self.close)
+
+	#Start the writer of this process, also after a fork
+	def start(self):
+		with self.start_lock:
+			if self.pid == os.getpid():
+				return
+
+			#A forked worker must not share the file of its parent
+			if self.per_process:
+				self.acquire()
+				try:
+					if self.stream is not None:
+						self.stream.close()
+						self.stream = None
+					self.unlock_worker_file()
+					number, self.worker_file = lock_worker_file(self.path)
+					self.baseFilename = worker_path(self.path, number)
+				finally:
+					self.release()
+			self.queue = queue.Queue(self.queue_size)
+			self.writer = threading.Thread(target=self.run, name='twitter-log-writer', daemon=True)
+			self.writer.start()
+			self.pid = os.getpid()
+
+	#Closing the copy inherited from a parent leaves the lock of the parent alone
+	def unlock_worker_file(self):
+		if self.worker_file is not None:
+			self.worker_file.close()
+			self.worker_file = None
+
+	def running(self):
+		return self.pid == os.getpid() and not self.closed and self.writer is not None and self.writer.is_alive()
+
+	#Records skip the handler lock, only the writer touches the file
+	def handle(self, record):
+		started = time.perf_counter()
+		rv = self.filter(record)
+		if rv:
+			self.emit(record)
+		add_log_time(time.perf_counter()-started)
+		return rv
+
+	def emit(self, record):
+		if self.closed:
+			self.write([record])
+			return
+		if self.pid != os.getpid():
+			self.start()
+
+		try:
+			self.queue.put_nowait(record)
+		except queue.Full:
+			if self.overflow == 'block':
+				self.queue.put(record)
+			elif self.overflow == 'sync':
+				self.write([record])
+			else:
+				with self.start_lock:
+					self.dropped += 1
+
+	#Format records and write them with a single write call
+	def write(self, records):
+		lines = []
+		for record in records:
+			try:
+				lines.append(self.format(record) + self.terminator)
+			except Exception:
+				self.handleError(record)
+		if not lines:
+			return
+
+		self.acquire()
+		try:
+			if self.stream is None:
+				self.stream = self._open()
+			self.stream.write(''.join(lines))
+			self.stream.flush()
+		except Exception:
+			self.handleError(records[0])
+		finally:
+			self.release()
+
+	#Record reporting how many records were dropped since the last batch
+	def dropped_record(self):
+		with self.start_lock:
+			dropped, self.dropped = self.dropped, 0
+		if not dropped:
+			return None
+		record = logging.makeLogRecord({
+			'name': 'twitter_logs',
+			'levelno': logging.WARNING,
+			'levelname': 'WARNING',
+			'msg': '{} log records dropped, log queue was full'.format(dropped),
+			'source': 'log_writer',
+			'log_type': 'audit',
+		})
+		return record
+
+	#Writer loop, a batch is written when full or flush_interval after its first record
+	def run(self):
+		while True:
+			batch = [self.queue.get()]
+			deadline = time.monotonic() + self.flush_interval
+			while len(batch) < self.batch_size and isinstance(batch[-1], logging.LogRecord):
+				try:
+					batch.append(self.queue.get(timeout=max(deadline-time.monotonic(), 0)))
+				except queue.Empty:
+					break
+
+			records = [item for item in batch if isinstance(item, logging.LogRecord)]
+			dropped = self.dropped_record()
+			if dropped is not None:
+				records.insert(0, dropped)
+			self.write(records)
+
+			#Wake up callers of flush
+			for item in batch:
+				if isinstance(item, threading.Event):
+					item.set()
+
+			#Stop marker, write whatever was queued after it and exit
+			if None in batch:
+				rest = []
+				while True:
+					try:
+						item = self.queue.get_nowait()
+					except queue.Empty:
+						break
+					if isinstance(item, logging.LogRecord):
+						rest.append(item)
+					elif isinstance(item, threading.Event):
+						item.set()
+				self.write(rest)
+				return
+
+	#Wait until everything queued so far is on disk
+	def flush(self):
+		started = time.perf_counter()
+		if self.running() and threading.current_thread() is not self.writer:
+			done = threading.Event()
+			self.queue.put(done)
+			done.wait()
+		else:
+			super().flush()
+		add_log_time(time.perf_counter()-started)
+
+	def close(self):
+		if self.running():
+			self.queue.put(None)
+			self.writer.join()
+		self.closed = True
+		super().close()
+		self.unlock_worker_file()
@@ -0,0 +1,723 @@
+import hashlib
+import heapq
+import json
+import mmap
+import os
+import pickle
+import re
+import struct
+import threading
+from array import array
+from collections import Counter
+from functools import lru_cache
+from bisect import bisect_left
+
+#Log file of the twitter_logs logger, see LOGGING in settings
+LOG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'twitter_logs.log')
+
+#Fields having an exact match index in every segment
+INDEXED_FIELDS = ('log_type', 'source', 'object')
+
+#Number of log records kept in one segment
+SEGMENT_RECORDS = 10000
+
+#Length of the asctime prefix used as time bucket, one bucket per minute
+BUCKET_LENGTH = len('2020-12-20 14:18')
+
+#Record numbers are stored as unsigned shorts, so a segment holds at most this many records
+MAX_SEGMENT_RECORDS = 65536
+
+#Length of the substrings of the lowercased message kept in the inverted index
+GRAM_LENGTH = 3
+
+#Terms found in more than this fraction of the records of a sealed segment are stored as bitmaps
+DENSE_FRACTION = 1/8
+
+#Length of the asctime prefix for each bucket of an aggregation
+TIME_BUCKETS = {
+	'minute': len('2020-12-20 14:18'),
+	'hour': len('2020-12-20 14'),
+	'day': len('2020-12-20'),
+}
+
+#Bytes read at a time when reading a log file backwards
+READ_BLOCK = 65536
+
+#Bytes read at a time when looking for the end of the last complete record
+TAIL_BLOCK = 1024
+
+#Bytes of the start of a log file kept as its fingerprint, up to the end of the first record
+FINGERPRINT_BYTES = 4096
+
+#Bump whenever the layout of a stored segment changes
+INDEX_VERSION = 5
+
+
+#Log file written by a single worker process at a time when logs are split per process
+def worker_path(path, number):
+	root, ext = os.path.splitext(path)
+	return '{}.{}{}'.format(root, number, ext)
+
+
+#Numbers of the per process log files next to the log file
+def worker_numbers(path):
+	root, ext = os.path.splitext(path)
+	directory, base = os.path.split(root)
+	pattern = re.compile(r'^{}\.(\d+){}$'.format(re.escape(base), re.escape(ext)))
+	try:
+		names = os.listdir(directory or '.')
+	except FileNotFoundError:
+		names = []
+	return sorted(int(match.group(1)) for match in map(pattern.match, names) if match)
+
+
+#Log file and every per process log file next to it
+def log_paths(path):
+	paths = [worker_path(path, number) for number in worker_numbers(path)]
+	if os.path.exists(path):
+		paths.insert(0, path)
+	return paths
+
+
+#Sort key used to merge logs of several files
+def log_time(log):
+	asctime = log.get('asctime')
+	return asctime if isinstance(asctime, str) else ''
+
+
+#function to see if log satisfies query condition
+def check_cond(log, query):
+	for key in query.keys():
+		if key == "message":
+			if query[key].lower() not in log[key].lower():
+				return False
+		elif key == "from":
+			if query[key]>log['asctime']:
+				return False
+		elif key == "to":
+			if query[key]<log['asctime']:
+				return False
+		elif query[key] != log.get(key, ''):
+			return False
+	return True
+
+
+#Counts of logs per group of field values and time bucket, filled one log at a time
+class Aggregation:
+
+	def __init__(self, group_by=(), bucket=None, top=None):
+		for field in group_by:
+			if field not in INDEXED_FIELDS:
+				raise ValueError('Cannot group by {}.'.format(field))
+		if bucket is not None and bucket not in TIME_BUCKETS:
+			raise ValueError('Unknown bucket {}.'.format(bucket))
+		if top is not None and (not isinstance(top, int) or isinstance(top, bool) or top < 1):
+			raise ValueError('top must be a positive number.')
+		self.group_by = list(group_by)
+		self.bucket = bucket
+		self.top = top
+		self.counts = Counter()
+
+	def add(self, log):
+		key = tuple(log.get(field, '') for field in self.group_by)
+		if self.bucket:
+			key += (log_time(log)[:TIME_BUCKETS[self.bucket]],)
+		self.counts[key] += 1
+
+	#Largest top groups first if top is given, otherwise ordered by the group itself
+	def groups(self):
+		names = self.group_by + (['bucket'] if self.bucket else [])
+		if self.top is not None:
+			items = self.counts.most_common(self.top)
+		else:
+			items = sorted(self.counts.items(), key=lambda item: [str(value) for value in item[0]])
+
+		groups = []
+		for key, count in items:
+			group = dict(zip(names, key))
+			group['count'] = count
+			groups.append(group)
+		return groups
+
+
+#Distinct substrings of GRAM_LENGTH characters of a lowercased text
+def grams(text):
+	return {text[i:i+GRAM_LENGTH] for i in range(len(text)-GRAM_LENGTH+1)}
+
+
+#Terms are grams of the message or (field, value) pairs, stored by sealed segments as numbers
+#A gram packs its code points in 21 bits each, which fits 64 bits for GRAM_LENGTH 3
+#A value is a negative hash so it never meets a gram
+#Values sharing a hash only add candidates, every candidate is checked again with check_cond
+@lru_cache(maxsize=65536)
+def term_key(term):
+	if isinstance(term, str):
+		key = 0
+		for char in term:
+			key = key << 21 | ord(char)
+		return key
+	digest = hashlib.blake2b('{}\0{}'.format(*term).encode('utf-8', 'surrogatepass'), digest_size=8).digest()
+	return -1 - (int.from_bytes(digest, 'little') >> 1)
+
+
+#Terms every record satisfying the query has in its segment
+def query_terms(query):
+	terms = []
+	for field in INDEXED_FIELDS:
+		value = query.get(field)
+		if isinstance(value, str):
+			terms.append((field, value))
+
+	#Every gram of the queried text has to be present in the message
+	message = query.get('message')
+	if isinstance(message, str):
+		terms.extend(grams(message.lower()))
+	return terms
+
+
+#Intersection of two sorted arrays of record numbers
+def intersect(a, b):
+	if len(a) > len(b):
+		a, b = b, a
+	result = array('H')
+	n = len(b)
+	for x in a:
+		i = bisect_left(b, x)
+		if i < n and b[i] == x:
+			result.append(x)
+	return result
+
+
+#Record numbers of a term found in many records of a sealed segment, one bit per record
+class Bitmap:
+
+	def __init__(self, data):
+		self.data = data
+
+	def __contains__(self, n):
+		return self.data[n >> 3] >> (n & 7) & 1
+
+
+#Record numbers from lo to hi set in every bitmap
+def bitmap_intersection(bitmaps, lo, hi):
+	first, last = lo >> 3, (hi+7) >> 3
+	mask = int.from_bytes(bitmaps[0].data[first:last], 'little')
+	for bitmap in bitmaps[1:]:
+		mask &= int.from_bytes(bitmap.data[first:last], 'little')
+
+	numbers = []
+	for i, byte in enumerate(mask.to_bytes(last-first, 'little')):
+		if not byte:
+			continue
+		for bit in range(8):
+			n = (first+i)*8 + bit
+			if byte >> bit & 1 and lo <= n < hi:
+				numbers.append(n)
+	return numbers
+
+
+#Byte ranges of the arrays of a sealed segment file, each one starting on a multiple of 8
+def section_ranges(position, sizes):
+	ranges = []
+	for size in sizes:
+		position += -position % 8
+		ranges.append((position, position+size))
+		position += size
+	return ranges
+
+
+#Arrays stored after the header of a sealed segment, with their type codes
+SECTIONS = (
+	('offsets', 'q'),
+	('keys', 'q'),
+	('starts', 'q'),
+	('dense_keys', 'q'),
+	('postings', 'H'),
+	('bitmaps', 'B'),
+)
+
+
+#Contiguous, time ordered run of records of the log file with its own indexes
+class Segment:
+
+	def __init__(self, start):
+		self.start = start
+		self.end = start
+		self.offsets = array('q')
+		self.min_time = None
+		self.max_time = None
+		self.untimed = False
+		self.buckets = {}
+		self.postings = {}
+
+	def __len__(self):
+		return len(self.offsets)
+
+	def add(self, offset, end, log):
+		n = len(self.offsets)
+		self.offsets.append(offset)
+		self.end = end
+
+		#Time range covered by this segment
+		asctime = log.get('asctime')
+		if isinstance(asctime, str):
+			if self.min_time is None or asctime < self.min_time:
+				self.min_time = asctime
+			if self.max_time is None or asctime > self.max_time:
+				self.max_time = asctime
+
+			#First and last record of every minute
+			bucket = self.buckets.get(asctime[:BUCKET_LENGTH])
+			if bucket is None:
+				self.buckets[asctime[:BUCKET_LENGTH]] = [n, n]
+			else:
+				bucket[1] = n
+		else:
+			self.untimed = True
+
+		#Only string values are indexed, anything else is left to check_cond
+		terms = []
+		for field in INDEXED_FIELDS:
+			value = log.get(field, '')
+			if isinstance(value, str):
+				terms.append((field, value))
+
+		#Inverted index of the message for case insensitive substring search
+		message = log.get('message')
+		if isinstance(message, str):
+			terms.extend(grams(message.lower()))
+
+		postings = self.postings
+		for term in terms:
+			posting = postings.get(term)
+			if posting is None:
+				posting = postings[term] = array('H')
+			posting.append(n)
+
+	#Record numbers having a term, None if no record has it
+	def posting(self, term):
+		return self.postings.get(term)
+
+	#Write the segment in the layout read by SealedSegment
+	#Terms found in more than DENSE_FRACTION of the records are stored as bitmaps
+	def write(self, f, identity, fingerprint):
+		n = len(self.offsets)
+		stride = (n+7) >> 3
+		keys = array('q')
+		dense_keys = array('q')
+		starts = array('q', [0])
+		postings = array('H')
+		bitmaps = bytearray()
+
+		#Values sharing a hash share one posting
+		merged = {}
+		for term, posting in self.postings.items():
+			key = term_key(term)
+			if key in merged:
+				posting = array('H', sorted(set(merged[key]) | set(posting)))
+			merged[key] = posting
+
+		for key, posting in sorted(merged.items()):
+			if len(posting) <= n*DENSE_FRACTION:
+				keys.append(key)
+				postings.extend(posting)
+				starts.append(len(postings))
+				continue
+			dense_keys.append(key)
+			bitmap = bytearray(stride)
+			for m in posting:
+				bitmap[m >> 3] |= 1 << (m & 7)
+			bitmaps.extend(bitmap)
+
+		sections = [memoryview(section).cast('B') for section in (self.offsets, keys, starts, dense_keys, postings, bitmaps)]
+		header = {
+			'start': self.start,
+			'end': self.end,
+			'min_time': self.min_time,
+			'max_time': self.max_time,
+			'untimed': self.untimed,
+			'buckets': self.buckets,
+			'records': n,
+			'stride': stride,
+			'sizes': [section.nbytes for section in sections],
+		}
+		data = pickle.dumps((INDEX_VERSION, identity, fingerprint, header), pickle.HIGHEST_PROTOCOL)
+		f.write(struct.pack('<Q', len(data)))
+		f.write(data)
+		header['position'] = 8 + len(data)
+		for (begin, _), section in zip(section_ranges(header['position'], header['sizes']), sections):
+			f.write(bytes(begin-f.tell()))
+			f.write(section)
+		return header
+
+	#Range of record numbers which can be inside the queried time range
+	def time_range(self, query):
+		start = query.get('from')
+		end = query.get('to')
+		if not isinstance(start, str):
+			start = None
+		if not isinstance(end, str):
+			end = None
+		if self.untimed or self.min_time is None or (start is None and end is None):
+			return 0, len(self)
+
+		if (start is not None and self.max_time < start) or (end is not None and self.min_time > end):
+			return 0, 0
+
+		#Records are checked again later, so the minute is enough to seek
+		lo, hi = len(self), 0
+		start = start[:BUCKET_LENGTH] if start is not None else None
+		end = end[:BUCKET_LENGTH] if end is not None else None
+		for key, (first, last) in self.buckets.items():
+			if (start is None or key >= start) and (end is None or key <= end):
+				lo = min(lo, first)
+				hi = max(hi, last+1)
+		return lo, max(lo, hi)
+
+	#Byte offsets of records that may satisfy the query
+	def candidates(self, query):
+		lo, hi = self.time_range(query)
+		if lo >= hi:
+			return []
+
+		postings = [self.posting(term) for term in query_terms(query)]
+		if None in postings:
+			return []
+		if not postings:
+			return list(self.offsets[lo:hi])
+		lists = [posting[bisect_left(posting, lo):bisect_left(posting, hi)] for posting in postings if not isinstance(posting, Bitmap)]
+		bitmaps = [posting for posting in postings if isinstance(posting, Bitmap)]
+		if not lists:
+			return [self.offsets[n] for n in bitmap_intersection(bitmaps, lo, hi)]
+
+		#Intersect starting from the rarest value, bitmaps are only checked for what is left
+		lists.sort(key=len)
+		numbers = lists[0]
+		for posting in lists[1:]:
+			if not numbers:
+				break
+			numbers = intersect(numbers, posting)
+		return [self.offsets[n] for n in numbers if all(n in bitmap for bitmap in bitmaps)]
+
+
+#Segment stored by any process, only its header is kept in memory
+#The arrays are mapped from the file when first queried and read by the page cache
+class SealedSegment(Segment):
+
+	def __init__(self, path, header):
+		self.path = path
+		self.start = header['start']
+		self.end = header['end']
+		self.min_time = header['min_time']
+		self.max_time = header['max_time']
+		self.untimed = header['untimed']
+		self.buckets = header['buckets']
+		self.records = header['records']
+		self.stride = header['stride']
+		self.sizes = header['sizes']
+		self.position = header['position']
+		self.arrays = None
+
+	def __len__(self):
+		return self.records
+
+	def mapped(self):
+		if self.arrays is None:
+			with open(self.path, 'rb') as f:
+				data = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+			self.arrays = {name: data[begin:end].cast(code) for (name, code), (begin, end) in zip(SECTIONS, section_ranges(self.position, self.sizes))}
+		return self.arrays
+
+	@property
+	def offsets(self):
+		return self.mapped()['offsets']
+
+	def posting(self, term):
+		key = term_key(term)
+		arrays = self.mapped()
+		keys = arrays['keys']
+		i = bisect_left(keys, key)
+		if i < len(keys) and keys[i] == key:
+			return arrays['postings'][arrays['starts'][i]:arrays['starts'][i+1]]
+		keys = arrays['dense_keys']
+		i = bisect_left(keys, key)
+		if i < len(keys) and keys[i] == key:
+			return Bitmap(arrays['bitmaps'][i*self.stride:(i+1)*self.stride])
+		return None
+
+	#Header of a segment file, position is where its arrays start
+	@staticmethod
+	def read_header(f):
+		size, = struct.unpack('<Q', f.read(8))
+		version, identity, fingerprint, header = pickle.loads(f.read(size))
+		header['position'] = 8 + size
+		return version, identity, fingerprint, header
+
+
+#Segmented store with secondary indexes over a json lines log file
+class LogStore:
+
+	def __init__(self, path, segment_records=SEGMENT_RECORDS):
+		if not 0 < segment_records <= MAX_SEGMENT_RECORDS:
+			raise ValueError('A segment holds 1 to {} records.'.format(MAX_SEGMENT_RECORDS))
+		self.path = path
+		self.index_dir = path + '.idx'
+		self.segment_records = segment_records
+		self.identity = None
+		self.fingerprint = None
+		self.segments = []
+		self.loaded = False
+		self.lock = threading.Lock()
+
+	#Hash of the first record of the log file
+	#Copytruncate rotation keeps the inode, the first record tells the new file apart
+	def read_fingerprint(self):
+		with open(self.path, 'rb') as f:
+			data = f.read(FINGERPRINT_BYTES)
+		cut = data.find(b'\n')
+		if cut != -1:
+			data = data[:cut+1]
+		elif len(data) < FINGERPRINT_BYTES:
+			#First record not complete yet
+			data = b''
+		return hashlib.sha1(data).hexdigest()
+
+	def reset(self, identity, fingerprint):
+		self.identity = identity
+		self.fingerprint = fingerprint
+		self.segments = [Segment(0)]
+
+	#Load sealed segments saved by any process for this log file
+	def load(self, identity, fingerprint):
+		self.reset(identity, fingerprint)
+		try:
+			names = sorted(os.listdir(self.index_dir))
+		except FileNotFoundError:
+			return
+
+		sealed = []
+		for name in names:
+			if not name.endswith('.seg'):
+				continue
+			try:
+				with open(os.path.join(self.index_dir, name), 'rb') as f:
+					version, seg_identity, seg_fingerprint, header = SealedSegment.read_header(f)
+			except Exception:
+				break
+			expected = sealed[-1].end if sealed else 0
+			if version != INDEX_VERSION or seg_identity != identity or seg_fingerprint != fingerprint or header['start'] != expected:
+				break
+			sealed.append(SealedSegment(os.path.join(self.index_dir, name), header))
+
+		if sealed:
+			self.segments = sealed + [Segment(sealed[-1].end)]
+
+	#Persist a full segment so other workers and restarts can reuse it
+	#Returns the segment read back from its file, or the segment itself if it could not be written
+	def seal(self, segment):
+		try:
+			os.makedirs(self.index_dir, exist_ok=True)
+			name = os.path.join(self.index_dir, '{:020d}.seg'.format(segment.start))
+			tmp = '{}.{}.tmp'.format(name, os.getpid())
+			with open(tmp, 'wb') as f:
+				header = segment.write(f, self.identity, self.fingerprint)
+			os.replace(tmp, name)
+		except OSError:
+			return segment
+		return SealedSegment(name, header)
+
+	#Index records appended to the log file since the last call
+	def refresh(self):
+		with self.lock:
+			st = os.stat(self.path)
+			identity = (st.st_dev, st.st_ino)
+			if self.loaded and identity == self.identity and st.st_size == self.segments[-1].end:
+				return
+
+			#Only checked when the file changed, so an idle log costs a stat
+			fingerprint = self.read_fingerprint()
+			if not self.loaded or identity != self.identity or fingerprint != self.fingerprint:
+				self.load(identity, fingerprint)
+				self.loaded = True
+
+			active = self.segments[-1]
+			if st.st_size < active.end:
+				self.reset(identity, fingerprint)
+				active = self.segments[-1]
+			if st.st_size == active.end:
+				return
+
+			with open(self.path, 'rb') as f:
+				f.seek(active.end)
+				offset = active.end
+				for line in f:
+					#Partially written record, pick it up on next refresh
+					if not line.endswith(b'\n'):
+						break
+					end = offset + len(line)
+					try:
+						log = json.loads(line)
+					except ValueError:
+						log = None
+					if isinstance(log, dict):
+						active.add(offset, end, log)
+					else:
+						active.end = end
+					offset = end
+
+					if len(active) >= self.segment_records:
+						self.segments[-1] = self.seal(active)
+						active = Segment(end)
+						self.segments.append(active)
+
+	#Byte offsets of records which may satisfy the query, in file order
+	def candidates(self, query):
+		with self.lock:
+			offsets = []
+			for segment in self.segments:
+				offsets.extend(segment.candidates(query))
+		return offsets
+
+	#Decoded records at given byte offsets, lines no longer holding a record are skipped
+	def read(self, offsets):
+		try:
+			f = open(self.path, 'rb')
+		except FileNotFoundError:
+			return
+		with f:
+			for offset in offsets:
+				f.seek(offset)
+				for _, log in self.decode_at(offset, f.readline()):
+					yield log
+
+	#All records satisfying the query in the order they were written
+	def query(self, query):
+		self.refresh()
+		for log in self.read(self.candidates(query)):
+			if check_cond(log, query):
+				yield log
+
+	#Byte offset just past the last complete record, found without indexing the file
+	def complete_end(self):
+		with open(self.path, 'rb') as f:
+			pos = f.seek(0, os.SEEK_END)
+			while pos > 0:
+				size = min(TAIL_BLOCK, pos)
+				f.seek(pos-size)
+				cut = f.read(size).rfind(b'\n')
+				if cut != -1:
+					return pos-size+cut+1
+				pos -= size
+		return 0
+
+	#Records from byte offset start up to end with the offset just past each of them
+	#Lines which are partial or not json are skipped
+	def records_after(self, start=0, end=None):
+		with open(self.path, 'rb') as f:
+			f.seek(start)
+			offset = start
+			for line in f:
+				if not line.endswith(b'\n') or (end is not None and offset >= end):
+					break
+				offset += len(line)
+				try:
+					log = json.loads(line)
+				except ValueError:
+					continue
+				if isinstance(log, dict):
+					yield offset, log
+
+	#Records ending before byte offset end, newest first, with the offset of each of them
+	def records_before(self, end):
+		with open(self.path, 'rb') as f:
+			pos = end
+			buf = b''
+			while True:
+				#Every line after the last but one newline is complete
+				cut = buf.rfind(b'\n', 0, len(buf)-1)
+				while cut != -1:
+					line = buf[cut+1:]
+					buf = buf[:cut+1]
+					yield from self.decode_at(pos+cut+1, line)
+					cut = buf.rfind(b'\n', 0, len(buf)-1)
+
+				if pos == 0:
+					yield from self.decode_at(0, buf)
+					return
+				size = min(READ_BLOCK, pos)
+				pos -= size
+				f.seek(pos)
+				buf = f.read(size) + buf
+
+	def decode_at(self, offset, line):
+		try:
+			log = json.loads(line)
+		except ValueError:
+			return
+		if isinstance(log, dict):
+			yield offset, log
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+#Shared store of this process for a log file
+def get_store(path):
+	with _stores_lock:
+		store = _stores.get(path)
+		if store is None:
+			store = _stores[path] = LogStore(path)
+	return store
+
+
+#Stores of every log file, fails if there is no log file yet
+def refresh_logs(path):
+	paths = log_paths(path)
+	if not paths:
+		raise FileNotFoundError(path)
+	stores = [get_store(p) for p in paths]
+	for store in stores:
+		store.refresh()
+	return stores
+
+
+#Records of all log files satisfying the query, merged by time
+def query_logs(path, query):
+	return heapq.merge(*[store.query(query) for store in refresh_logs(path)], key=log_time)
+
+
+#Records of one log file as (time, file name, position, log) for merging
+def positioned(store, records):
+	name = os.path.basename(store.path)
+	for position, log in records:
+		yield log_time(log), name, position, log
+
+
+#Records of all log files merged by time, continuing from the given positions
+#positions maps a log file name to a byte offset between two records, in reverse
+#the records before it are read newest first, otherwise the records after it
+#Returns the starting position of every file and the merged (time, name, position, log)
+#Pages are read straight from the files, records not indexed yet are left to the queries
+def page_logs(path, positions=None, reverse=False):
+	paths = log_paths(path)
+	if not paths:
+		raise FileNotFoundError(path)
+
+	#Files missing from a cursor were created after it, so all of their records are newer
+	start = {}
+	streams = []
+	for store in map(get_store, paths):
+		name = os.path.basename(store.path)
+		end = store.complete_end()
+		if positions is None:
+			start[name] = end if reverse else 0
+		else:
+			start[name] = min(positions.get(name, 0), end)
+
+		if reverse:
+			streams.append(positioned(store, store.records_before(start[name])))
+		else:
+			streams.append(positioned(store, store.records_after(start[name], end)))
+
+	return start, heapq.merge(*streams, key=lambda item: item[0], reverse=reverse)
@@ -0,0 +1,36 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from twitter.benchmarks import compare, run, save
+
+
+class Command(BaseCommand):
+	help = 'Time the list, respond and log endpoints on the current database and save the results as json.'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--prefix', default='bench', help='Prefix of the users generated by generate_data.')
+		parser.add_argument('--requests', type=int, default=20, help='Timed requests per endpoint.')
+		parser.add_argument('--only', nargs='+', help='Names of the endpoints to time.')
+		parser.add_argument('--log-file', help='Log file written by generate_data, read by the log endpoints instead of the live one.')
+		parser.add_argument('--output', help='Results file, a new file in twitter/benchmarks/ by default.')
+		parser.add_argument('--compare', help='Results file of an earlier run to compare with.')
+
+	def handle(self, *args, **options):
+		try:
+			results = run(options['prefix'], options['requests'], options['only'], options['log_file'])
+		except ValueError as e:
+			raise CommandError(str(e))
+		path = save(results, options['output'])
+
+		self.stdout.write('{:<24}{:>10}{:>10}{:>10}{:>12}{:>9}{:>12}'.format('endpoint', 'p50 ms', 'p95 ms', 'p99 ms', 'req/s', 'queries', 'peak KiB'))
+		for name, result in results['endpoints'].items():
+			self.stdout.write('{:<24}{:>10.1f}{:>10.1f}{:>10.1f}{:>12.1f}{:>9}{:>12.0f}'.format(name, result['p50']*1000, result['p95']*1000, result['p99']*1000, result['throughput'], result['queries'], result['peak_memory']/1024))
+
+		if options['compare']:
+			with open(options['compare']) as f:
+				changes = compare(json.load(f), results)
+			self.stdout.write('Compared with {} (new/old):'.format(options['compare']))
+			for name, change in changes.items():
+				self.stdout.write('{:<24}'.format(name) + ''.join(' {} {}'.format(key, 'n/a' if ratio is None else '{:.2f}'.format(ratio)) for key, ratio in change.items()))
+		self.stdout.write('Results saved to {}.'.format(path))
@@ -0,0 +1,32 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from twitter.logstore import LOG_FILE, log_paths
+from twitter.synthetic import generate
+
+
+class Command(BaseCommand):
+	help = 'Fill the database and the log file with a synthetic dataset for benchmarks.'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--prefix', default='bench', help='Prefix of the generated usernames, must not be used yet.')
+		parser.add_argument('--users', type=int, default=1000)
+		parser.add_argument('--admins', type=int, default=20)
+		parser.add_argument('--superadmins', type=int, default=5)
+		parser.add_argument('--tweets', type=int, default=100000, help='Tweets, most of them from a few users.')
+		parser.add_argument('--requests', type=int, default=1000, help='Pending requests of each type.')
+		parser.add_argument('--logs', type=int, default=2000000, help='Records appended to the log file.')
+		parser.add_argument('--log-file', required=True, help='File the records are appended to, never the live log file.')
+		parser.add_argument('--days', type=int, default=30, help='Tweets and logs are spread over this many days.')
+		parser.add_argument('--password', default='abcd12345', help='Password of every generated user.')
+		parser.add_argument('--seed', type=int, default=0)
+
+	def handle(self, *args, **options):
+		#Back dated records would break the time order of the audit trail
+		live = {os.path.realpath(path) for path in [LOG_FILE] + log_paths(LOG_FILE)}
+		if os.path.realpath(options['log_file']) in live:
+			raise CommandError('--log-file must not be the live log file {}.'.format(LOG_FILE))
+
+		generate(options['prefix'], options['users'], options['admins'], options['superadmins'], options['tweets'], options['requests'], options['logs'], options['log_file'], days=options['days'], password=options['password'], seed=options['seed'])
+		self.stdout.write('Generated {users} users, {admins} admins, {superadmins} superadmins, {tweets} tweets, {requests} requests of each type and {logs} log records.'.format(**options))
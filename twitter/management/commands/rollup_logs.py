@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from twitter.logstore import LOG_FILE
+from twitter.rollups import clear_rollups, update_rollups
+
+
+class Command(BaseCommand):
+	help = 'Count log records appended since the last run into the hourly and daily rollup tables.'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--rebuild', action='store_true', help='Drop the rollups and count every log file again.')
+
+	def handle(self, *args, **options):
+		if options['rebuild']:
+			clear_rollups()
+		records = update_rollups(LOG_FILE)
+		self.stdout.write('Counted {} log records.'.format(records))
@@ -0,0 +1,257 @@
+import json
+import logging
+import math
+import os
+import re
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+#Upper bounds of the histogram buckets, a last bucket takes everything above them
+SECONDS_BUCKETS = tuple(0.0005*2**i for i in range(18))
+COUNT_BUCKETS = (0,) + tuple(2**i for i in range(12))
+BYTES_BUCKETS = tuple(64*4**i for i in range(11))
+
+#Value kept for every request, its metric name, help text and buckets
+METRICS = (
+	('seconds', 'twitter_view_seconds', 'Wall time of requests', SECONDS_BUCKETS),
+	('db_queries', 'twitter_view_db_queries', 'Database queries made by requests', COUNT_BUCKETS),
+	('db_seconds', 'twitter_view_db_seconds', 'Time requests spent in database queries', SECONDS_BUCKETS),
+	('log_seconds', 'twitter_view_log_seconds', 'Time requests spent handing records to the log handlers', SECONDS_BUCKETS),
+	('response_bytes', 'twitter_view_response_bytes', 'Size of response bodies', BYTES_BUCKETS),
+)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+#Histograms of one worker are written to metrics.<pid>.<start>.json in the metrics directory
+#The start time in milliseconds tells apart workers given the pid of a dead one
+WORKER_FILE = re.compile(r'^metrics\.(\d+)\.(\d+)\.json$')
+
+#Metrics that cannot be written are reported to the default handlers, requests go on without them
+errors = logging.getLogger(__name__)
+
+#Values of the request handled by this thread, None outside of a request
+current = threading.local()
+
+
+def start_request():
+	current.stats = {'db_queries': 0, 'db_seconds': 0.0, 'log_seconds': 0.0}
+	return current.stats
+
+
+def end_request():
+	current.stats = None
+
+
+#Called by the log handlers, only counted inside a request
+def add_log_time(seconds):
+	stats = getattr(current, 'stats', None)
+	if stats is not None:
+		stats['log_seconds'] += seconds
+
+
+#Times every query of a connection, see connection.execute_wrapper
+class QueryTimer:
+
+	def __init__(self, stats):
+		self.stats = stats
+
+	def __call__(self, execute, sql, params, many, context):
+		started = time.perf_counter()
+		try:
+			return execute(sql, params, many, context)
+		finally:
+			self.stats['db_queries'] += 1
+			self.stats['db_seconds'] += time.perf_counter()-started
+
+
+def running(pid):
+	try:
+		os.kill(pid, 0)
+	except ProcessLookupError:
+		return False
+	except PermissionError:
+		return True
+	return True
+
+
+def bucket_index(buckets, value):
+	for index, bound in enumerate(buckets):
+		if value <= bound:
+			return index
+	return len(buckets)
+
+
+#Value below which a fraction q of the observations fall, interpolated inside its bucket
+def quantile(buckets, counts, q):
+	rank = q*sum(counts)
+	seen = 0
+	lower = 0
+	for index, count in enumerate(counts):
+		if count and seen+count >= rank:
+			if index == len(buckets):
+				return lower
+			return lower + (buckets[index]-lower)*(rank-seen)/count
+		seen += count
+		if index < len(buckets):
+			lower = buckets[index]
+	return lower
+
+
+#Per view histograms of this worker, shared with the other workers through files
+class Metrics:
+
+	def __init__(self):
+		self.lock = threading.Lock()
+		self.views = {}
+		self.pid = None
+		self.started = None
+		self.flushed = 0
+
+	@property
+	def directory(self):
+		return getattr(settings, 'TWITTER_METRICS_DIR', os.path.join(APP_DIR, 'metrics'))
+
+	@property
+	def flush_interval(self):
+		return getattr(settings, 'TWITTER_METRICS_FLUSH_INTERVAL', 5)
+
+	def path(self):
+		return os.path.join(self.directory, 'metrics.{}.{}.json'.format(self.pid, self.started))
+
+	def record(self, view, values):
+		with self.lock:
+			#A forked worker starts with its own empty histograms
+			if self.pid != os.getpid():
+				self.views = {}
+				self.pid = os.getpid()
+				self.started = int(time.time()*1000)
+				self.flushed = time.monotonic()
+
+			histograms = self.views.setdefault(view, {})
+			for key, _, _, buckets in METRICS:
+				if key not in values:
+					continue
+				histogram = histograms.setdefault(key, {'counts': [0]*(len(buckets)+1), 'sum': 0})
+				histogram['counts'][bucket_index(buckets, values[key])] += 1
+				histogram['sum'] += values[key]
+
+			due = time.monotonic()-self.flushed >= self.flush_interval
+		if due:
+			self.flush()
+
+	#Replace the file of this worker with its current histograms, tried again at the next flush if it fails
+	def flush(self):
+		with self.lock:
+			if self.pid != os.getpid():
+				return
+			data = json.dumps(self.views)
+			path = self.path()
+			self.flushed = time.monotonic()
+		try:
+			os.makedirs(self.directory, exist_ok=True)
+			fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+			try:
+				with os.fdopen(fd, 'w') as f:
+					f.write(data)
+				os.replace(tmp, path)
+			except OSError:
+				os.unlink(tmp)
+				raise
+		except OSError:
+			errors.exception('Metrics could not be written to %s', self.directory)
+
+	#Files of running workers, the newest one of every pid
+	#Files left by dead workers are removed, pids are checked on this host only
+	def worker_files(self):
+		try:
+			names = os.listdir(self.directory)
+		except OSError:
+			return []
+		newest = {}
+		stale = []
+		for name in names:
+			match = WORKER_FILE.match(name)
+			if not match:
+				continue
+			pid, started = int(match.group(1)), int(match.group(2))
+			if not running(pid):
+				stale.append(name)
+			elif pid in newest:
+				older, newer = sorted([newest[pid], (started, name)])
+				stale.append(older[1])
+				newest[pid] = newer
+			else:
+				newest[pid] = (started, name)
+		for name in stale:
+			try:
+				os.unlink(os.path.join(self.directory, name))
+			except OSError:
+				pass
+		return sorted(name for _, name in newest.values())
+
+	#Histograms of every worker added together
+	def collect(self):
+		self.flush()
+		views = {}
+		for name in self.worker_files():
+			try:
+				with open(os.path.join(self.directory, name)) as f:
+					worker = json.load(f)
+			except (OSError, ValueError):
+				continue
+			for view, histograms in worker.items():
+				merged = views.setdefault(view, {})
+				for key, histogram in histograms.items():
+					if key not in merged:
+						merged[key] = {'counts': list(histogram['counts']), 'sum': histogram['sum']}
+					else:
+						merged[key]['counts'] = [a+b for a, b in zip(merged[key]['counts'], histogram['counts'])]
+						merged[key]['sum'] += histogram['sum']
+		return views
+
+	def clear(self):
+		with self.lock:
+			self.views = {}
+		try:
+			names = os.listdir(self.directory)
+		except FileNotFoundError:
+			names = []
+		for name in names:
+			if WORKER_FILE.match(name):
+				os.unlink(os.path.join(self.directory, name))
+
+
+def label(value):
+	return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def number(value):
+	if isinstance(value, float) and not math.isfinite(value):
+		return 'NaN'
+	return repr(value)
+
+
+#Histograms in the Prometheus text format, each one a summary of its p50, p95 and p99
+def prometheus_text(views):
+	lines = []
+	for key, name, description, buckets in METRICS:
+		lines.append('# HELP {} {}'.format(name, description))
+		lines.append('# TYPE {} summary'.format(name))
+		for view in sorted(views):
+			histogram = views[view].get(key)
+			if histogram is None:
+				continue
+			view_label = label(view)
+			for q in QUANTILES:
+				lines.append('{}{{view="{}",quantile="{}"}} {}'.format(name, view_label, q, number(float(quantile(buckets, histogram['counts'], q)))))
+			lines.append('{}_sum{{view="{}"}} {}'.format(name, view_label, number(histogram['sum'])))
+			lines.append('{}_count{{view="{}"}} {}'.format(name, view_label, sum(histogram['counts'])))
+	return '\n'.join(lines)+'\n'
+
+
+registry = Metrics()
@@ -0,0 +1,73 @@
+import logging
+import time
+
+from django.db import connection
+
+from .metrics import QueryTimer, end_request, registry, start_request
+from .profiling import profile_mode, profile_request
+
+#Initializing logger
+logger = logging.getLogger('twitter_logs')
+
+
+def view_name(request):
+	match = getattr(request, 'resolver_match', None)
+	return match.view_name if match is not None else 'unresolved'
+
+
+#Body of a streamed response passed through, its size and the time to send it are recorded at the end
+def counted(content, view, values, started):
+	size = 0
+	try:
+		for chunk in content:
+			size += len(chunk)
+			yield chunk
+	finally:
+		values['seconds'] = time.perf_counter()-started
+		values['response_bytes'] = size
+		registry.record(view, values)
+
+
+#Records wall time, database queries and time, log time and response size of every request by view
+class MetricsMiddleware:
+
+	def __init__(self, get_response):
+		self.get_response = get_response
+
+	def __call__(self, request):
+		values = start_request()
+		started = time.perf_counter()
+		try:
+			with connection.execute_wrapper(QueryTimer(values)):
+				response = self.get_response(request)
+		finally:
+			end_request()
+
+		view = view_name(request)
+		if response.streaming:
+			response.streaming_content = counted(response.streaming_content, view, values, started)
+		else:
+			values['seconds'] = time.perf_counter()-started
+			values['response_bytes'] = len(response.content)
+			registry.record(view, values)
+		return response
+
+
+#Profiles requests of superadmins sending the X-Profile header or the profile parameter
+class ProfileMiddleware:
+
+	def __init__(self, get_response):
+		self.get_response = get_response
+
+	def __call__(self, request):
+		#Every other request goes straight to the view
+		mode = profile_mode(request)
+		if mode is None or not request.user.is_superuser:
+			return self.get_response(request)
+
+		response, summary = profile_request(self.get_response, request, mode)
+
+		#log
+		u = request.user
+		logger.info('Superadmin:{} profiled request to {}'.format(u.username, summary['view']), extra={'source': u.username, 'log_type': 'audit'})
+		return response
@@ -0,0 +1,47 @@
+# Generated by Django 2.2.17 on 2026-10-18 17:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('twitter', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LogRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(max_length=4)),
+                ('bucket', models.CharField(max_length=16)),
+                ('source', models.CharField(max_length=150)),
+                ('log_type', models.CharField(max_length=16)),
+                ('action', models.CharField(max_length=32)),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LogRollupCursor',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('identity', models.CharField(blank=True, max_length=64)),
+                ('offset', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='updateuser',
+            name='responded',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='logrollup',
+            index=models.Index(fields=['period', 'source', 'bucket'], name='twitter_rollup_source_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='logrollup',
+            unique_together={('period', 'bucket', 'source', 'log_type', 'action')},
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.17 on 2026-10-18 17:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('twitter', '0002_log_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tweet',
+            index=models.Index(fields=['user', '-timestamp', '-id'], name='twitter_tweet_timeline_idx'),
+        ),
+    ]
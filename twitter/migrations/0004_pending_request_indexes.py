@@ -0,0 +1,29 @@
+# Generated by Django 2.2.17 on 2026-10-18 17:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('twitter', '0003_tweet_timeline_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='createtweet',
+            index=models.Index(condition=models.Q(responded=False), fields=['timestamp'], name='twitter_newtweet_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deletetweet',
+            index=models.Index(condition=models.Q(responded=False), fields=['timestamp'], name='twitter_deltweet_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='updatetweet',
+            index=models.Index(condition=models.Q(responded=False), fields=['timestamp'], name='twitter_uptweet_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='updateuser',
+            index=models.Index(condition=models.Q(responded=False), fields=['timestamp'], name='twitter_upuser_pending_idx'),
+        ),
+    ]
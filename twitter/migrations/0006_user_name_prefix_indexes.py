@@ -0,0 +1,36 @@
+from django.db import migrations
+
+# Case insensitive prefix search on the user directory (istartswith) needs
+# expression indexes which Django 2.2 cannot declare in Meta.indexes.
+NAME_FIELDS = ('username', 'first_name', 'last_name')
+
+INDEXES = {
+    # istartswith is UPPER("col"::text) LIKE UPPER(%s) on PostgreSQL
+    'postgresql': 'CREATE INDEX IF NOT EXISTS "twitter_user_{0}_prefix" ON "twitter_user" (UPPER("{0}"::text) text_pattern_ops)',
+    # LIKE is case insensitive on SQLite and uses NOCASE indexes
+    'sqlite': 'CREATE INDEX IF NOT EXISTS "twitter_user_{0}_prefix" ON "twitter_user" ("{0}" COLLATE NOCASE)',
+}
+
+
+def create_indexes(apps, schema_editor):
+    sql = INDEXES.get(schema_editor.connection.vendor)
+    if sql is not None:
+        for field in NAME_FIELDS:
+            schema_editor.execute(sql.format(field))
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor in INDEXES:
+        for field in NAME_FIELDS:
+            schema_editor.execute('DROP INDEX IF EXISTS "twitter_user_{0}_prefix"'.format(field))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('twitter', '0005_request_claims'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,33 @@
+import os
+
+from django.db import migrations
+
+# Rollup cursors were named by the base name of their log file, every one of
+# them belonged to a log file in the app directory, next to LOG_FILE. They are
+# now named by full path.
+LOG_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def full_paths(apps, schema_editor):
+    LogRollupCursor = apps.get_model('twitter', 'LogRollupCursor')
+    for cursor in LogRollupCursor.objects.exclude(name__contains=os.sep):
+        cursor.name = os.path.join(LOG_DIR, cursor.name)
+        cursor.save(update_fields=['name'])
+
+
+def base_names(apps, schema_editor):
+    LogRollupCursor = apps.get_model('twitter', 'LogRollupCursor')
+    for cursor in LogRollupCursor.objects.filter(name__startswith=LOG_DIR + os.sep):
+        cursor.name = os.path.basename(cursor.name)
+        cursor.save(update_fields=['name'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('twitter', '0006_user_name_prefix_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(full_paths, base_names),
+    ]
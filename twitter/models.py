@@ -1,6 +1,8 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
+from .serializers import format_timestamp
+
 # Create your models here.
 #Model to save user details
 class User(AbstractUser):
@@ -22,11 +24,14 @@ class Tweet(models.Model):
 	timestamp = models.DateTimeField(auto_now_add=True)
 	tweet = models.CharField(blank=False, null=False, max_length=280)
 
+	class Meta:
+		indexes = [models.Index(fields=['user', '-timestamp', '-id'], name='twitter_tweet_timeline_idx')]
+
 	def serialize(self):
 		return {
 			"id": self.id,
-			"user": self.user.id,
-			"timestamp": self.timestamp.strftime("%b %d %Y, %I:%M %p"),
+			"user": self.user_id,
+			"timestamp": format_timestamp(self.timestamp),
 			"tweet": self.tweet,
 		}
 
@@ -38,6 +43,11 @@ class UpdateTweet(models.Model):
 	new_tweet = models.CharField(blank=False, null=False, max_length=280)
 	responded = models.BooleanField(default=False)
 	action_granted = models.BooleanField(default=False)
+	claimed_by = models.ForeignKey("User", on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+	claimed_at = models.DateTimeField(null=True, blank=True)
+
+	class Meta:
+		indexes = [models.Index(fields=['timestamp'], condition=models.Q(responded=False), name='twitter_uptweet_pending_idx')]
 
 	def serialize(self):
 		return {
@@ -46,7 +56,7 @@ class UpdateTweet(models.Model):
 			"admin": self.admin.username,
 			"old_tweet": self.tweet.tweet,
 			"new_tweet": self.new_tweet,
-			"timestamp": self.timestamp.strftime("%b %d %Y, %I:%M %p"),
+			"timestamp": format_timestamp(self.timestamp),
 			"action": "update",
 		}
 
@@ -57,6 +67,11 @@ class DeleteTweet(models.Model):
 	admin = models.ForeignKey("User", on_delete=models.CASCADE, related_name='delete_tweets_requests')
 	responded = models.BooleanField(default=False)
 	action_granted = models.BooleanField(default=False)
+	claimed_by = models.ForeignKey("User", on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+	claimed_at = models.DateTimeField(null=True, blank=True)
+
+	class Meta:
+		indexes = [models.Index(fields=['timestamp'], condition=models.Q(responded=False), name='twitter_deltweet_pending_idx')]
 
 	def serialize(self):
 		return {
@@ -64,7 +79,7 @@ class DeleteTweet(models.Model):
 			"user": self.tweet.user.username,
 			"admin": self.admin.username,
 			"tweet": self.tweet.tweet,
-			"timestamp": self.timestamp.strftime("%b %d %Y, %I:%M %p"),
+			"timestamp": format_timestamp(self.timestamp),
 			"action": "delete",
 		}
 
@@ -76,6 +91,11 @@ class CreateTweet(models.Model):
 	timestamp = models.DateTimeField(auto_now_add=True)
 	responded = models.BooleanField(default=False)
 	action_granted = models.BooleanField(default=False)
+	claimed_by = models.ForeignKey("User", on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+	claimed_at = models.DateTimeField(null=True, blank=True)
+
+	class Meta:
+		indexes = [models.Index(fields=['timestamp'], condition=models.Q(responded=False), name='twitter_newtweet_pending_idx')]
 
 	def serialize(self):
 		return {
@@ -83,7 +103,7 @@ class CreateTweet(models.Model):
 			"admin": self.admin.username,
 			"user_id": self.userid,
 			"tweet": self.tweet,
-			"timestamp": self.timestamp.strftime("%b %d %Y, %I:%M %p"),
+			"timestamp": format_timestamp(self.timestamp),
 			"action": "create",
 		}
 
@@ -97,6 +117,11 @@ class UpdateUser(models.Model):
 	timestamp = models.DateTimeField(auto_now_add=True)
 	responded = models.BooleanField(default=False)
 	action_granted = models.BooleanField(default=False)
+	claimed_by = models.ForeignKey("User", on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+	claimed_at = models.DateTimeField(null=True, blank=True)
+
+	class Meta:
+		indexes = [models.Index(fields=['timestamp'], condition=models.Q(responded=False), name='twitter_upuser_pending_idx')]
 
 	def serialize(self):
 		return {
@@ -109,8 +134,34 @@ class UpdateUser(models.Model):
 			"new_first_name": self.new_first_name,
 			"new_last_name": self.new_last_name,
 			"new_bio": self.new_bio,
-			"timestamp": self.timestamp.strftime("%b %d %Y, %I:%M %p"),
+			"timestamp": format_timestamp(self.timestamp),
 			"action": "update",
 		}
 
+#Model to save number of log records per hour or day
+class LogRollup(models.Model):
+	period = models.CharField(max_length=4)
+	bucket = models.CharField(max_length=16)
+	source = models.CharField(max_length=150)
+	log_type = models.CharField(max_length=16)
+	action = models.CharField(max_length=32)
+	count = models.IntegerField(default=0)
+
+	class Meta:
+		unique_together = [('period', 'bucket', 'source', 'log_type', 'action')]
+		indexes = [models.Index(fields=['period', 'source', 'bucket'], name='twitter_rollup_source_idx')]
+
+	def serialize(self):
+		return {
+			"bucket": self.bucket,
+			"source": self.source,
+			"log_type": self.log_type,
+			"action": self.action,
+			"count": self.count,
+		}
 
+#Model to save how far a log file has been counted in the rollups
+class LogRollupCursor(models.Model):
+	name = models.CharField(max_length=255, unique=True)
+	identity = models.CharField(max_length=64, blank=True)
+	offset = models.BigIntegerField(default=0)
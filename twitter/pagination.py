@@ -0,0 +1,29 @@
+import base64
+import binascii
+import json
+
+
+#Opaque url safe cursor holding any json value
+def encode_cursor(value):
+	data = json.dumps(value, separators=(',', ':')).encode('utf-8')
+	return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+
+#Value of a cursor made by encode_cursor, ValueError if it is malformed
+def decode_cursor(cursor):
+	try:
+		data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+		return json.loads(data.decode('utf-8'))
+	except (binascii.Error, UnicodeDecodeError, TypeError):
+		raise ValueError('Invalid cursor.')
+
+
+#Page size asked in the request, default if absent and ValueError if out of range
+def page_limit(request, default, maximum):
+	limit = request.GET.get('limit')
+	if limit is None:
+		return default
+	limit = int(limit)
+	if limit < 1 or limit > maximum:
+		raise ValueError('Invalid limit.')
+	return limit
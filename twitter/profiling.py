@@ -0,0 +1,134 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+#Header and query parameter asking for a profile, memory also traces allocations
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_PARAM = 'profile'
+PROFILE_MODES = ('1', 'memory')
+
+#Functions shown in the summary of a profile
+SUMMARY_LINES = 30
+
+#Name of the files of a profile, sorted oldest first
+PROFILE_ID = re.compile(r'^\d{8}T\d{12}-\d+$')
+
+#Only one profiler can be active at a time, profiled requests of a worker run one after another
+profile_lock = threading.Lock()
+
+
+#Profiles stored on disk, only the newest ones are kept
+class Profiles:
+
+	@property
+	def directory(self):
+		return getattr(settings, 'TWITTER_PROFILES_DIR', os.path.join(APP_DIR, 'profiles'))
+
+	@property
+	def keep(self):
+		return getattr(settings, 'TWITTER_PROFILES_KEEP', 50)
+
+	def path(self, profile_id, ext):
+		return os.path.join(self.directory, '{}.{}'.format(profile_id, ext))
+
+	def ids(self):
+		try:
+			names = os.listdir(self.directory)
+		except FileNotFoundError:
+			return []
+		return sorted({name[:-5] for name in names if name.endswith('.json') and PROFILE_ID.match(name[:-5])})
+
+	def save(self, profiler, summary):
+		os.makedirs(self.directory, exist_ok=True)
+		profile_id = '{}-{}'.format(datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f'), os.getpid())
+		profiler.dump_stats(self.path(profile_id, 'prof'))
+		summary['id'] = profile_id
+		with open(self.path(profile_id, 'json'), 'w') as f:
+			json.dump(summary, f)
+
+		#Drop the oldest profiles of every worker
+		for old in self.ids()[:-self.keep]:
+			for ext in ('json', 'prof'):
+				try:
+					os.unlink(self.path(old, ext))
+				except FileNotFoundError:
+					pass
+		return profile_id
+
+	#Summaries newest first
+	def summaries(self):
+		summaries = []
+		for profile_id in reversed(self.ids()):
+			try:
+				with open(self.path(profile_id, 'json')) as f:
+					summaries.append(json.load(f))
+			except (OSError, ValueError):
+				continue
+		return summaries
+
+	#Path of the .prof file of a profile, None if there is no such profile
+	def stats_path(self, profile_id):
+		if not PROFILE_ID.match(profile_id):
+			return None
+		path = self.path(profile_id, 'prof')
+		return path if os.path.exists(path) else None
+
+
+def profile_mode(request):
+	mode = request.META.get(PROFILE_HEADER) or request.GET.get(PROFILE_PARAM)
+	return mode if mode in PROFILE_MODES else None
+
+
+#Functions taking the most time, as printed by pstats
+def stats_text(profiler):
+	stream = io.StringIO()
+	pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(SUMMARY_LINES)
+	return stream.getvalue()
+
+
+#Run the rest of the request under cProfile, and tracemalloc for memory, and store the profile
+#A streamed body is sent after the profile ends and is not part of it
+def profile_request(get_response, request, mode):
+	with profile_lock:
+		memory = mode == 'memory' and not tracemalloc.is_tracing()
+		if memory:
+			tracemalloc.start()
+		profiler = cProfile.Profile()
+		started = time.perf_counter()
+		try:
+			response = profiler.runcall(get_response, request)
+		finally:
+			seconds = time.perf_counter()-started
+			peak = None
+			if memory:
+				peak = tracemalloc.get_traced_memory()[1]
+				tracemalloc.stop()
+
+	match = getattr(request, 'resolver_match', None)
+	summary = {
+		'timestamp': datetime.now(timezone.utc).isoformat(),
+		'user': request.user.username,
+		'method': request.method,
+		'path': request.get_full_path(),
+		'view': match.view_name if match is not None else 'unresolved',
+		'status': response.status_code,
+		'seconds': seconds,
+		'peak_memory': peak,
+		'stats': stats_text(profiler),
+	}
+	response['X-Profile-Id'] = profiles.save(profiler, summary)
+	return response, summary
+
+
+profiles = Profiles()
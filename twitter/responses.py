@@ -0,0 +1,30 @@
+import hashlib
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+
+
+#Constant json payload encoded once, served with its ETag and answered with 304 when the client has it
+class StaticJson:
+
+	def __init__(self, payload):
+		#Same encoding as JsonResponse
+		self.content = json.dumps(payload, cls=DjangoJSONEncoder).encode('utf-8')
+		self.etag = '"{}"'.format(hashlib.sha1(self.content).hexdigest())
+		self.length = str(len(self.content))
+
+	#True if If-None-Match names this payload, weak validators match too
+	def not_modified(self, request):
+		etags = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+		return '*' in etags or any(etag.replace('W/', '', 1) == self.etag for etag in etags)
+
+	def response(self, request):
+		if request.method in ('GET', 'HEAD') and self.not_modified(request):
+			response = HttpResponseNotModified()
+		else:
+			response = HttpResponse(self.content, content_type='application/json')
+			response['Content-Length'] = self.length
+		response['ETag'] = self.etag
+		return response
@@ -0,0 +1,170 @@
+import hashlib
+import os
+import re
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+
+from .logstore import TIME_BUCKETS, get_store, log_paths, log_time
+from .models import LogRollup, LogRollupCursor
+
+#Periods kept in the rollup tables
+PERIODS = ('hour', 'day')
+
+#Number of log records counted in one transaction
+ROLLUP_BATCH = 50000
+
+#Action of a log record, first pattern found in its message wins
+ACTIONS = [
+	(re.compile(r' logs in$'), 'login'),
+	(re.compile(r' logs out$'), 'logout'),
+	(re.compile(r' signs up'), 'signup'),
+	(re.compile(r' visits profile page$'), 'view_profile'),
+	(re.compile(r' visits tweets page$'), 'view_tweets'),
+	(re.compile(r' accessing all user profiles'), 'view_user_profiles'),
+	(re.compile(r' accesses User:\S+ profile$'), 'view_user_profile'),
+	(re.compile(r' accesses User:\S+ profile in a batch$'), 'view_user_profiles_batch'),
+	(re.compile(r' accesses profiles of \d+ users$'), 'view_user_profiles_batch'),
+	(re.compile(r' accesses User:\S+ tweets$'), 'view_user_tweets'),
+	(re.compile(r' posted new tweet'), 'create_tweet'),
+	(re.compile(r' edited his tweet'), 'edit_tweet'),
+	(re.compile(r' deleted his tweet'), 'delete_tweet'),
+	(re.compile(r' requested an update of tweet'), 'request_tweet_update'),
+	(re.compile(r' requested deletion of tweet'), 'request_tweet_delete'),
+	(re.compile(r' requested posting of tweet'), 'request_tweet_create'),
+	(re.compile(r" requested an update of User:"), 'request_user_update'),
+	(re.compile(r' accesses requests related to user details'), 'view_user_requests'),
+	(re.compile(r' accesses requests related to CUD of tweets'), 'view_tweet_requests'),
+	(re.compile(r' approved request'), 'approve'),
+	(re.compile(r' rejected request'), 'reject'),
+	(re.compile(r' approved \d+ \w+ requests matching filter'), 'approve_by_filter'),
+	(re.compile(r' rejected \d+ \w+ requests matching filter'), 'reject_by_filter'),
+	(re.compile(r' claimed \d+ \w+ requests$'), 'claim'),
+	(re.compile(r' accessing logs'), 'view_logs'),
+	(re.compile(r' quering from logs'), 'query_logs'),
+	(re.compile(r' accessing metrics$'), 'view_metrics'),
+	(re.compile(r' profiled request to '), 'profile_request'),
+	(re.compile(r' accessing request profiles$'), 'view_profiles'),
+	(re.compile(r' downloads request profile '), 'download_profile'),
+	(re.compile(r' log records dropped'), 'dropped_logs'),
+]
+
+
+def log_action(log):
+	message = log.get('message')
+	if isinstance(message, str):
+		for pattern, action in ACTIONS:
+			if pattern.search(message):
+				return action
+	return 'other'
+
+
+#Rollup keys of a log record, one for every period
+def rollup_keys(log):
+	asctime = log_time(log)
+	source = str(log.get('source', ''))[:150]
+	log_type = str(log.get('log_type', ''))[:16]
+	action = log_action(log)
+	return [(period, asctime[:TIME_BUCKETS[period]], source, log_type, action) for period in PERIODS]
+
+
+#Rollup rows of the given keys, locked until the end of the transaction
+def locked_rollups(keys):
+	buckets = {(period, bucket) for period, bucket, _, _, _ in keys}
+	rollups = {}
+	for period in PERIODS:
+		names = [bucket for p, bucket in buckets if p == period]
+		if names:
+			for rollup in LogRollup.objects.select_for_update().filter(period=period, bucket__in=names):
+				key = (rollup.period, rollup.bucket, rollup.source, rollup.log_type, rollup.action)
+				if key in keys:
+					rollups[key] = rollup
+	return rollups
+
+
+#Add counts to the rollup tables with bulk writes, must run inside a transaction
+#Updaters of other log files can touch the same rows, so rows are locked before they are read
+def save_counts(counts):
+	rollups = locked_rollups(set(counts))
+	missing = [key for key in counts if key not in rollups]
+	if missing:
+		#Rows inserted by another updater meanwhile are kept, the counts are added to them below
+		#SQLite inserts at most 500 rows in one statement
+		LogRollup.objects.bulk_create([
+			LogRollup(period=period, bucket=bucket, source=source, log_type=log_type, action=action, count=0)
+			for period, bucket, source, log_type, action in missing
+		], batch_size=500, ignore_conflicts=True)
+		rollups.update(locked_rollups(set(missing)))
+
+	for key, count in counts.items():
+		rollups[key].count += count
+	LogRollup.objects.bulk_update(list(rollups.values()), ['count'], batch_size=1000)
+
+
+#Cursor name of a log file, its full path so files of the same name in other directories do not share it
+def cursor_name(path):
+	name = os.path.abspath(path)
+	if len(name) > 255:
+		name = 'sha1:' + hashlib.sha1(name.encode('utf-8', 'surrogateescape')).hexdigest()
+	return name
+
+
+#Count records of one log file appended since the last update, returns records counted
+def update_file(path):
+	name = cursor_name(path)
+	st = os.stat(path)
+	identity = '{}:{}'.format(st.st_dev, st.st_ino)
+	try:
+		cursor, _ = LogRollupCursor.objects.get_or_create(name=name)
+	except IntegrityError:
+		#Created by another updater at the same time, counted by whoever moves it first
+		cursor = LogRollupCursor.objects.filter(name=name).first()
+		if cursor is None:
+			return 0
+
+	#A replaced or truncated file is counted again from its start
+	offset = cursor.offset
+	if cursor.identity != identity or st.st_size < offset:
+		offset = 0
+
+	counts = Counter()
+	records = 0
+	end = offset
+	for end, log in get_store(path).records_after(offset):
+		for key in rollup_keys(log):
+			counts[key] += 1
+		records += 1
+		if records >= ROLLUP_BATCH:
+			break
+	if end == cursor.offset and identity == cursor.identity:
+		return 0
+
+	#Only one worker can move the cursor, the others roll back their counts
+	try:
+		with transaction.atomic():
+			moved = LogRollupCursor.objects.filter(id=cursor.id, offset=cursor.offset, identity=cursor.identity).update(offset=end, identity=identity)
+			if not moved:
+				raise IntegrityError('Rollup cursor of {} moved.'.format(name))
+			save_counts(counts)
+	except IntegrityError:
+		return 0
+	return records
+
+
+#Bring the rollup tables up to date with every log file
+def update_rollups(path):
+	total = 0
+	for file_path in log_paths(path):
+		while True:
+			records = update_file(file_path)
+			total += records
+			if records < ROLLUP_BATCH:
+				break
+	return total
+
+
+#Drop all rollups so they are counted again from the log files
+def clear_rollups():
+	with transaction.atomic():
+		LogRollup.objects.all().delete()
+		LogRollupCursor.objects.all().delete()
@@ -42,6 +42,10 @@ NORMAL_USER = {
 	"tweets": {
 		"url": "{}/user/tweets".format(domain),
 		"method": "GET",
+		"params": {
+			"limit": "<int: tweets per page, at most 200>",
+			"cursor": "next cursor of the previous page",
+		},
 	},
 	"new_tweet": {
 		"url": "{}/newtweet".format(domain),
@@ -80,13 +84,29 @@ ADMIN_USER = {
 		"url": "{}/user/<int: user_id>/profile".format(domain),
 		"method": "GET",
 	},
+	"some_user_profiles": {
+		"url": "{}/user/profiles".format(domain),
+		"method": "POST",
+		"body": {
+			"user_ids": ["<int: user_id>"],
+		},
+	},
 	"all_user_profiles": {
 		"url": "{}/all/user/profile".format(domain),
 		"method": "GET",
+		"params": {
+			"limit": "<int: users per page, at most 1000>",
+			"cursor": "next cursor of the previous page",
+			"q": "start of the username, first name or last name (optional)",
+		},
 	},
 	"some_user_tweets": {
 		"url": "{}/user/<int: user_id>/tweets".format(domain),
 		"method": "GET",
+		"params": {
+			"limit": "<int: tweets per page, at most 200>",
+			"cursor": "next cursor of the previous page",
+		},
 	},
 	"update_user_profile": {
 		"url": "{}/user/update/request".format(domain),
@@ -121,6 +141,47 @@ ADMIN_USER = {
 			"tweet": "tweet",
 		},
 	},
+	"update_user_profiles": {
+		"url": "{}/user/update/requests".format(domain),
+		"method": "POST",
+		"body": [
+			{
+				"user_id": "<int: user_id>",
+				"new_bio": "new_bio",
+				"new_first_name": "new_first_name",
+				"new_last_name": "new_last_name",
+			},
+		],
+	},
+	"update_tweets": {
+		"url": "{}/tweet/update/requests".format(domain),
+		"method": "POST",
+		"body": [
+			{
+				"tweet_id": "<int: tweet_id>",
+				"new_tweet": "updated_tweet",
+			},
+		],
+	},
+	"delete_tweets": {
+		"url": "{}/tweet/delete/requests".format(domain),
+		"method": "POST",
+		"body": [
+			{
+				"tweet_id": "<int: tweet_id>",
+			},
+		],
+	},
+	"create_tweets": {
+		"url": "{}/tweet/create/requests".format(domain),
+		"method": "POST",
+		"body": [
+			{
+				"user_id": "<int: user_id>",
+				"tweet": "tweet content",
+			},
+		],
+	},
 	"logout": {
 		"url": "{}/logout".format(domain),
 		"method": "GET",
@@ -155,6 +216,14 @@ SUPER_ADMIN_USER = {
 		"url": "{}/request/tweets".format(domain),
 		"method": "GET",
 	},
+	"claim_requests": {
+		"url": "{}/request/claim".format(domain),
+		"method": "POST",
+		"body": {
+			"type": "update_user, update_tweet, delete_tweet or create_tweet",
+			"count": "<int: number of requests to claim, at most 100>",
+		},
+	},
 	"response_to_update_user_requests": {
 		"url": "{}/respond/users".format(domain),
 		"method": "PUT",
@@ -195,9 +264,29 @@ SUPER_ADMIN_USER = {
 			},
 		],
 	},
+	"response_by_filter": {
+		"url": "{}/respond/filter".format(domain),
+		"method": "PUT",
+		"body": {
+			"type": "update_user, update_tweet, delete_tweet or create_tweet",
+			"action_granted": "true or false without quotes",
+			"filter": {
+				"admin": "username of the admin who made the requests",
+				"user": "username of the user the requests are made for",
+				"before": "requests made before this time, like 2020-12-20 14:18",
+				"after": "requests made after this time, like 2020-12-20 14:18",
+			},
+		},
+	},
 	"view_logs": {
 		"url": "{}/logs".format(domain),
 		"method": "GET",
+		"params": {
+			"limit": "<int: logs per page, at most 1000>",
+			"order": "asc or desc",
+			"before": "next cursor of a newest first page",
+			"after": "next cursor of an oldest first page",
+		},
 	},
 	"query_logs": {
 		"url": "{}/logs/query".format(domain),
@@ -212,8 +301,35 @@ SUPER_ADMIN_USER = {
 				"object": "user:username or tweet:tweet_id",
 				"message": "words that must be present in message of log",
 			},
+			"group_by": "source, log_type or object, or a list of them (optional)",
+			"bucket": "minute, hour or day to count per time bucket (optional)",
+			"top": "<int: only the N largest groups> (optional)",
+		},
+	},
+	"log_rollups": {
+		"url": "{}/logs/rollups".format(domain),
+		"method": "GET",
+		"params": {
+			"period": "hour or day",
+			"from": "oldest bucket to be considered. Time must be in asctime format",
+			"to": "latest bucket to be considered. Time must be in asctime format",
+			"source": "username of the user performing access/action/audit.",
+			"log_type": "action or audit or access (any one)",
+			"action": "action like login, create_tweet, approve or reject",
 		},
 	},
+	"request_profiles": {
+		"url": "{}/profiles".format(domain),
+		"method": "GET",
+	},
+	"download_request_profile": {
+		"url": "{}/profiles/<profile_id>".format(domain),
+		"method": "GET",
+	},
+	"metrics": {
+		"url": "{}/metrics".format(domain),
+		"method": "GET",
+	},
 	"logout": {
 		"url": "{}/logout".format(domain),
 		"method": "GET",
@@ -0,0 +1,92 @@
+from datetime import datetime
+from functools import lru_cache
+
+#Format of every timestamp sent to clients
+TIMESTAMP_FORMAT = "%b %d %Y, %I:%M %p"
+
+#Output key and lookup of every field, in the order of the serialize() methods of the models
+USER_FIELDS = (
+	("id", "id"),
+	("username", "username"),
+	("email", "email"),
+	("first_name", "first_name"),
+	("last_name", "last_name"),
+	("bio", "bio"),
+)
+
+TWEET_FIELDS = (
+	("id", "id"),
+	("user", "user_id"),
+	("timestamp", "timestamp"),
+	("tweet", "tweet"),
+)
+
+UPDATE_TWEET_FIELDS = (
+	("id", "id"),
+	("user", "tweet__user__username"),
+	("admin", "admin__username"),
+	("old_tweet", "tweet__tweet"),
+	("new_tweet", "new_tweet"),
+	("timestamp", "timestamp"),
+)
+
+DELETE_TWEET_FIELDS = (
+	("id", "id"),
+	("user", "tweet__user__username"),
+	("admin", "admin__username"),
+	("tweet", "tweet__tweet"),
+	("timestamp", "timestamp"),
+)
+
+CREATE_TWEET_FIELDS = (
+	("id", "id"),
+	("admin", "admin__username"),
+	("user_id", "userid"),
+	("tweet", "tweet"),
+	("timestamp", "timestamp"),
+)
+
+UPDATE_USER_FIELDS = (
+	("id", "id"),
+	("admin", "admin__username"),
+	("username", "user__username"),
+	("old_first_name", "user__first_name"),
+	("old_last_name", "user__last_name"),
+	("old_bio", "user__bio"),
+	("new_first_name", "new_first_name"),
+	("new_last_name", "new_last_name"),
+	("new_bio", "new_bio"),
+	("timestamp", "timestamp"),
+)
+
+
+#Timestamps are shown to the minute, so each minute is formatted once
+@lru_cache(maxsize=65536)
+def format_minute(year, month, day, hour, minute):
+	return datetime(year, month, day, hour, minute).strftime(TIMESTAMP_FORMAT)
+
+
+def format_timestamp(timestamp):
+	return format_minute(timestamp.year, timestamp.month, timestamp.day, timestamp.hour, timestamp.minute)
+
+
+def lookups(fields):
+	return [lookup for _, lookup in fields]
+
+
+#Dict of one values_list row, with the same keys and values as serialize()
+def serialize_row(fields, row):
+	data = {}
+	for (key, _), value in zip(fields, row):
+		data[key] = format_timestamp(value) if key == "timestamp" else value
+	return data
+
+
+#Serialize the rows of a queryset without building model instances, extra keys go last
+def serialize_values(queryset, fields, **extra):
+	rows = []
+	for row in queryset.values_list(*lookups(fields)):
+		data = serialize_row(fields, row)
+		data.update(extra)
+		rows.append(data)
+	return rows
@@ -0,0 +1,186 @@
+import logging
+
+from django.db import DatabaseError, transaction
+
+from .approvals import BULK_BATCH, name_error, write_logs
+from .models import User, Tweet, UpdateTweet, DeleteTweet, CreateTweet, UpdateUser
+from .saved_responses import BAD_REQUEST, REQUEST_FAILED, REQUEST_SUCCESS
+
+#Initializing logger
+logger = logging.getLogger('twitter_logs')
+
+#Failed inserts are reported to the default handlers, not the audit log
+errors = logging.getLogger(__name__)
+
+#Most requests submitted at once
+SUBMIT_BATCH_MAX = 1000
+
+
+#Id of a tweet or user as sent by the client, None if it cannot be one
+def object_id(value):
+	try:
+		return int(value)
+	except (TypeError, ValueError):
+		return None
+
+
+#Rows referenced by the items, loaded with a single query
+def load_objects(model, items, key):
+	ids = {object_id(item.get(key)) for item in items if isinstance(item, dict)}
+	ids.discard(None)
+	return model.objects.in_bulk(ids)
+
+
+#Stripped tweet text, or the error of the single request endpoints
+def tweet_text(tweet, empty_error):
+	if not tweet:
+		return None, {"error": empty_error}
+	tweet = tweet.strip() if isinstance(tweet, str) else ''
+	if len(tweet)==0 or len(tweet)>280:
+		return None, {"error": "tweet must be less than or equal to 280 characters and must not be empty."}
+	return tweet, None
+
+
+#Insert the valid requests together, every one of them fails if the insert fails
+def save_requests(u, model, results, rows, logs):
+	try:
+		with transaction.atomic():
+			model.objects.bulk_create([row for _, row in rows], batch_size=BULK_BATCH)
+	except DatabaseError:
+		errors.exception('Requests of Admin:%s failed', u.username)
+		for index, _ in rows:
+			results[index] = REQUEST_FAILED
+		return results
+
+	write_logs(logs)
+	return results
+
+
+#Admin requesting updates of tweets
+def submit_tweet_updates(u, items):
+	tweets = load_objects(Tweet, items, 'tweet_id')
+	results = []
+	rows = []
+	logs = []
+	for index, item in enumerate(items):
+		if not isinstance(item, dict):
+			results.append(BAD_REQUEST)
+			continue
+
+		#Check if tweet_id is valid
+		tweet = tweets.get(object_id(item.get('tweet_id')))
+		if tweet is None:
+			results.append({"error": "tweet not present."})
+			continue
+
+		#Check if new_tweet is valid
+		new_tweet, error = tweet_text(item.get('new_tweet'), "tweet cannot be empty.")
+		if error is not None:
+			results.append(error)
+			continue
+
+		results.append(REQUEST_SUCCESS)
+		rows.append((index, UpdateTweet(admin=u, tweet=tweet, new_tweet=new_tweet)))
+		logs.append(('Admin:{} requested an update of tweet with id:{}'.format(u.username, tweet.id), {'source': u.username, 'log_type': 'action', 'object': 'tweet:{}'.format(tweet.id)}))
+	return save_requests(u, UpdateTweet, results, rows, logs)
+
+
+#Admin requesting deletion of tweets
+def submit_tweet_deletes(u, items):
+	tweets = load_objects(Tweet, items, 'tweet_id')
+	results = []
+	rows = []
+	logs = []
+	for index, item in enumerate(items):
+		if not isinstance(item, dict):
+			results.append(BAD_REQUEST)
+			continue
+
+		#Check if tweet_id is valid
+		tweet = tweets.get(object_id(item.get('tweet_id')))
+		if tweet is None:
+			results.append({"error": "tweet not present."})
+			continue
+
+		results.append(REQUEST_SUCCESS)
+		rows.append((index, DeleteTweet(admin=u, tweet=tweet)))
+		logs.append(('Admin:{} requested deletion of tweet with id:{}'.format(u.username, tweet.id), {'source': u.username, 'log_type': 'action', 'object': 'tweet:{}'.format(tweet.id)}))
+	return save_requests(u, DeleteTweet, results, rows, logs)
+
+
+#Admin requesting tweets to be posted for users
+def submit_tweet_creates(u, items):
+	users = load_objects(User, items, 'user_id')
+	results = []
+	rows = []
+	logs = []
+	for index, item in enumerate(items):
+		if not isinstance(item, dict):
+			results.append(BAD_REQUEST)
+			continue
+
+		#Check if user_id is valid
+		user = users.get(object_id(item.get('user_id')))
+		if user is None:
+			results.append({"error": "user not present."})
+			continue
+		if user.is_staff or user.is_superuser:
+			results.append({"error": "not have access to tweet from this user."})
+			continue
+
+		#Check if tweet is valid
+		tweet, error = tweet_text(item.get('tweet'), "tweet not present.")
+		if error is not None:
+			results.append(error)
+			continue
+
+		results.append(REQUEST_SUCCESS)
+		rows.append((index, CreateTweet(admin=u, userid=user.id, tweet=tweet)))
+		logs.append(('Admin:{} requested posting of tweet from User:{}'.format(u.username, user.username), {'source': u.username, 'log_type': 'action', 'object': 'user:{}'.format(user.username)}))
+	return save_requests(u, CreateTweet, results, rows, logs)
+
+
+#Admin requesting updates of user details
+def submit_user_updates(u, items):
+	users = load_objects(User, items, 'user_id')
+	results = []
+	rows = []
+	logs = []
+	for index, item in enumerate(items):
+		if not isinstance(item, dict):
+			results.append(BAD_REQUEST)
+			continue
+
+		#Check if user_id is valid
+		user = users.get(object_id(item.get('user_id')))
+		if user is None:
+			results.append({"error": "user not present."})
+			continue
+		if user.is_staff or user.is_superuser:
+			results.append({"error": "not have access to update this user."})
+			continue
+
+		#Get updated details
+		new_first_name = item.get('new_first_name', '')
+		new_last_name = item.get('new_last_name', '')
+		new_bio = item.get('new_bio', '')
+		if not all(isinstance(value, str) for value in (new_first_name, new_last_name, new_bio)):
+			results.append(REQUEST_FAILED)
+			continue
+
+		#Check if atleast one field is present
+		if not (len(new_bio) or len(new_first_name) or len(new_last_name)):
+			results.append({"error": "Provide atleast one updated field."})
+			continue
+
+		#Names a user cannot have fail on their own instead of failing the whole batch
+		upuser = UpdateUser(admin=u, user=user, new_first_name=new_first_name, new_last_name=new_last_name, new_bio=new_bio)
+		error = name_error(upuser)
+		if error is not None:
+			results.append({"error": error})
+			continue
+
+		results.append(REQUEST_SUCCESS)
+		rows.append((index, upuser))
+		logs.append(("Admin:{} requested an update of User:{}'s profile".format(u.username, user.username), {'source': u.username, 'log_type': 'action', 'object': 'user:{}'.format(user.username)}))
+	return save_requests(u, UpdateUser, results, rows, logs)
@@ -0,0 +1,166 @@
+import json
+import random
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from .approvals import BULK_BATCH
+from .models import User, Tweet, UpdateTweet, DeleteTweet, CreateTweet, UpdateUser
+
+#Names picked for generated users, so the directory search has realistic prefixes
+FIRST_NAMES = ('james', 'mary', 'robert', 'patricia', 'john', 'jennifer', 'michael', 'linda', 'david', 'elizabeth', 'maria', 'arjun', 'priya', 'rahul', 'ananya', 'wei', 'yuki', 'omar', 'fatima', 'lucas')
+LAST_NAMES = ('smith', 'johnson', 'williams', 'brown', 'jones', 'garcia', 'miller', 'davis', 'sharma', 'patel', 'khan', 'singh', 'chen', 'wang', 'kim', 'tanaka', 'silva', 'martin', 'lopez', 'nguyen')
+WORDS = ('the', 'launch', 'today', 'team', 'shipping', 'new', 'feature', 'coffee', 'meeting', 'weekend', 'release', 'bug', 'fixed', 'great', 'work', 'deploy', 'friday', 'database', 'query', 'fast')
+
+#Users with the highest rank tweet the most, the n-th one about 1/n**skew as much as the first
+TWEET_SKEW = 1.1
+
+#Records written to the log file at a time
+LOG_BATCH = 10000
+
+
+#Let bulk_create keep the timestamps of generated rows instead of setting them to now
+@contextmanager
+def explicit_timestamps(*models):
+	fields = [model._meta.get_field('timestamp') for model in models]
+	try:
+		for field in fields:
+			field.auto_now_add = False
+		yield
+	finally:
+		for field in fields:
+			field.auto_now_add = True
+
+
+def random_time(rng, start, end):
+	return start + (end-start)*rng.random()
+
+
+def tweet_text(rng):
+	return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 30)))[:280]
+
+
+#Normal users, admins and superadmins named <prefix><role><n>, all sharing one password
+def generate_users(rng, prefix, users, admins, superadmins, password):
+	hashed = make_password(password)
+	rows = []
+	for role, count, is_staff, is_superuser in (('user', users, False, False), ('admin', admins, True, False), ('superadmin', superadmins, True, True)):
+		for i in range(count):
+			username = '{}{}{}'.format(prefix, role, i)
+			rows.append(User(
+				username=username,
+				email='{}@example.com'.format(username),
+				password=hashed,
+				first_name=rng.choice(FIRST_NAMES).title(),
+				last_name=rng.choice(LAST_NAMES).title(),
+				bio=tweet_text(rng),
+				is_staff=is_staff,
+				is_superuser=is_superuser,
+			))
+	with transaction.atomic():
+		User.objects.bulk_create(rows, batch_size=BULK_BATCH)
+	return User.objects.filter(username__startswith=prefix)
+
+
+#Tweets spread over the last days, most of them from a few users
+def generate_tweets(rng, user_ids, count, days):
+	if not user_ids or not count:
+		return
+	weights = list(accumulate(1/(rank+1)**TWEET_SKEW for rank in range(len(user_ids))))
+	end = datetime.now(timezone.utc)
+	start = end - timedelta(days=days)
+	with explicit_timestamps(Tweet):
+		for offset in range(0, count, BULK_BATCH):
+			authors = rng.choices(user_ids, cum_weights=weights, k=min(BULK_BATCH, count-offset))
+			with transaction.atomic():
+				Tweet.objects.bulk_create([Tweet(user_id=user_id, tweet=tweet_text(rng), timestamp=random_time(rng, start, end)) for user_id in authors])
+
+
+#Pending requests of every type, made by random admins over the last day
+def generate_requests(rng, admin_ids, user_ids, tweet_ids, count):
+	if not admin_ids or not user_ids or not tweet_ids or not count:
+		return
+	end = datetime.now(timezone.utc)
+	start = end - timedelta(days=1)
+	makers = (
+		(UpdateTweet, lambda: dict(tweet_id=rng.choice(tweet_ids), new_tweet=tweet_text(rng))),
+		(DeleteTweet, lambda: dict(tweet_id=rng.choice(tweet_ids))),
+		(CreateTweet, lambda: dict(userid=rng.choice(user_ids), tweet=tweet_text(rng))),
+		(UpdateUser, lambda: dict(user_id=rng.choice(user_ids), new_first_name=rng.choice(FIRST_NAMES).title(), new_last_name=rng.choice(LAST_NAMES).title(), new_bio=tweet_text(rng))),
+	)
+	with explicit_timestamps(*(model for model, _ in makers)):
+		for model, fields in makers:
+			with transaction.atomic():
+				model.objects.bulk_create([model(admin_id=rng.choice(admin_ids), timestamp=random_time(rng, start, end), **fields()) for _ in range(count)], batch_size=BULK_BATCH)
+
+
+#One log record as written by the views, made by a random user of its role
+def log_record(rng, asctime, users, admins, superadmins, tweet_ids):
+	kind = rng.random()
+	if kind < 0.5 or not (admins or superadmins):
+		user = rng.choice(users)
+		tweet_id = rng.choice(tweet_ids) if tweet_ids else 1
+		message, log_type, obj = rng.choice((
+			('{} logs in'.format(user), 'access', None),
+			('{} visits profile page'.format(user), 'access', None),
+			('User:{} visits tweets page'.format(user), 'access', None),
+			('User:{} posted new tweet with id:{}'.format(user, tweet_id), 'action', 'tweet:{}'.format(tweet_id)),
+			('User:{} edited his tweet with id:{}'.format(user, tweet_id), 'audit', 'tweet:{}'.format(tweet_id)),
+		))
+	elif kind < 0.85 or not superadmins:
+		user = rng.choice(admins)
+		other = rng.choice(users)
+		message, log_type, obj = rng.choice((
+			('Admin:{} accesses User:{} profile'.format(user, other), 'access', 'user:{}'.format(other)),
+			('Admin:{} accesses User:{} tweets'.format(user, other), 'access', 'user:{}'.format(other)),
+			('Admin:{} accessing all user profiles.'.format(user), 'access', None),
+			("Admin:{} requested an update of User:{}'s profile".format(user, other), 'action', 'user:{}'.format(other)),
+		))
+	else:
+		user = rng.choice(superadmins)
+		admin = rng.choice(admins) if admins else user
+		message, log_type, obj = rng.choice((
+			('Superadmin:{} accesses requests related to CUD of tweets'.format(user), 'access', None),
+			('Superadmin:{} accesses requests related to user details'.format(user), 'access', None),
+			('Superadmin:{} quering from logs'.format(user), 'access', None),
+			('Superadmin:{} rejected request to delete Tweet:{} from Admin:{}'.format(user, rng.choice(tweet_ids) if tweet_ids else 1, admin), 'audit', 'user:{}'.format(admin)),
+		))
+	log = {"asctime": asctime, "name": "twitter_logs", "message": message, "source": user, "log_type": log_type}
+	if obj is not None:
+		log["object"] = obj
+	return log
+
+
+#Append records to a log file in the format of the json formatter, spread over the last days
+def generate_logs(rng, path, count, days, users, admins, superadmins, tweet_ids):
+	if not users or not count:
+		return
+	end = datetime.now(timezone.utc)
+	start = end - timedelta(days=days)
+	step = (end-start)/count
+	with open(path, 'a') as f:
+		for offset in range(0, count, LOG_BATCH):
+			lines = []
+			for i in range(offset, min(offset+LOG_BATCH, count)):
+				moment = start + step*i
+				asctime = '{},{:03d}'.format(moment.strftime('%Y-%m-%d %H:%M:%S'), moment.microsecond//1000)
+				lines.append(json.dumps(log_record(rng, asctime, users, admins, superadmins, tweet_ids)) + '\n')
+			f.write(''.join(lines))
+
+
+#Whole dataset, users first as everything else points at them
+def generate(prefix, users, admins, superadmins, tweets, requests, logs, log_file, days=30, password='abcd12345', seed=0):
+	rng = random.Random(seed)
+	generated = generate_users(rng, prefix, users, admins, superadmins, password)
+	normal = list(generated.filter(is_staff=False).values_list('id', 'username'))
+	admin = list(generated.filter(is_staff=True, is_superuser=False).values_list('id', 'username'))
+	superadmin = list(generated.filter(is_superuser=True).values_list('username', flat=True))
+
+	normal_ids = [user_id for user_id, _ in normal]
+	generate_tweets(rng, normal_ids, tweets, days)
+	tweet_ids = list(Tweet.objects.filter(user__username__startswith=prefix).values_list('id', flat=True))
+	generate_requests(rng, [admin_id for admin_id, _ in admin], normal_ids, tweet_ids, requests)
+	generate_logs(rng, log_file, logs, days, [username for _, username in normal], [username for _, username in admin], superadmin, tweet_ids)
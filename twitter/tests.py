@@ -1,7 +1,130 @@
 from django.test import TestCase, Client
-from .models import User, Tweet, UpdateUser, UpdateTweet, DeleteTweet, CreateTweet
+from .models import User, Tweet, UpdateUser, UpdateTweet, DeleteTweet, CreateTweet, LogRollup, LogRollupCursor
+from .log_handlers import AsyncFileHandler
+from .approvals import BULK_BATCH, FILTER_MAX
+from .rollups import locked_rollups, log_action, save_counts, update_rollups
+from .metrics import registry, quantile
+from .synthetic import generate
+from .benchmarks import benchmark_logs, compare, run, save
+from .pagination import encode_cursor
+from .timelines import TIMELINE_CACHE, TIMELINE_CACHED, cached_timeline, invalidate_timelines
+from .auth_backends import AUTH_CACHE, CachedModelBackend, invalidate_users, user_key
+from .serializers import USER_FIELDS, TWEET_FIELDS, UPDATE_TWEET_FIELDS, DELETE_TWEET_FIELDS, CREATE_TWEET_FIELDS, UPDATE_USER_FIELDS, serialize_values
+from .logstore import LOG_FILE, Aggregation, LogStore, SealedSegment, check_cond, worker_path, query_logs, page_logs, refresh_logs
 from .saved_responses import *
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.http import JsonResponse
+from django.db.models import Count, Max, Min, Sum
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.core.cache import caches
 from django.urls import reverse
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.utils import timezone
+from pythonjsonlogger import jsonlogger
+from collections import Counter
+from datetime import timedelta
+from contextlib import ContextDecorator
+from itertools import islice
+from unittest import mock
+import io
+import json
+import logging
+import os
+import pstats
+import subprocess
+import tempfile
+import time
+
+#Sizes compared by the scaling checks, costs of a request must be the same at all of them
+SCALING_SIZES = (10, 1000)
+
+
+#File of the log store which counts the bytes read from it
+class CountingFile:
+
+	def __init__(self, f, spent):
+		self.f = f
+		self.spent = spent
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.f.close()
+
+	def __iter__(self):
+		for line in self.f:
+			self.spent.log_bytes_read += len(line)
+			yield line
+
+	def read(self, *args):
+		data = self.f.read(*args)
+		self.spent.log_bytes_read += len(data)
+		return data
+
+	def readline(self, *args):
+		line = self.f.readline(*args)
+		self.spent.log_bytes_read += len(line)
+		return line
+
+	def __getattr__(self, name):
+		return getattr(self.f, name)
+
+
+#Context manager and decorator failing when the code inside makes more queries
+#or reads more bytes of log files than allowed, index segments are not counted
+class budget(ContextDecorator):
+
+	def __init__(self, queries=None, log_bytes=None):
+		self.queries = queries
+		self.log_bytes = log_bytes
+
+	def open(self, path, mode='r', *args, **kwargs):
+		f = open(path, mode, *args, **kwargs)
+		if 'r' in mode and not path.endswith('.seg'):
+			return CountingFile(f, self)
+		return f
+
+	def __enter__(self):
+		self.log_bytes_read = 0
+		self.captured = CaptureQueriesContext(connection)
+		self.captured.__enter__()
+		self.patch = mock.patch('twitter.logstore.open', self.open, create=True)
+		self.patch.start()
+		return self
+
+	def __exit__(self, exc_type, exc, tb):
+		self.patch.stop()
+		self.captured.__exit__(exc_type, exc, tb)
+		if exc_type is not None:
+			return False
+		if self.queries is not None and len(self.captured) > self.queries:
+			raise AssertionError('{} queries made, at most {} allowed:\n{}'.format(len(self.captured), self.queries, '\n'.join(query['sql'] for query in self.captured)))
+		if self.log_bytes is not None and self.log_bytes_read > self.log_bytes:
+			raise AssertionError('{} bytes of logs read, at most {} allowed'.format(self.log_bytes_read, self.log_bytes))
+		return False
+
+
+#Checks that the cost of a request does not grow with the size of its input or of the data
+class PerformanceAssertions:
+
+	#setup(size) brings the data to size, request(size) is then run within the budget
+	#Queries must be the same and log bytes read at most double across the sizes
+	def assertDoesNotGrow(self, setup, request, sizes=SCALING_SIZES, queries=None, log_bytes=None):
+		costs = []
+		for size in sizes:
+			setup(size)
+			with budget(queries, log_bytes) as spent:
+				request(size)
+			costs.append(spent)
+
+		counts = {size: len(spent.captured) for size, spent in zip(sizes, costs)}
+		self.assertEqual(len(set(counts.values())), 1, 'Queries grow with the size: {}'.format(counts))
+		read = {size: spent.log_bytes_read for size, spent in zip(sizes, costs)}
+		self.assertLessEqual(max(read.values()), 2*min(read.values()), 'Log bytes read grow with the size: {}'.format(read))
+
+
 # Create your tests here.
 class CheckIndexView(TestCase):
 
@@ -35,6 +158,34 @@ class CheckIndexView(TestCase):
 		response = c.get('')
 		self.assertEqual(response.json(), SUPER_ADMIN_USER)
 
+	def test_index_bytes_match_json_response(self):
+		c = Client()
+		response = c.get('')
+		self.assertEqual(response.content, JsonResponse(ANONYMOUS_USER, safe=False).content)
+		self.assertEqual(response['Content-Type'], 'application/json')
+		self.assertEqual(int(response['Content-Length']), len(response.content))
+		self.assertTrue(response.has_header('ETag'))
+
+	def test_index_not_modified(self):
+		c = Client()
+		etag = c.get('')['ETag']
+		response = c.get('', HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(response.status_code, 304)
+		self.assertEqual(response.content, b'')
+
+		#Each role gets its own payload, so another role's ETag does not match
+		c.login(username='bar', password='abcd12345')
+		response = c.get('', HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(response.json(), NORMAL_USER)
+
+	def test_help_payload_not_modified(self):
+		c = Client()
+		response = c.get(reverse('login'))
+		self.assertEqual(response.json()["method"], "POST")
+		response = c.get(reverse('login'), HTTP_IF_NONE_MATCH='W/{}'.format(response['ETag']))
+		self.assertEqual(response.status_code, 304)
+
 
 class CheckLoginRegisterLogoutView(TestCase):
 
@@ -113,6 +264,9 @@ class CheckUserViews(TestCase):
 			cls.tweets.append(Tweet.objects.create(user=u, tweet='Hello there !!! {}'.format(i)))
 		
 
+	def setUp(self):
+		caches[TIMELINE_CACHE].clear()
+
 	def test_user_profile_success(self):
 		client = Client()
 		client.login(username='bar', password='abcd12345')
@@ -123,7 +277,72 @@ class CheckUserViews(TestCase):
 		client = Client()
 		client.login(username='bar', password='abcd12345')
 		response = client.get('/user/tweets')
-		self.assertEqual(len(response.json()), 10)
+		self.assertEqual(len(response.json()['tweets']), 10)
+		self.assertEqual(response.json()['next'], None)
+
+	def test_user_tweets_pages(self):
+		client = Client()
+		client.login(username='bar', password='abcd12345')
+		seen = []
+		cursor = None
+		while True:
+			params = {'limit': 3}
+			if cursor:
+				params['cursor'] = cursor
+			page = client.get('/user/tweets', params).json()
+			self.assertLessEqual(len(page['tweets']), 3)
+			seen.extend(tweet['id'] for tweet in page['tweets'])
+			cursor = page['next']
+			if cursor is None:
+				break
+		self.assertEqual(seen, [tweet.id for tweet in sorted(self.tweets, key=lambda t: (t.timestamp, t.id), reverse=True)])
+
+	def test_user_tweets_invalid_cursor(self):
+		client = Client()
+		client.login(username='bar', password='abcd12345')
+		response = client.get('/user/tweets', {'cursor': 'abc'})
+		self.assertEqual(response.json(), {"error": "Invalid limit or cursor."})
+		response = client.get('/user/tweets', {'limit': 1000})
+		self.assertEqual(response.json(), {"error": "Invalid limit or cursor."})
+
+	def test_user_tweets_read_from_cache(self):
+		client = Client()
+		client.login(username='bar', password='abcd12345')
+		first = client.get('/user/tweets', {'limit': 4}).json()
+		with CaptureQueriesContext(connection) as queries:
+			second = client.get('/user/tweets', {'limit': 4}).json()
+			client.get('/user/tweets', {'limit': 4, 'cursor': first['next']})
+		self.assertEqual(first, second)
+		self.assertFalse([q for q in queries if 'twitter_tweet' in q['sql']])
+
+	def test_user_tweets_cache_invalidated_by_writes(self):
+		client = Client()
+		client.login(username='bar', password='abcd12345')
+		client.get('/user/tweets')
+		client.post('/newtweet', {'tweet': "Fresh tweet"}, content_type='application/json')
+		self.assertEqual(client.get('/user/tweets').json()['tweets'][0]['tweet'], "Fresh tweet")
+		client.put('/edittweet', {'tweet_id': self.tweets[9].id, 'new_tweet': 'Edited tweet'}, content_type='application/json')
+		self.assertIn('Edited tweet', [t['tweet'] for t in client.get('/user/tweets').json()['tweets']])
+		client.put('/deletetweet', {'tweet_id': self.tweets[8].id}, content_type='application/json')
+		self.assertNotIn(self.tweets[8].id, [t['id'] for t in client.get('/user/tweets').json()['tweets']])
+
+	def test_user_tweets_beyond_cache(self):
+		client = Client()
+		client.login(username='bar', password='abcd12345')
+		user = User.objects.get(username='bar')
+		Tweet.objects.bulk_create([Tweet(user=user, tweet='Old tweet {}'.format(i)) for i in range(TIMELINE_CACHED)])
+		seen = []
+		cursor = None
+		while True:
+			params = {'limit': 200}
+			if cursor:
+				params['cursor'] = cursor
+			page = client.get('/user/tweets', params).json()
+			seen.extend(tweet['id'] for tweet in page['tweets'])
+			cursor = page['next']
+			if cursor is None:
+				break
+		self.assertEqual(seen, list(Tweet.objects.filter(user=user).order_by('-timestamp', '-id').values_list('id', flat=True)))
 
 	def test_edit_tweets_not_present(self):
 		client = Client()
@@ -191,11 +410,84 @@ class CheckAdminViews(TestCase):
 		for i in range(5):
 			cls.tweets_u2.append(Tweet.objects.create(user=cls.u2, tweet='Hi there !!! {}'.format(i)))
 
+	def setUp(self):
+		caches[TIMELINE_CACHE].clear()
+
 	def test_all_user_profile_view(self):
 		c = Client()
 		c.login(username='foo1', password='abcd12345')
 		response = c.get('/all/user/profile')
-		self.assertEqual(len(response.json()), 2)
+		self.assertEqual(len(response.json()['users']), 2)
+		self.assertEqual(response.json()['next'], None)
+
+	def test_batch_user_profiles(self):
+		c = Client()
+		c.login(username='foo1', password='abcd12345')
+		c.get(reverse('profile'))
+
+		#Session and user come from the auth cache, users from one query
+		with self.assertNumQueries(1):
+			response = c.post(reverse('userprofiles'), {"user_ids": [self.u2.id, 1000, self.a2.id, self.u1.id]}, content_type='application/json')
+		self.assertEqual(response.json(), [
+			User.objects.get(id=self.u2.id).serialize(),
+			{"id": 1000, "error": "user does not exist."},
+			{"id": self.a2.id, "error": "Bad Request."},
+			User.objects.get(id=self.u1.id).serialize(),
+		])
+
+	def test_batch_user_profiles_logged_per_user(self):
+		c = Client()
+		c.login(username='foo1', password='abcd12345')
+		with tempfile.TemporaryDirectory() as log_dir:
+			path = os.path.join(log_dir, 'twitter_logs.log')
+			with benchmark_logs(path):
+				c.post(reverse('userprofiles'), {"user_ids": [self.u2.id, self.a2.id, self.u1.id]}, content_type='application/json')
+			for user in (self.u2, self.u1):
+				logs = list(query_logs(path, {"log_type": "access", "object": "user:{}".format(user.username)}))
+				self.assertEqual([log['message'] for log in logs], ['Admin:foo1 accesses User:{} profile in a batch'.format(user.username)])
+				self.assertEqual(log_action(logs[0]), 'view_user_profiles_batch')
+			self.assertEqual(list(query_logs(path, {"object": "user:{}".format(self.a2.username)})), [])
+
+	def test_batch_user_profiles_failed(self):
+		c = Client()
+		c.login(username='bar1', password='abcd12345')
+		response = c.post(reverse('userprofiles'), {"user_ids": [self.u2.id]}, content_type='application/json')
+		self.assertEqual(response.json(), BAD_REQUEST)
+		c.login(username='foo1', password='abcd12345')
+		response = c.post(reverse('userprofiles'), {"user_ids": "1,2"}, content_type='application/json')
+		self.assertIn('error', response.json())
+
+	def test_all_user_profile_pages(self):
+		c = Client()
+		c.login(username='foo1', password='abcd12345')
+		User.objects.bulk_create([User(username='user{}'.format(i), email='user{}@gmail.com'.format(i)) for i in range(5)])
+		seen = []
+		params = {'limit': 2}
+		while True:
+			page = c.get('/all/user/profile', params).json()
+			self.assertLessEqual(len(page['users']), 2)
+			seen.extend(user['username'] for user in page['users'])
+			if page['next'] is None:
+				break
+			params['cursor'] = page['next']
+		self.assertEqual(seen, ['bar1', 'bar2'] + ['user{}'.format(i) for i in range(5)])
+		response = c.get('/all/user/profile', {'cursor': 'abc'})
+		self.assertEqual(response.json(), {"error": "Invalid limit or cursor."})
+
+	def test_all_user_profile_prefix_search(self):
+		c = Client()
+		c.login(username='foo1', password='abcd12345')
+		User.objects.filter(id=self.u2.id).update(first_name='Zed', last_name='Stone')
+		self.assertEqual([user['username'] for user in c.get('/all/user/profile', {'q': 'BAR'}).json()['users']], ['bar1', 'bar2'])
+		self.assertEqual([user['username'] for user in c.get('/all/user/profile', {'q': 'zE'}).json()['users']], ['bar2'])
+		self.assertEqual([user['username'] for user in c.get('/all/user/profile', {'q': 'sto'}).json()['users']], ['bar2'])
+		self.assertEqual(c.get('/all/user/profile', {'q': 'foo'}).json()['users'], [])
+
+	def test_user_prefix_search_uses_indexes(self):
+		if connection.vendor != 'sqlite':
+			self.skipTest('Plan checked on SQLite only.')
+		plan = User.objects.filter(username__istartswith='ba').explain()
+		self.assertIn('twitter_user_username_prefix', plan)
 
 	def test_access_other_user_profile_success(self):
 		c = Client()
@@ -215,6 +507,15 @@ class CheckAdminViews(TestCase):
 		response = c.get(reverse('usertweets', args=[self.u1.id]))
 		self.assertEqual(len(response.json()['tweets']), 10)
 
+	def test_access_user_tweets_second_page(self):
+		c = Client()
+		c.login(username='foo1', password='abcd12345')
+		first = c.get(reverse('usertweets', args=[self.u1.id]), {'limit': 6}).json()
+		second = c.get(reverse('usertweets', args=[self.u1.id]), {'limit': 6, 'cursor': first['next']}).json()
+		self.assertEqual(len(first['tweets']), 6)
+		self.assertEqual(len(second['tweets']), 4)
+		self.assertEqual(second['next'], None)
+
 	def test_access_user_tweets_failed(self):
 		c = Client()
 		c.login(username='foo1', password='abcd12345')
@@ -303,6 +604,77 @@ class CheckAdminViews(TestCase):
 			}, content_type='application/json')
 		self.assertEqual(response.json(), {"error": "Provide atleast one updated field."})
 
+	def test_bulk_tweet_requests(self):
+		c = Client()
+		c.login(username='foo1', password='abcd12345')
+		response = c.post(reverse('update_tweet_requests'), [
+			{"tweet_id": self.tweets_u1[0].id, "new_tweet": "Bulk update"},
+			{"tweet_id": 1000, "new_tweet": "Bulk update"},
+			{"tweet_id": self.tweets_u1[1].id, "new_tweet": "x"*281},
+			{"tweet_id": self.tweets_u1[2].id},
+		], content_type='application/json')
+		self.assertEqual(response.json(), [
+			REQUEST_SUCCESS,
+			{"error": "tweet not present."},
+			{"error": "tweet must be less than or equal to 280 characters and must not be empty."},
+			{"error": "tweet cannot be empty."},
+		])
+		self.assertEqual(UpdateTweet.objects.filter(new_tweet="Bulk update").count(), 1)
+
+		response = c.post(reverse('delete_tweet_requests'), [
+			{"tweet_id": self.tweets_u2[0].id}, {"tweet_id": "abc"},
+		], content_type='application/json')
+		self.assertEqual(response.json(), [REQUEST_SUCCESS, {"error": "tweet not present."}])
+
+		response = c.post(reverse('create_tweet_requests'), [
+			{"user_id": self.u1.id, "tweet": "Bulk tweet"},
+			{"user_id": self.a2.id, "tweet": "Bulk tweet"},
+			{"user_id": self.u2.id},
+			{"user_id": 1000, "tweet": "Bulk tweet"},
+		], content_type='application/json')
+		self.assertEqual(response.json(), [
+			REQUEST_SUCCESS,
+			{"error": "not have access to tweet from this user."},
+			{"error": "tweet not present."},
+			{"error": "user not present."},
+		])
+
+	def test_bulk_user_requests_in_constant_queries(self):
+		c = Client()
+		c.login(username='foo1', password='abcd12345')
+		c.get(reverse('profile'))
+		counts = []
+		for size in (2, 40):
+			items = [{"user_id": [self.u1.id, self.u2.id][i%2], "new_bio": "Bulk bio {}".format(i)} for i in range(size)]
+			with CaptureQueriesContext(connection) as queries:
+				response = c.post(reverse('update_user_requests'), items, content_type='application/json')
+			self.assertEqual(response.json(), [REQUEST_SUCCESS]*size)
+			counts.append(len(queries))
+		self.assertEqual(counts[0], counts[1])
+		self.assertEqual(UpdateUser.objects.filter(new_bio__startswith="Bulk bio").count(), 42)
+
+		response = c.post(reverse('update_user_requests'), [{"user_id": self.u1.id}, {"user_id": self.sa.id, "new_bio": "bio"}], content_type='application/json')
+		self.assertEqual(response.json(), [{"error": "Provide atleast one updated field."}, {"error": "not have access to update this user."}])
+
+	def test_bulk_user_requests_with_too_long_name(self):
+		c = Client()
+		c.login(username='foo1', password='abcd12345')
+		max_length = User._meta.get_field('last_name').max_length
+		response = c.post(reverse('update_user_requests'), [
+			{"user_id": self.u1.id, "new_last_name": "a"*(max_length+1)},
+			{"user_id": self.u2.id, "new_last_name": "a"*max_length},
+		], content_type='application/json')
+		self.assertEqual(response.json(), [{"error": "new_last_name must be at most {} characters.".format(max_length)}, REQUEST_SUCCESS])
+		self.assertEqual(UpdateUser.objects.filter(new_last_name__startswith="a").count(), 1)
+
+	def test_bulk_requests_failed_insert(self):
+		c = Client()
+		c.login(username='foo1', password='abcd12345')
+		with mock.patch.object(UpdateUser.objects, 'bulk_create', side_effect=DatabaseError('insert failed')):
+			with self.assertLogs('twitter.submissions', 'ERROR'):
+				response = c.post(reverse('update_user_requests'), [{"user_id": self.u1.id, "new_bio": "bio"}], content_type='application/json')
+		self.assertEqual(response.json(), [REQUEST_FAILED])
+
 
 class CheckSuperAdminViews(TestCase):
 
@@ -336,6 +708,21 @@ class CheckSuperAdminViews(TestCase):
 		cls.update_user.append(UpdateUser.objects.create(admin=cls.a1, user=cls.u1, new_bio="bio updated from admin"))
 		cls.update_user.append(UpdateUser.objects.create(admin=cls.a1, user=cls.u2, new_bio="bio updated from admin"))
 
+	def setUp(self):
+		caches[TIMELINE_CACHE].clear()
+
+	def test_values_serializers_match_models(self):
+		checks = [
+			(User.objects.order_by('id'), USER_FIELDS, {}),
+			(Tweet.objects.order_by('id'), TWEET_FIELDS, {}),
+			(UpdateTweet.objects.order_by('id'), UPDATE_TWEET_FIELDS, {"action": "update"}),
+			(DeleteTweet.objects.order_by('id'), DELETE_TWEET_FIELDS, {"action": "delete"}),
+			(CreateTweet.objects.order_by('id'), CREATE_TWEET_FIELDS, {"action": "create"}),
+			(UpdateUser.objects.order_by('id'), UPDATE_USER_FIELDS, {"action": "update"}),
+		]
+		for queryset, fields, extra in checks:
+			self.assertEqual(json.dumps(serialize_values(queryset, fields, **extra)), json.dumps([row.serialize() for row in queryset]))
+
 	def test_accessing_user_update_requests_success(self):
 		c = Client()
 		c.login(username='abc', password='abcd12345')
@@ -357,6 +744,44 @@ class CheckSuperAdminViews(TestCase):
 		self.assertEqual(len(response.json()['update_request']), 4)
 		self.assertEqual(len(response.json()['delete_request']), 4)
 
+	def test_request_queues_query_count_does_not_grow(self):
+		c = Client()
+		c.login(username='abc', password='abcd12345')
+		c.get(reverse('profile'))
+		counts = []
+		for extra in (0, 20):
+			for i in range(extra):
+				UpdateTweet.objects.create(admin=self.a2, tweet=self.tweets_u2[i%5], new_tweet="Update {}".format(i))
+				DeleteTweet.objects.create(admin=self.a2, tweet=self.tweets_u2[i%5])
+				CreateTweet.objects.create(admin=self.a2, userid=self.u1.id, tweet="New {}".format(i))
+				UpdateUser.objects.create(admin=self.a2, user=self.u2, new_bio="bio {}".format(i))
+			with CaptureQueriesContext(connection) as queries:
+				self.assertEqual(len(c.get(reverse('request_tweets')).json()['update_request']), 4+extra)
+				self.assertEqual(len(c.get(reverse('request_user')).json()), 2+extra)
+			counts.append(len(queries))
+		self.assertEqual(counts[0], counts[1])
+
+		#Session and user come from the auth cache, one query per queue
+		with self.assertNumQueries(3):
+			c.get(reverse('request_tweets'))
+		with self.assertNumQueries(1):
+			c.get(reverse('request_user'))
+
+	def test_request_queues_use_pending_indexes(self):
+		if connection.vendor not in ('sqlite', 'postgresql'):
+			self.skipTest('Partial indexes are not supported.')
+		if connection.vendor == 'postgresql':
+			with connection.cursor() as cursor:
+				cursor.execute('SET LOCAL enable_seqscan = off')
+		queues = [
+			(UpdateUser, 'twitter_upuser_pending_idx'),
+			(UpdateTweet, 'twitter_uptweet_pending_idx'),
+			(DeleteTweet, 'twitter_deltweet_pending_idx'),
+			(CreateTweet, 'twitter_newtweet_pending_idx'),
+		]
+		for model, index in queues:
+			self.assertIn(index, model.objects.filter(responded=False).order_by("timestamp").explain())
+
 	def test_responding_user_update_request_id_not_present(self):
 		c = Client()
 		c.login(username='abc', password='abcd12345')
@@ -441,11 +866,239 @@ class CheckSuperAdminViews(TestCase):
 		self.assertEqual(response.json(), [{"request_id": self.create_tweets[1].id, 'message': 'Response saved.'
 			}])
 
+	def test_responding_many_requests_in_constant_queries(self):
+		c = Client()
+		c.login(username='abc', password='abcd12345')
+		c.get(reverse('profile'))
+		counts = []
+		for size in (2, 20):
+			requests = [CreateTweet.objects.create(admin=self.a2, userid=self.u1.id, tweet="Bulk tweet {}".format(i)) for i in range(size)]
+			with CaptureQueriesContext(connection) as queries:
+				response = c.put(reverse('respond_tweets_create'), [
+					{"request_id": r.id, "action_granted": i%2 == 0} for i, r in enumerate(requests)
+				], content_type='application/json')
+			counts.append(len([q for q in queries if not q['sql'].startswith('INSERT INTO "twitter_tweet"')]))
+			self.assertEqual(response.json(), [{"request_id": r.id, "message": "Response saved."} for r in requests])
+		self.assertEqual(counts[0], counts[1])
+		self.assertEqual(Tweet.objects.filter(user=self.u1, tweet__startswith="Bulk tweet").count(), 11)
+
+	def test_responding_with_too_long_name_fails_alone(self):
+		c = Client()
+		c.login(username='abc', password='abcd12345')
+		long_name = UpdateUser.objects.create(admin=self.a1, user=self.u1, new_first_name='a'*31)
+		response = c.put(reverse('respond_users'), [
+			{"request_id": long_name.id, "action_granted": True},
+			{"request_id": self.update_user[1].id, "action_granted": True},
+		], content_type='application/json')
+		self.assertEqual(response.json(), [
+			{"request_id": long_name.id, "error": "new_first_name must be at most 30 characters."},
+			{"request_id": self.update_user[1].id, "message": "Response saved."},
+		])
+		self.assertFalse(UpdateUser.objects.get(id=long_name.id).responded)
+		self.assertEqual(User.objects.get(id=self.u2.id).bio, "bio updated from admin")
+
+	def test_responding_with_malformed_body(self):
+		c = Client()
+		c.login(username='abc', password='abcd12345')
+		for name in ('respond_users', 'respond_tweets_update', 'respond_tweets_delete', 'respond_tweets_create'):
+			for body in ([1], {"request_id": 1}):
+				response = c.put(reverse(name), body, content_type='application/json')
+				self.assertEqual(response.json(), {"error": "Body must be a list of responses."})
+
+	def test_responding_tweet_update_requests_together(self):
+		c = Client()
+		c.login(username='abc', password='abcd12345')
+		response = c.put(reverse('respond_tweets_update'), [
+			{"request_id": 1000, "action_granted": True},
+			{"request_id": self.update_tweets[2].id, "action_granted": True},
+			{"request_id": self.update_tweets[3].id, "action_granted": False},
+		], content_type='application/json')
+		self.assertEqual(response.json(), [
+			{"request_id": 1000, "error": "Id not present."},
+			{"request_id": self.update_tweets[2].id, "message": "Response saved."},
+			{"request_id": self.update_tweets[3].id, "message": "Response saved."},
+		])
+		self.assertEqual(Tweet.objects.get(id=self.tweets_u1[2].id).tweet, "Update from admin 2")
+		self.assertEqual(Tweet.objects.get(id=self.tweets_u1[3].id).tweet, "Hello there !!! 3")
+		self.assertEqual(UpdateTweet.objects.filter(responded=True, action_granted=True).count(), 1)
+
+	def test_responding_tweet_delete_requests_together(self):
+		c = Client()
+		c.login(username='abc', password='abcd12345')
+		response = c.put(reverse('respond_tweets_delete'), [
+			{"request_id": self.delete_tweets[2].id, "action_granted": True},
+			{"request_id": self.delete_tweets[3].id, "action_granted": False},
+			{"request_id": 1000, "action_granted": True},
+		], content_type='application/json')
+		self.assertEqual(response.json()[2], {"request_id": 1000, "error": "Id not present"})
+		self.assertFalse(Tweet.objects.filter(id=self.tweets_u1[7].id).exists())
+		self.assertTrue(DeleteTweet.objects.get(id=self.delete_tweets[3].id).responded)
+
+	def test_claiming_disjoint_batches(self):
+		User.objects.create_user(username="abd", email="abd@gmail.com", password="abcd12345", is_staff=True, is_superuser=True)
+		c1 = Client()
+		c1.login(username='abc', password='abcd12345')
+		c2 = Client()
+		c2.login(username='abd', password='abcd12345')
+		first = c1.post(reverse('request_claim'), {"type": "create_tweet", "count": 3}, content_type='application/json').json()['requests']
+		second = c2.post(reverse('request_claim'), {"type": "create_tweet", "count": 3}, content_type='application/json').json()['requests']
+		self.assertEqual([r['id'] for r in first], [r.id for r in self.create_tweets[:3]])
+		self.assertEqual([r['id'] for r in second], [self.create_tweets[3].id])
+
+		#Requests claimed by another superadmin cannot be answered
+		response = c2.put(reverse('respond_tweets_create'), [
+			{"request_id": self.create_tweets[0].id, "action_granted": True},
+			{"request_id": self.create_tweets[3].id, "action_granted": True},
+		], content_type='application/json')
+		self.assertEqual(response.json(), [
+			{"request_id": self.create_tweets[0].id, "error": "Request claimed by another superadmin."},
+			{"request_id": self.create_tweets[3].id, "message": "Response saved."},
+		])
+
+	def test_claims_expire(self):
+		c = Client()
+		c.login(username='abc', password='abcd12345')
+		UpdateUser.objects.filter(id=self.update_user[0].id).update(claimed_by=self.a1, claimed_at=timezone.now()-timedelta(hours=1))
+		response = c.post(reverse('request_claim'), {"type": "update_user", "count": 5}, content_type='application/json')
+		self.assertEqual(len(response.json()['requests']), 2)
+		response = c.post(reverse('request_claim'), {"type": "update_user", "count": 5}, content_type='application/json')
+		self.assertEqual(response.json()['requests'], [])
+
+	def test_claiming_invalid(self):
+		c = Client()
+		c.login(username='abc', password='abcd12345')
+		for body in ({"type": "tweet"}, {"type": "update_tweet", "count": 0}, {"type": "update_tweet", "count": "5"}):
+			response = c.post(reverse('request_claim'), body, content_type='application/json')
+			self.assertIn('error', response.json())
+
+	def test_responding_twice_is_rejected(self):
+		c = Client()
+		c.login(username='abc', password='abcd12345')
+		response = c.put(reverse('respond_tweets_create'), [
+			{"request_id": self.create_tweets[0].id, "action_granted": True},
+			{"request_id": self.create_tweets[0].id, "action_granted": True},
+		], content_type='application/json')
+		self.assertEqual(response.json()[1], {"request_id": self.create_tweets[0].id, "error": "Request already responded."})
+		response = c.put(reverse('respond_tweets_create'), [
+			{"request_id": self.create_tweets[0].id, "action_granted": True},
+		], content_type='application/json')
+		self.assertEqual(response.json(), [{"request_id": self.create_tweets[0].id, "error": "Request already responded."}])
+		self.assertEqual(Tweet.objects.filter(tweet="New tweet created from admin 0").count(), 1)
+
+	def test_approved_requests_invalidate_timelines(self):
+		c = Client()
+		c.login(username='abc', password='abcd12345')
+		a = Client()
+		a.login(username='foo1', password='abcd12345')
+		self.assertEqual(len(a.get(reverse('usertweets', args=[self.u2.id])).json()['tweets']), 5)
+		self.assertEqual(len(a.get(reverse('usertweets', args=[self.u1.id])).json()['tweets']), 10)
+		c.put(reverse('respond_tweets_create'), [{"request_id": self.create_tweets[0].id, "action_granted": True}], content_type='application/json')
+		self.assertEqual(len(a.get(reverse('usertweets', args=[self.u2.id])).json()['tweets']), 6)
+		c.put(reverse('respond_tweets_delete'), [{"request_id": self.delete_tweets[0].id, "action_granted": True}], content_type='application/json')
+		c.put(reverse('respond_tweets_update'), [{"request_id": self.update_tweets[0].id, "action_granted": True}], content_type='application/json')
+		tweets = a.get(reverse('usertweets', args=[self.u1.id])).json()['tweets']
+		self.assertEqual(len(tweets), 9)
+		self.assertIn("Update from admin 0", [t['tweet'] for t in tweets])
+
+	def test_timeline_cached_before_commit_not_read(self):
+		callbacks = []
+		with mock.patch('twitter.timelines.transaction.on_commit', callbacks.append):
+			invalidate_timelines([self.u1.id])
+		#A request reading the timeline before the commit caches the old tweets
+		old = cached_timeline(self.u1.id)
+		Tweet.objects.create(user=self.u1, tweet='Posted before commit')
+		self.assertEqual(cached_timeline(self.u1.id)["tweets"][0]["tweet"], old["tweets"][0]["tweet"])
+		for callback in callbacks:
+			callback()
+		self.assertEqual(cached_timeline(self.u1.id)["tweets"][0]["tweet"], 'Posted before commit')
+
+	def test_rejecting_requests_by_filter(self):
+		c = Client()
+		c.login(username='abc', password='abcd12345')
+		DeleteTweet.objects.create(admin=self.a2, tweet=self.tweets_u2[0])
+		response = c.put(reverse('respond_filter'), {
+			"type": "delete_tweet", "action_granted": False, "filter": {"admin": "foo1"}
+			}, content_type='application/json')
+		self.assertEqual(response.json()['count'], 4)
+		self.assertEqual(DeleteTweet.objects.filter(responded=False).count(), 1)
+		self.assertEqual(Tweet.objects.filter(user=self.u1).count(), 10)
+
+	def test_approving_requests_by_filter(self):
+		c = Client()
+		c.login(username='abc', password='abcd12345')
+		response = c.put(reverse('respond_filter'), {
+			"type": "update_user", "action_granted": True, "filter": {"user": "bar2"}
+			}, content_type='application/json')
+		self.assertEqual(response.json()['responses'], [{"request_id": self.update_user[1].id, "message": "Response saved."}])
+		self.assertEqual(User.objects.get(id=self.u2.id).bio, "bio updated from admin")
+		self.assertFalse(UpdateUser.objects.get(id=self.update_user[0].id).responded)
+
+		#Already responded requests do not match again
+		response = c.put(reverse('respond_filter'), {
+			"type": "update_user", "action_granted": False, "filter": {"user": "bar2"}
+			}, content_type='application/json')
+		self.assertEqual(response.json()['count'], 0)
+
+	def test_responding_by_filter_in_parts(self):
+		c = Client()
+		c.login(username='abc', password='abcd12345')
+		body = {"type": "delete_tweet", "action_granted": False, "filter": {"admin": "foo1"}}
+		with mock.patch('twitter.approvals.FILTER_MAX', 3), mock.patch('twitter.approvals.FILTER_LISTED', 2):
+			#Only the oldest requests are answered and the others are left for the next call
+			response = c.put(reverse('respond_filter'), body, content_type='application/json')
+			self.assertEqual(response.json(), {"count": 3, "failed": 0, "remaining": 1, "errors": []})
+			response = c.put(reverse('respond_filter'), body, content_type='application/json')
+			self.assertEqual(response.json()['remaining'], 0)
+			self.assertEqual(len(response.json()['responses']), 1)
+		self.assertEqual(DeleteTweet.objects.filter(responded=False).count(), 0)
+
+	def test_responding_by_filter_with_time_range(self):
+		c = Client()
+		c.login(username='abc', password='abcd12345')
+		response = c.put(reverse('respond_filter'), {
+			"type": "create_tweet", "action_granted": True, "filter": {"user": "bar2", "before": "2000-01-01 00:00"}
+			}, content_type='application/json')
+		self.assertEqual(response.json()['count'], 0)
+		response = c.put(reverse('respond_filter'), {
+			"type": "create_tweet", "action_granted": True, "filter": {"user": "bar2", "after": "2000-01-01 00:00"}
+			}, content_type='application/json')
+		self.assertEqual(response.json()['count'], 4)
+		self.assertEqual(Tweet.objects.filter(user=self.u2, tweet__startswith="New tweet created").count(), 4)
+
+	def test_responding_by_filter_invalid(self):
+		c = Client()
+		c.login(username='abc', password='abcd12345')
+		for body in ({"type": "delete_tweet", "action_granted": True}, {"type": "tweet", "filter": {"admin": "foo1"}}, {"type": "update_tweet", "filter": {"before": "yesterday"}}, {"type": "update_tweet", "filter": {"tweet": 1}}):
+			response = c.put(reverse('respond_filter'), body, content_type='application/json')
+			self.assertIn('error', response.json())
+		self.assertEqual(DeleteTweet.objects.filter(responded=False).count(), 4)
+
 	def test_accessing_logs_view(self):
 		c = Client()
 		c.login(username='abc', password='abcd12345')
 		response = c.get(reverse('logs'))
-		self.assertNotEqual(response.json(), REQUEST_FAILED)
+		self.assertNotEqual(json.loads(b''.join(response.streaming_content)), REQUEST_FAILED)
+
+	def test_accessing_logs_pages_newest_first(self):
+		c = Client()
+		c.login(username='abc', password='abcd12345')
+		response = c.get(reverse('logs'), {'order': 'desc', 'limit': 2})
+		page = json.loads(b''.join(response.streaming_content))
+		self.assertEqual(len(page['logs']), 2)
+		self.assertGreaterEqual(page['logs'][0]['asctime'], page['logs'][1]['asctime'])
+
+		response = c.get(reverse('logs'), {'before': page['next'], 'limit': 1})
+		older = json.loads(b''.join(response.streaming_content))
+		self.assertGreaterEqual(page['logs'][1]['asctime'], older['logs'][0]['asctime'])
+
+	def test_accessing_logs_invalid_cursor(self):
+		c = Client()
+		c.login(username='abc', password='abcd12345')
+		response = c.get(reverse('logs'), {'after': 'abc'})
+		self.assertEqual(response.json(), {"error": "Invalid limit or cursor."})
+		for position in (-5, True, 1.5):
+			response = c.get(reverse('logs'), {'after': encode_cursor({"twitter_logs.log": position})})
+			self.assertEqual(response.json(), {"error": "Invalid limit or cursor."})
 
 	def test_query_logs_failed_no_query(self):
 		c = Client()
@@ -464,6 +1117,26 @@ class CheckSuperAdminViews(TestCase):
 		self.assertNotEqual(response.json()['count'], 0)
 		self.assertNotEqual(len(response.json()['logs']), 0)
 
+	def test_query_logs_grouped_per_day(self):
+		c = Client()
+		c.login(username='abc', password='abcd12345')
+		c.get(reverse('request_user'))
+		response = c.post(reverse('logs_query'), {
+				"query": {"log_type": "access"}, "group_by": "source", "bucket": "day", "top": 3
+			}, content_type='application/json')
+		groups = response.json()['groups']
+		self.assertLessEqual(len(groups), 3)
+		self.assertEqual(set(groups[0].keys()), {"source", "bucket", "count"})
+		self.assertEqual(sorted([g['count'] for g in groups], reverse=True), [g['count'] for g in groups])
+
+	def test_query_logs_group_by_unknown_field(self):
+		c = Client()
+		c.login(username='abc', password='abcd12345')
+		response = c.post(reverse('logs_query'), {
+				"query": {}, "group_by": "message"
+			}, content_type='application/json')
+		self.assertEqual(response.json(), {"error": "Cannot group by message."})
+
 	def test_register_new_admin_success(self):
 		c = Client()
 		c.login(username='abc', password='abcd12345')
@@ -487,4 +1160,796 @@ class CheckSuperAdminViews(TestCase):
 		response = c.post(reverse('register_admin'), {
 				"username": 'foo3', 'password': 'abcd12345', 'confirmation': 'abcd12345', 'is_admin': True, 'bio': "Admin created by superuser."
 			}, content_type='application/json')
-		self.assertEqual(response.json(), {"error": "Necessary fields like email, password, confirmation are misssing."})
\ No newline at end of file
+		self.assertEqual(response.json(), {"error": "Necessary fields like email, password, confirmation are misssing."})
+
+
+#Writes a small json lines log file for log store tests
+def write_test_logs(path, count, start=0):
+	with open(path, 'a') as f:
+		for i in range(start, start+count):
+			log = {
+				"asctime": "2020-12-{:02d} {:02d}:{:02d}:00,000".format(1+i//1440%28, i//60%24, i%60),
+				"name": "twitter_logs",
+				"message": "Admin:foo{} accesses User:bar{} tweet {}".format(i%3, i%5, i),
+				"source": "foo{}".format(i%3),
+				"log_type": ["access", "action", "audit"][i%7%3],
+			}
+			if i%4:
+				log["object"] = "user:bar{}".format(i%5)
+			f.write(json.dumps(log) + "\n")
+
+
+class CheckAuthCache(TestCase):
+
+	@classmethod
+	def setUpTestData(cls):
+		cls.sa = User.objects.create_user(username="abc", email="abc@gmail.com", password="abcd12345", is_staff=True, is_superuser=True)
+		cls.a = User.objects.create_user(username='foo', email='foo@gmail.com', password='abcd12345', is_staff = True)
+		cls.u = User.objects.create_user(username='bar', email='bar@gmail.com', password='abcd12345')
+
+	def test_authenticated_requests_without_queries(self):
+		c = Client()
+		c.login(username='bar', password='abcd12345')
+		c.get(reverse('profile'))
+		with self.assertNumQueries(0):
+			response = c.get(reverse('profile'))
+		self.assertEqual(response.json()['username'], 'bar')
+
+	def test_cached_user_invalidated_by_approved_update(self):
+		c = Client()
+		c.login(username='bar', password='abcd12345')
+		self.assertEqual(c.get(reverse('profile')).json()['bio'], '')
+		request = UpdateUser.objects.create(admin=self.a, user=self.u, new_bio="bio updated from admin")
+		s = Client()
+		s.login(username='abc', password='abcd12345')
+		s.put(reverse('respond_users'), [{"request_id": request.id, "action_granted": True}], content_type='application/json')
+		self.assertEqual(c.get(reverse('profile')).json()['bio'], "bio updated from admin")
+
+	def test_cached_user_invalidated_by_role_change(self):
+		c = Client()
+		c.login(username='bar', password='abcd12345')
+		self.assertEqual(c.get(reverse('alluserprofile')).json(), BAD_REQUEST)
+		user = User.objects.get(id=self.u.id)
+		user.is_staff = True
+		user.save()
+		self.assertIn('users', c.get(reverse('alluserprofile')).json())
+
+	def test_cached_user_dropped_again_on_commit(self):
+		callbacks = []
+		with mock.patch('twitter.auth_backends.transaction.on_commit', callbacks.append):
+			invalidate_users([self.u.id])
+		#A request reading the user before the commit caches the old row
+		CachedModelBackend().get_user(self.u.id)
+		self.assertIsNotNone(caches[AUTH_CACHE].get(user_key(self.u.id)))
+		for callback in callbacks:
+			callback()
+		self.assertIsNone(caches[AUTH_CACHE].get(user_key(self.u.id)))
+
+	def test_logout_ends_cached_session(self):
+		c = Client()
+		c.login(username='bar', password='abcd12345')
+		session = c.cookies['sessionid'].value
+		c.get(reverse('logout'))
+		c.cookies['sessionid'] = session
+		self.assertEqual(c.get(reverse('profile')).status_code, 302)
+
+
+class CheckLogStore(TestCase):
+
+	def setUp(self):
+		self.dir = tempfile.TemporaryDirectory()
+		self.path = os.path.join(self.dir.name, 'twitter_logs.log')
+		write_test_logs(self.path, 200)
+
+	def tearDown(self):
+		self.dir.cleanup()
+
+	def scan(self, query):
+		with open(self.path) as f:
+			return [log for log in map(json.loads, f) if check_cond(log, query)]
+
+	def test_query_matches_full_scan(self):
+		store = LogStore(self.path, segment_records=16)
+		queries = [
+			{},
+			{"source": "foo1"},
+			{"log_type": "audit", "source": "foo2"},
+			{"object": "user:bar3"},
+			{"object": ""},
+			{"source": "nobody"},
+			{"from": "2020-12-01 01:10", "to": "2020-12-01 02:05:00,000"},
+			{"from": "2020-12-01 02:00", "source": "foo0", "message": "BAR4"},
+			{"message": "tweet 12"},
+			{"message": "Tweet 1"},
+			{"message": "r3 t"},
+			{"message": "ba"},
+			{"message": ""},
+			{"message": "tweet 1000"},
+		]
+		for query in queries:
+			self.assertEqual(list(store.query(query)), self.scan(query))
+
+	def test_time_range_seeks_to_window(self):
+		store = LogStore(self.path, segment_records=64)
+		store.refresh()
+		query = {"from": "2020-12-01 01:10:00,000", "to": "2020-12-01 01:14:59,999"}
+		self.assertEqual(len(store.candidates(query)), 5)
+		self.assertEqual(list(store.query(query)), self.scan(query))
+
+	def test_message_search_decodes_only_candidates(self):
+		store = LogStore(self.path, segment_records=64)
+		store.refresh()
+		query = {"message": "TWEET 12"}
+		self.assertEqual(len(store.candidates(query)), len(self.scan(query)))
+		self.assertEqual(list(store.query(query)), self.scan(query))
+
+	def test_aggregation_in_one_pass(self):
+		aggregation = Aggregation(['source', 'log_type'], 'hour')
+		for log in self.scan({}):
+			aggregation.add(log)
+		groups = aggregation.groups()
+		self.assertEqual(sum(g['count'] for g in groups), 200)
+		self.assertEqual(groups[0], {"source": "foo0", "log_type": "access", "bucket": "2020-12-01 00", "count": len([
+			log for log in self.scan({"source": "foo0", "log_type": "access", "to": "2020-12-01 00:59:59,999"})
+		])})
+
+		top = Aggregation(['object'], top=2)
+		for log in self.scan({}):
+			top.add(log)
+		self.assertEqual(top.groups()[0], {"object": "", "count": 50})
+		self.assertEqual(len(top.groups()), 2)
+
+	def test_index_follows_appends_and_restarts(self):
+		store = LogStore(self.path, segment_records=16)
+		query = {"source": "foo1", "log_type": "access"}
+		self.assertEqual(list(store.query(query)), self.scan(query))
+
+		write_test_logs(self.path, 50, start=200)
+		expected = self.scan(query)
+		self.assertEqual(list(store.query(query)), expected)
+
+		#Partially written record is not visible yet
+		with open(self.path, 'a') as f:
+			f.write('{"asctime": "2020-12-31 00:00:00,000", "source": "fo')
+		self.assertEqual(list(store.query(query)), expected)
+
+		#A new process reuses the segments sealed by the first one, only their headers are read
+		restarted = LogStore(self.path, segment_records=16)
+		restarted.refresh()
+		self.assertIsInstance(restarted.segments[0], SealedSegment)
+		self.assertIsNone(restarted.segments[0].arrays)
+		self.assertEqual(restarted.segments[0].end, store.segments[0].end)
+		self.assertEqual(list(restarted.query(query)), expected)
+
+	def test_index_dropped_after_copytruncate(self):
+		store = LogStore(self.path, segment_records=16)
+		store.refresh()
+
+		#Rotated in place and written again past the old end, the inode stays the same
+		with open(self.path, 'w') as f:
+			for i in range(300):
+				f.write(json.dumps({"asctime": "2021-01-01 00:00:00,000", "message": "rotated {}".format(i), "source": "baz"}) + "\n")
+		query = {"source": "baz"}
+		self.assertEqual(len(list(store.query(query))), 300)
+		self.assertEqual(list(store.query({"source": "foo1"})), [])
+
+		#Segments sealed before the rotation are not loaded by a new process
+		restarted = LogStore(self.path, segment_records=16)
+		self.assertEqual(list(restarted.query(query)), self.scan(query))
+
+
+class CheckPerProcessLogs(TestCase):
+
+	def setUp(self):
+		self.dir = tempfile.TemporaryDirectory()
+		self.path = os.path.join(self.dir.name, 'twitter_logs.log')
+
+	def tearDown(self):
+		self.dir.cleanup()
+
+	def test_worker_files_are_merged_by_time(self):
+		#Three workers writing every third record
+		for worker in range(3):
+			with open(worker_path(self.path, 100+worker), 'w') as f:
+				for i in range(worker, 60, 3):
+					f.write(json.dumps({"asctime": "2020-12-01 00:{:02d}:00,000".format(i), "message": "record {}".format(i), "source": "foo{}".format(i%2)}) + "\n")
+
+			#Interleaved partial write of a crashed worker
+			with open(worker_path(self.path, 100+worker), 'a') as f:
+				f.write('{"asctime": "2020-12-01 01:00')
+
+		self.assertEqual([item[3]['message'] for item in page_logs(self.path)[1]], ['record {}'.format(i) for i in range(60)])
+		self.assertEqual([log['message'] for log in query_logs(self.path, {"source": "foo1"})], ['record {}'.format(i) for i in range(1, 60, 2)])
+
+	def test_pages_follow_cursors_in_both_directions(self):
+		for worker in range(2):
+			with open(worker_path(self.path, 100+worker), 'w') as f:
+				for i in range(worker, 50, 2):
+					f.write(json.dumps({"asctime": "2020-12-01 00:{:02d}:00,000".format(i), "message": "record {}".format(i)}) + "\n")
+
+		def page(positions, reverse, limit):
+			start, stream = page_logs(self.path, positions, reverse)
+			messages = []
+			for _, name, position, log in islice(stream, limit):
+				start[name] = position
+				messages.append(log['message'])
+			return start, messages
+
+		#Latest records first, then older ones from the cursor
+		cursor, latest = page(None, True, 3)
+		self.assertEqual(latest, ['record 49', 'record 48', 'record 47'])
+		cursor, older = page(cursor, True, 3)
+		self.assertEqual(older, ['record 46', 'record 45', 'record 44'])
+
+		#Going forward from the same cursor
+		cursor, newer = page(cursor, False, 4)
+		self.assertEqual(newer, ['record 44', 'record 45', 'record 46', 'record 47'])
+
+	def test_handler_writes_file_of_its_process(self):
+		handler = AsyncFileHandler(self.path, per_process=True)
+		handler.setFormatter(jsonlogger.JsonFormatter('%(asctime)s %(name)s %(message)s'))
+		handler.handle(logging.makeLogRecord({'name': 'twitter_logs', 'msg': 'hello'}))
+		handler.close()
+		self.assertFalse(os.path.exists(self.path))
+		self.assertEqual([item[3]['message'] for item in page_logs(self.path)[1]], ['hello'])
+		self.assertTrue(os.path.exists(worker_path(self.path, 0)))
+
+	def test_files_of_exited_workers_are_reused(self):
+		#File left by a worker which crashed in the middle of a record
+		with open(worker_path(self.path, 4321), 'w') as f:
+			f.write(json.dumps({"asctime": "2020-12-01 00:00:00,000", "message": "record 0"}) + "\n")
+			f.write('{"asctime": "2020-12-01 01:00')
+
+		def log(message):
+			handler = AsyncFileHandler(self.path, per_process=True)
+			handler.setFormatter(jsonlogger.JsonFormatter('%(asctime)s %(name)s %(message)s'))
+			handler.handle(logging.makeLogRecord({'name': 'twitter_logs', 'msg': message}))
+			handler.flush()
+			return handler
+
+		#A running worker keeps its file, the next one takes a new file
+		first = log('first')
+		second = log('second')
+		self.assertEqual([first.baseFilename, second.baseFilename], [worker_path(self.path, 4321), worker_path(self.path, 0)])
+		first.close()
+		second.close()
+
+		#Once they exited their files are written again instead of new ones
+		third = log('third')
+		third.close()
+		self.assertEqual(third.baseFilename, worker_path(self.path, 0))
+		self.assertEqual(sorted(os.listdir(self.dir.name)), ['twitter_logs.0.log', 'twitter_logs.4321.log'])
+		messages = [item[3]['message'] for item in page_logs(self.path)[1]]
+		self.assertEqual(messages[0], 'record 0')
+		self.assertEqual(sorted(messages[1:]), ['first', 'second', 'third'])
+
+
+class CheckLogRollups(TestCase):
+
+	def setUp(self):
+		self.dir = tempfile.TemporaryDirectory()
+		self.path = os.path.join(self.dir.name, 'twitter_logs.log')
+		write_test_logs(self.path, 200)
+
+	def tearDown(self):
+		self.dir.cleanup()
+
+	def test_rollups_count_only_new_records(self):
+		self.assertEqual(update_rollups(self.path), 200)
+		self.assertEqual(update_rollups(self.path), 0)
+		write_test_logs(self.path, 30, start=200)
+		self.assertEqual(update_rollups(self.path), 30)
+
+		for period in ('hour', 'day'):
+			self.assertEqual(LogRollup.objects.filter(period=period).aggregate(total=Sum('count'))['total'], 230)
+
+		#Same numbers as grouping the raw logs
+		aggregation = Aggregation(['source', 'log_type'], 'hour')
+		for _, _, _, log in page_logs(self.path)[1]:
+			aggregation.add(log)
+		rollups = LogRollup.objects.filter(period='hour').order_by('bucket', 'source', 'log_type')
+		self.assertEqual(
+			sorted((g['bucket'], g['source'], g['log_type'], g['count']) for g in aggregation.groups()),
+			sorted((r.bucket, r.source, r.log_type, r.count) for r in rollups),
+		)
+
+	def test_files_of_same_name_counted_apart(self):
+		other = tempfile.TemporaryDirectory()
+		self.addCleanup(other.cleanup)
+		write_test_logs(os.path.join(other.name, 'twitter_logs.log'), 50)
+		self.assertEqual(update_rollups(self.path), 200)
+		self.assertEqual(update_rollups(os.path.join(other.name, 'twitter_logs.log')), 50)
+		self.assertEqual(LogRollupCursor.objects.count(), 2)
+		self.assertEqual(LogRollup.objects.filter(period='day').aggregate(total=Sum('count'))['total'], 250)
+
+	def test_counts_added_to_rows_inserted_meanwhile(self):
+		key = ('day', '2020-12-01', 'foo', 'access', 'other')
+		calls = []
+		#Another updater inserts the row after this one found it missing
+		def locked(keys):
+			calls.append(keys)
+			if len(calls) == 1:
+				LogRollup.objects.create(period='day', bucket='2020-12-01', source='foo', log_type='access', action='other', count=5)
+				return {}
+			return locked_rollups(keys)
+		with mock.patch('twitter.rollups.locked_rollups', side_effect=locked):
+			with transaction.atomic():
+				save_counts(Counter({key: 3}))
+		self.assertEqual(LogRollup.objects.get(period='day', source='foo').count, 8)
+
+	def test_cursor_created_by_another_updater(self):
+		real = LogRollupCursor.objects.get_or_create
+		def raced(**kwargs):
+			real(**kwargs)
+			raise IntegrityError('duplicate key')
+		with mock.patch.object(LogRollupCursor.objects, 'get_or_create', side_effect=raced):
+			self.assertEqual(update_rollups(self.path), 200)
+
+	def test_rollups_endpoint(self):
+		sa = User.objects.create_user(username="abc", email="abc@gmail.com", password="abcd12345", is_staff=True, is_superuser=True)
+		c = Client()
+		c.login(username='abc', password='abcd12345')
+		c.get(reverse('request_user'))
+		response = c.get(reverse('logs_rollups'), {'period': 'hour', 'source': 'abc', 'action': 'view_user_requests'})
+		self.assertNotEqual(len(response.json()), 0)
+		self.assertEqual(set(r['action'] for r in response.json()), {'view_user_requests'})
+
+		response = c.get(reverse('logs_rollups'), {'period': 'week'})
+		self.assertEqual(response.json(), {"error": "period must be hour or day."})
+
+
+class CheckAsyncLogHandler(TestCase):
+
+	def setUp(self):
+		self.dir = tempfile.TemporaryDirectory()
+		self.path = os.path.join(self.dir.name, 'twitter_logs.log')
+
+	def tearDown(self):
+		self.dir.cleanup()
+
+	def handler(self, **kwargs):
+		handler = AsyncFileHandler(self.path, **kwargs)
+		handler.setFormatter(jsonlogger.JsonFormatter('%(asctime)s %(name)s %(message)s'))
+		return handler
+
+	def record(self, i):
+		return logging.makeLogRecord({'name': 'twitter_logs', 'msg': 'record {}'.format(i), 'source': 'abc', 'log_type': 'access'})
+
+	def read(self):
+		with open(self.path) as f:
+			return [json.loads(line) for line in f]
+
+	def test_flush_and_close_write_every_record(self):
+		handler = self.handler(batch_size=7, flush_interval=10)
+		for i in range(20):
+			handler.handle(self.record(i))
+		handler.flush()
+		self.assertEqual(len(self.read()), 20)
+
+		for i in range(20, 30):
+			handler.handle(self.record(i))
+		handler.close()
+		logs = self.read()
+		self.assertEqual([log['message'] for log in logs], ['record {}'.format(i) for i in range(30)])
+		self.assertEqual(logs[0]['source'], 'abc')
+
+	def test_drop_policy_reports_dropped_records(self):
+		handler = self.handler(queue_size=1, flush_interval=0.01, overflow='drop')
+
+		#Keep the writer busy on the first record
+		handler.acquire()
+		handler.handle(self.record(0))
+		time.sleep(0.2)
+		handler.handle(self.record(1))
+		handler.handle(self.record(2))
+		handler.release()
+		handler.close()
+
+		messages = [log['message'] for log in self.read()]
+		self.assertEqual(messages, ['record 0', '1 log records dropped, log queue was full', 'record 1'])
+
+
+
+class CheckMetrics(TestCase):
+
+	def setUp(self):
+		self.dir = tempfile.TemporaryDirectory()
+		self.settings = override_settings(TWITTER_METRICS_DIR=self.dir.name, TWITTER_METRICS_FLUSH_INTERVAL=3600)
+		self.settings.enable()
+		registry.clear()
+		User.objects.create_user(username="abc", email="abc@gmail.com", password="abcd12345", is_staff=True, is_superuser=True)
+		User.objects.create_user(username='bar', email='bar@gmail.com', password='abcd12345')
+
+	def tearDown(self):
+		registry.clear()
+		self.settings.disable()
+		self.dir.cleanup()
+
+	#Samples of one metric of one view, keyed by the rest of the line
+	def samples(self, text, name, view):
+		samples = {}
+		for line in text.splitlines():
+			if line.startswith(name) and 'view="{}"'.format(view) in line:
+				key, value = line.rsplit(' ', 1)
+				samples[key] = float(value)
+		return samples
+
+	def test_quantiles_of_histogram(self):
+		buckets = (1, 2, 4)
+		self.assertEqual(quantile(buckets, [0, 10, 0, 0], 0.5), 1.5)
+		self.assertEqual(quantile(buckets, [50, 0, 50, 0], 0.99), 3.96)
+		#Values above the last bound are reported as the last bound
+		self.assertEqual(quantile(buckets, [0, 0, 0, 5], 0.5), 4)
+
+	def test_metrics_endpoint(self):
+		c = Client()
+		c.login(username='abc', password='abcd12345')
+		for _ in range(3):
+			c.get(reverse('profile'))
+		response = c.get(reverse('metrics'))
+		self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+		text = response.content.decode('utf-8')
+		self.assertIn('# TYPE twitter_view_seconds summary', text)
+
+		seconds = self.samples(text, 'twitter_view_seconds', 'profile')
+		self.assertEqual(seconds['twitter_view_seconds_count{view="profile"}'], 3)
+		self.assertIn('twitter_view_seconds{view="profile",quantile="0.99"}', seconds)
+		queries = self.samples(text, 'twitter_view_db_queries', 'profile')
+		self.assertEqual(queries['twitter_view_db_queries_count{view="profile"}'], 3)
+		self.assertGreater(self.samples(text, 'twitter_view_log_seconds', 'profile')['twitter_view_log_seconds_sum{view="profile"}'], 0)
+		size = len(c.get(reverse('profile')).content)
+		self.assertEqual(self.samples(text, 'twitter_view_response_bytes', 'profile')['twitter_view_response_bytes_sum{view="profile"}'], 3*size)
+
+		c.logout()
+		c.login(username='bar', password='abcd12345')
+		self.assertEqual(c.get(reverse('metrics')).json(), BAD_REQUEST)
+
+	def write_worker(self, pid, started, counts):
+		with open(os.path.join(self.dir.name, 'metrics.{}.{}.json'.format(pid, started)), 'w') as f:
+			json.dump({'profile': {'db_queries': {'counts': counts + [0]*(14-len(counts)), 'sum': 2*sum(counts)}}}, f)
+
+	def test_metrics_of_every_worker_added(self):
+		registry.record('profile', {'seconds': 0.01, 'db_queries': 2})
+		#The test runner stands for another running worker
+		self.write_worker(os.getppid(), 1, [0, 0, 3])
+
+		views = registry.collect()
+		self.assertEqual(sum(views['profile']['db_queries']['counts']), 4)
+		self.assertEqual(views['profile']['db_queries']['sum'], 8)
+		self.assertEqual(sum(views['profile']['seconds']['counts']), 1)
+
+	def test_files_of_dead_workers_removed(self):
+		process = subprocess.Popen(['true'])
+		process.wait()
+		self.write_worker(process.pid, 1, [0, 0, 3])
+		#An older worker which had the pid of the test runner
+		self.write_worker(os.getppid(), 1, [0, 0, 5])
+		self.write_worker(os.getppid(), 2, [0, 0, 1])
+
+		views = registry.collect()
+		self.assertEqual(sum(views['profile']['db_queries']['counts']), 1)
+		names = os.listdir(self.dir.name)
+		self.assertIn('metrics.{}.2.json'.format(os.getppid()), names)
+		self.assertNotIn('metrics.{}.1.json'.format(os.getppid()), names)
+		self.assertNotIn('metrics.{}.1.json'.format(process.pid), names)
+
+	def test_failed_flush_does_not_fail_request(self):
+		c = Client()
+		c.login(username='bar', password='abcd12345')
+		path = os.path.join(self.dir.name, 'file')
+		open(path, 'w').close()
+		with override_settings(TWITTER_METRICS_DIR=os.path.join(path, 'metrics'), TWITTER_METRICS_FLUSH_INTERVAL=0):
+			with self.assertLogs('twitter.metrics', 'ERROR'):
+				response = c.get(reverse('profile'))
+		self.assertEqual(response.status_code, 200)
+
+
+class CheckProfiling(TestCase):
+
+	def setUp(self):
+		self.dir = tempfile.TemporaryDirectory()
+		self.settings = override_settings(TWITTER_PROFILES_DIR=self.dir.name, TWITTER_PROFILES_KEEP=3)
+		self.settings.enable()
+		User.objects.create_user(username="abc", email="abc@gmail.com", password="abcd12345", is_staff=True, is_superuser=True)
+		User.objects.create_user(username='bar', email='bar@gmail.com', password='abcd12345')
+
+	def tearDown(self):
+		self.settings.disable()
+		self.dir.cleanup()
+
+	def test_profile_by_header_and_download(self):
+		c = Client()
+		c.login(username='abc', password='abcd12345')
+		response = c.get(reverse('request_user'), HTTP_X_PROFILE='memory')
+		profile_id = response['X-Profile-Id']
+
+		summaries = c.get(reverse('request_profiles')).json()
+		self.assertEqual([s['id'] for s in summaries], [profile_id])
+		self.assertEqual(summaries[0]['view'], 'request_user')
+		self.assertEqual(summaries[0]['status'], 200)
+		self.assertGreater(summaries[0]['peak_memory'], 0)
+		self.assertIn('cumulative', summaries[0]['stats'])
+
+		response = c.get(reverse('request_profile', args=[profile_id]))
+		path = os.path.join(self.dir.name, 'downloaded.prof')
+		with open(path, 'wb') as f:
+			f.write(b''.join(response.streaming_content))
+		self.assertGreater(pstats.Stats(path).total_calls, 0)
+
+		response = c.get(reverse('request_profile', args=['metrics.1']))
+		self.assertEqual(response.json(), {"error": "profile not present."})
+
+	def test_only_newest_profiles_kept(self):
+		c = Client()
+		c.login(username='abc', password='abcd12345')
+		ids = [c.get(reverse('profile'), {'profile': '1'})['X-Profile-Id'] for _ in range(5)]
+		self.assertEqual([s['id'] for s in c.get(reverse('request_profiles')).json()], ids[:-4:-1])
+		self.assertEqual(len(os.listdir(self.dir.name)), 6)
+
+	def test_not_profiled(self):
+		c = Client()
+		c.login(username='abc', password='abcd12345')
+		self.assertFalse(c.get(reverse('profile')).has_header('X-Profile-Id'))
+
+		#Only superadmins can profile
+		c.logout()
+		c.login(username='bar', password='abcd12345')
+		self.assertFalse(c.get(reverse('profile'), HTTP_X_PROFILE='1').has_header('X-Profile-Id'))
+		self.assertEqual(c.get(reverse('request_profiles')).json(), BAD_REQUEST)
+		self.assertEqual(os.listdir(self.dir.name), [])
+
+
+class CheckBenchmarks(TestCase):
+
+	def setUp(self):
+		self.dir = tempfile.TemporaryDirectory()
+		self.path = os.path.join(self.dir.name, 'twitter_logs.log')
+
+	def tearDown(self):
+		self.dir.cleanup()
+
+	def test_generated_dataset(self):
+		generate('bench', 50, 3, 2, 2000, 20, 500, self.path)
+		self.assertEqual(User.objects.filter(username__startswith='bench', is_staff=False).count(), 50)
+		self.assertEqual(User.objects.filter(username__startswith='bench', is_superuser=True).count(), 2)
+		self.assertEqual(Tweet.objects.count(), 2000)
+		for model in (UpdateTweet, DeleteTweet, CreateTweet, UpdateUser):
+			self.assertEqual(model.objects.filter(responded=False).count(), 20)
+		self.assertEqual(len(list(page_logs(self.path)[1])), 500)
+
+		#Skewed, the busiest user has many times the tweets of the median one
+		counts = sorted(User.objects.filter(is_staff=False).annotate(count=Count('tweets')).values_list('count', flat=True))
+		self.assertGreater(counts[-1], 5*counts[len(counts)//2])
+
+		#Timestamps are spread instead of all being the time of the insert
+		self.assertGreater(Tweet.objects.aggregate(first=Max('timestamp'))['first']-Tweet.objects.aggregate(last=Min('timestamp'))['last'], timedelta(days=1))
+
+	def test_benchmark_results(self):
+		generate('bench', 20, 2, 1, 200, 10, 0, self.path)
+		names = {'stweets', 'request_tweets', 'respond_users_approve', 'respond_tweets_create_approve', 'respond_tweets_delete_reject'}
+		results = run('bench', 2, only=names)
+		self.assertEqual(set(results['endpoints']), names)
+		self.assertEqual(results['dataset']['tweets'], 200)
+		#Responses are rolled back, so a run leaves the requests pending for the next one
+		self.assertEqual(Tweet.objects.count(), 200)
+		for model in (UpdateTweet, DeleteTweet, CreateTweet, UpdateUser):
+			self.assertEqual(model.objects.filter(responded=False).count(), 10)
+		for result in results['endpoints'].values():
+			self.assertLessEqual(result['p50'], result['p99'])
+			self.assertGreater(result['peak_memory'], 0)
+		self.assertEqual(results['endpoints']['request_tweets']['queries'], 3)
+
+		path = save(results, os.path.join(self.dir.name, 'results.json'))
+		with open(path) as f:
+			self.assertEqual(compare(json.load(f), results)['stweets']['p95'], 1)
+
+	def test_benchmark_leaves_live_logs_and_rollups(self):
+		generate('bench', 20, 2, 1, 200, 10, 100, self.path)
+		live = logging.getLogger('twitter_logs')
+		for handler in live.handlers:
+			handler.flush()
+		size = os.path.getsize(LOG_FILE) if os.path.exists(LOG_FILE) else 0
+
+		run('bench', 1, only=['respond_users_approve', 'respond_tweets_delete_reject', 'logs_rollups'], log_file=self.path)
+		for handler in live.handlers:
+			handler.flush()
+		self.assertEqual(os.path.getsize(LOG_FILE) if os.path.exists(LOG_FILE) else 0, size)
+		self.assertFalse(LogRollup.objects.exists())
+		self.assertFalse(LogRollupCursor.objects.exists())
+
+	def test_live_log_file_refused(self):
+		with self.assertRaises(CommandError):
+			call_command('generate_data', '--users', '1', '--log-file', LOG_FILE, stdout=io.StringIO())
+		self.assertFalse(User.objects.exists())
+
+
+class CheckPerformanceBudgets(PerformanceAssertions, TestCase):
+
+	@classmethod
+	def setUpTestData(cls):
+		cls.sa = User.objects.create_user(username="abc", email="abc@gmail.com", password="abcd12345", is_staff=True, is_superuser=True)
+		cls.a = User.objects.create_user(username='foo', email='foo@gmail.com', password='abcd12345', is_staff = True)
+		cls.u = User.objects.create_user(username='bar', email='bar@gmail.com', password='abcd12345')
+		cls.tweet = Tweet.objects.create(user=cls.u, tweet='Hello there !!!')
+
+	def setUp(self):
+		caches[TIMELINE_CACHE].clear()
+		self.dir = tempfile.TemporaryDirectory()
+		self.path = os.path.join(self.dir.name, 'twitter_logs.log')
+
+	def tearDown(self):
+		self.dir.cleanup()
+
+	#Client with its session and user already in the auth cache
+	def client_of(self, username):
+		c = Client()
+		c.login(username=username, password='abcd12345')
+		c.get(reverse('profile'))
+		return c
+
+	def add_users(self, size):
+		count = User.objects.filter(username__startswith='many').count()
+		User.objects.bulk_create([User(username='many{}'.format(i), email='many{}@gmail.com'.format(i), bio='bio') for i in range(count, size)], batch_size=100)
+
+	def add_tweets(self, user, size):
+		count = Tweet.objects.filter(user=user).count()
+		Tweet.objects.bulk_create([Tweet(user=user, tweet='Tweet {}'.format(i)) for i in range(count, size)], batch_size=100)
+		caches[TIMELINE_CACHE].clear()
+
+	#New pending requests of every type, their ids returned by type
+	def add_requests(self, size):
+		Tweet.objects.bulk_create([Tweet(user=self.u, tweet='Requested {}'.format(i)) for i in range(size)], batch_size=100)
+		tweets = list(Tweet.objects.filter(tweet__startswith='Requested').order_by('-id')[:size])
+		UpdateTweet.objects.bulk_create([UpdateTweet(admin=self.a, tweet=t, new_tweet='Update') for t in tweets], batch_size=100)
+		DeleteTweet.objects.bulk_create([DeleteTweet(admin=self.a, tweet=t) for t in tweets], batch_size=100)
+		CreateTweet.objects.bulk_create([CreateTweet(admin=self.a, userid=self.u.id, tweet='New') for t in tweets], batch_size=100)
+		UpdateUser.objects.bulk_create([UpdateUser(admin=self.a, user=self.u, new_bio='bio') for t in tweets], batch_size=100)
+		return {
+			request_type: list(model.objects.order_by('-id').values_list('id', flat=True)[:size])
+			for request_type, model in (('update_tweet', UpdateTweet), ('delete_tweet', DeleteTweet), ('create_tweet', CreateTweet), ('update_user', UpdateUser))
+		}
+
+	def top_up_requests(self, size):
+		self.add_requests(size-UpdateTweet.objects.filter(responded=False).count())
+
+	def write_logs(self, size):
+		count = 0
+		if os.path.exists(self.path):
+			with open(self.path) as f:
+				count = sum(1 for _ in f)
+		write_test_logs(self.path, size-count, start=count)
+
+	def add_logs(self, size):
+		self.write_logs(size)
+		#Indexing new records happens once per record, not in every request
+		update_rollups(self.path)
+		refresh_logs(self.path)
+
+	def test_request_queues(self):
+		c = self.client_of('abc')
+		def request(size):
+			self.assertEqual(len(c.get(reverse('request_tweets')).json()['delete_request']), size)
+			self.assertEqual(len(c.get(reverse('request_user')).json()), size)
+		self.assertDoesNotGrow(self.top_up_requests, request, queries=4)
+
+	def test_user_directory(self):
+		c = self.client_of('foo')
+		def request(size):
+			self.assertEqual(c.get(reverse('alluserprofile')).status_code, 200)
+			self.assertEqual(c.get(reverse('alluserprofile'), {'q': 'many'}).status_code, 200)
+		self.assertDoesNotGrow(self.add_users, request, queries=2)
+
+	def test_batch_user_profiles(self):
+		c = self.client_of('foo')
+		added = {}
+		def setup(size):
+			self.add_users(size)
+			added['ids'] = list(User.objects.filter(username__startswith='many').values_list('id', flat=True)[:size])
+		def request(size):
+			response = c.post(reverse('userprofiles'), {"user_ids": added['ids']}, content_type='application/json')
+			self.assertEqual(len(response.json()), size)
+		#Sizes stay below the 999 parameters SQLite accepts in one IN list
+		self.assertDoesNotGrow(setup, request, sizes=(10, 900), queries=1)
+
+	def test_timelines(self):
+		c = self.client_of('bar')
+		admin = self.client_of('foo')
+		def request(size):
+			self.assertEqual(c.get(reverse('stweets')).status_code, 200)
+			self.assertEqual(admin.get(reverse('usertweets', args=[self.u.id])).status_code, 200)
+		self.assertDoesNotGrow(lambda size: self.add_tweets(self.u, size), request, queries=2)
+
+	def test_bulk_submissions(self):
+		c = self.client_of('foo')
+		endpoints = (
+			('update_tweet_requests', {"tweet_id": self.tweet.id, "new_tweet": "Bulk update"}),
+			('delete_tweet_requests', {"tweet_id": self.tweet.id}),
+			('create_tweet_requests', {"user_id": self.u.id, "tweet": "Bulk tweet"}),
+			('update_user_requests', {"user_id": self.u.id, "new_bio": "Bulk bio"}),
+		)
+		for name, item in endpoints:
+			def request(size):
+				response = c.post(reverse(name), [item]*size, content_type='application/json')
+				self.assertEqual(response.json(), [REQUEST_SUCCESS]*size)
+			#Rows are inserted BULK_BATCH at a time
+			with self.subTest(name):
+				self.assertDoesNotGrow(lambda size: None, request, sizes=(10, BULK_BATCH), queries=4)
+
+	def test_responding(self):
+		c = self.client_of('abc')
+		#Approved new tweets are inserted one by one where bulk inserts do not return ids, so those are rejected
+		endpoints = (
+			('respond_tweets_update', 'update_tweet', True, 5),
+			('respond_tweets_delete', 'delete_tweet', True, 8),
+			('respond_tweets_create', 'create_tweet', False, 5),
+			('respond_users', 'update_user', True, 5),
+		)
+		for name, request_type, granted, queries in endpoints:
+			added = {}
+			def setup(size):
+				added['requests'] = self.add_requests(size)[request_type]
+			def request(size):
+				response = c.put(reverse(name), [{"request_id": request_id, "action_granted": granted} for request_id in added['requests']], content_type='application/json')
+				self.assertEqual(response.json(), [{"request_id": request_id, "message": "Response saved."} for request_id in added['requests']])
+			#Writes are batched and SQLite updates fewer than 200 rows in one statement, so both sizes fit in one batch
+			with self.subTest(name):
+				self.assertDoesNotGrow(setup, request, sizes=(10, 100), queries=queries)
+
+	def test_responding_by_filter(self):
+		c = self.client_of('abc')
+		def request(size):
+			response = c.put(reverse('respond_filter'), {"type": "update_user", "action_granted": False, "filter": {"admin": "foo"}}, content_type='application/json')
+			self.assertEqual(response.json()['count'], size)
+			self.assertEqual(response.json()['remaining'], 0)
+		self.assertLess(100, FILTER_MAX)
+		self.assertDoesNotGrow(self.add_requests, request, sizes=(10, 100), queries=6)
+
+	def test_claiming(self):
+		c = self.client_of('abc')
+		def request(size):
+			response = c.post(reverse('request_claim'), {"type": "update_tweet", "count": size}, content_type='application/json')
+			self.assertEqual(len(response.json()['requests']), size)
+		self.assertDoesNotGrow(self.add_requests, request, sizes=(10, 100), queries=4)
+
+	def test_logs_pages(self):
+		c = self.client_of('abc')
+		def request(size):
+			for params in ({'limit': 10}, {'limit': 10, 'order': 'desc'}):
+				page = json.loads(b''.join(c.get(reverse('logs'), params).streaming_content))
+				self.assertEqual(len(page['logs']), 10)
+		with mock.patch('twitter.views.LOG_FILE', self.path):
+			#Pages need no index, newest first reads one block from the end of the file
+			self.assertDoesNotGrow(self.write_logs, request, sizes=(1000, 20000), queries=0, log_bytes=70000)
+
+	def test_logs_query_reads_only_matches(self):
+		c = self.client_of('abc')
+		def setup(size):
+			self.add_logs(size)
+			with open(self.path, 'a') as f:
+				f.write(json.dumps({"asctime": "2020-12-30 00:00:00,000", "name": "twitter_logs", "message": "needle", "source": "needle", "log_type": "access"}) + "\n")
+			refresh_logs(self.path)
+		def request(size):
+			response = c.post(reverse('logs_query'), {"query": {"source": "needle"}, "show_logs": True}, content_type='application/json')
+			self.assertEqual(len(response.json()['logs']), size//1000)
+		with mock.patch('twitter.views.LOG_FILE', self.path):
+			self.assertDoesNotGrow(setup, request, sizes=(1000, 2000), queries=0, log_bytes=1000)
+
+	def test_log_rollups_read_only_new_records(self):
+		c = self.client_of('abc')
+		def request(size):
+			self.assertNotEqual(c.get(reverse('logs_rollups'), {'period': 'day'}).json(), REQUEST_FAILED)
+		with mock.patch('twitter.views.LOG_FILE', self.path):
+			self.assertDoesNotGrow(self.add_logs, request, sizes=(1000, 20000), log_bytes=0)
+
+	def test_budget_fails_when_exceeded(self):
+		with self.assertRaisesRegex(AssertionError, '2 queries made, at most 1 allowed'):
+			with budget(queries=1):
+				list(User.objects.all())
+				list(Tweet.objects.all())
+
+		@budget(log_bytes=10)
+		def read_logs():
+			list(page_logs(self.path)[1])
+		write_test_logs(self.path, 5)
+		with self.assertRaisesRegex(AssertionError, 'bytes of logs read, at most 10 allowed'):
+			read_logs()
@@ -0,0 +1,114 @@
+import uuid
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Tweet
+from .pagination import encode_cursor
+from .serializers import TWEET_FIELDS, lookups, serialize_row
+
+#Cache alias holding the timelines, see CACHES in settings
+TIMELINE_CACHE = 'timeline'
+
+#Newest tweets of a user kept in the cache, older pages are read from the database
+TIMELINE_CACHED = 1000
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def version_key(user_id):
+	return 'timeline_version:{}'.format(user_id)
+
+
+def timeline_key(user_id, version):
+	return 'timeline:{}:{}'.format(user_id, version)
+
+
+#Versions are never reused, so a timeline cached under an old one is never read again
+def new_version():
+	return uuid.uuid4().hex
+
+
+#Version of the cached timeline of a user, a new one if it was never set or was culled
+def timeline_version(cache, user_id):
+	version = cache.get(version_key(user_id))
+	if version is None:
+		version = new_version()
+		if not cache.add(version_key(user_id), version, None):
+			version = cache.get(version_key(user_id), version)
+	return version
+
+
+#Sort key of a tweet in a newest first timeline
+def tweet_order(timestamp, tweet_id):
+	return (-((timestamp-EPOCH)//timedelta(microseconds=1)), -tweet_id)
+
+
+#Tweets newest first as values rows of TWEET_FIELDS, id first and timestamp third
+def tweet_rows(tweets):
+	return tweets.order_by("-timestamp", "-id").values_list(*lookups(TWEET_FIELDS))
+
+
+#Newest tweets of a user, serialized, from the cache or else from the database
+def cached_timeline(user_id):
+	cache = caches[TIMELINE_CACHE]
+	key = timeline_key(user_id, timeline_version(cache, user_id))
+	timeline = cache.get(key)
+	if timeline is None:
+		rows = list(tweet_rows(Tweet.objects.filter(user_id=user_id))[:TIMELINE_CACHED+1])
+		timeline = {
+			"order": [tweet_order(row[2], row[0]) for row in rows[:TIMELINE_CACHED]],
+			"cursors": [[row[2].isoformat(), row[0]] for row in rows[:TIMELINE_CACHED]],
+			"tweets": [serialize_row(TWEET_FIELDS, row) for row in rows[:TIMELINE_CACHED]],
+			"complete": len(rows) <= TIMELINE_CACHED,
+		}
+		cache.set(key, timeline)
+	return timeline
+
+
+#Move users whose tweets changed to a new version, their old timelines are left to expire
+#Moved now and again after commit, a read racing the write caches the old timeline under a version no longer read
+def invalidate_timelines(user_ids):
+	keys = [version_key(user_id) for user_id in set(user_ids)]
+	if keys:
+		def bump():
+			caches[TIMELINE_CACHE].set_many({key: new_version() for key in keys}, None)
+		bump()
+		transaction.on_commit(bump)
+
+
+#Page of tweets of a user newest first, from the cached timeline when it holds the page
+def timeline_page(user_id, cursor, limit):
+	timeline = cached_timeline(user_id)
+	start = 0
+	if cursor is not None:
+		start = bisect_right(timeline["order"], tweet_order(*cursor))
+	if start+limit < len(timeline["tweets"]) or timeline["complete"]:
+		tweets = timeline["tweets"][start:start+limit]
+		next_cursor = None
+		if start+limit < len(timeline["tweets"]):
+			next_cursor = encode_cursor(timeline["cursors"][start+limit-1])
+		return {
+			"tweets": tweets,
+			"next": next_cursor,
+		}
+
+	#Older than the cached tweets, read from the (user, timestamp, id) index
+	tweets = Tweet.objects.filter(user_id=user_id)
+	if cursor is not None:
+		timestamp, tweet_id = cursor
+		tweets = tweets.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=tweet_id))
+	rows = list(tweet_rows(tweets)[:limit+1])
+
+	#One more tweet than asked tells if there is a next page
+	next_cursor = None
+	if len(rows) > limit:
+		rows = rows[:limit]
+		next_cursor = encode_cursor([rows[-1][2].isoformat(), rows[-1][0]])
+	return {
+		"tweets": [serialize_row(TWEET_FIELDS, row) for row in rows],
+		"next": next_cursor,
+	}
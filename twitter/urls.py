@@ -10,6 +10,7 @@ urlpatterns = [
 	path('user/tweets', views.stweets, name='stweets'),
 	path('user/<int:user_id>/profile', views.userprofile, name='userprofile'),
 	path('user/<int:user_id>/tweets', views.usertweets, name='usertweets'),
+	path('user/profiles', views.userprofiles, name='userprofiles'),
 	path('all/user/profile', views.alluserprofile, name='alluserprofile'),
 	path('newtweet', views.new_tweet, name='new_tweet'),
 	path('edittweet', views.edit_tweet, name='edit_tweet'),
@@ -18,13 +19,23 @@ urlpatterns = [
 	path('tweet/delete/request', views.delete_tweet_request, name='delete_tweet_request'),
 	path('tweet/create/request', views.create_tweet_request, name='create_tweet_request'),
 	path('user/update/request', views.update_user_request, name='update_user_request'),
+	path('tweet/update/requests', views.update_tweet_requests, name='update_tweet_requests'),
+	path('tweet/delete/requests', views.delete_tweet_requests, name='delete_tweet_requests'),
+	path('tweet/create/requests', views.create_tweet_requests, name='create_tweet_requests'),
+	path('user/update/requests', views.update_user_requests, name='update_user_requests'),
 	path('request/users', views.request_user, name='request_user'),
 	path('request/tweets', views.request_tweets, name='request_tweets'),
+	path('request/claim', views.request_claim, name='request_claim'),
 	path('respond/users', views.respond_users, name='respond_users'),
 	path('respond/tweets/update', views.respond_tweets_update, name='respond_tweets_update'),
 	path('respond/tweets/delete', views.respond_tweets_delete, name='respond_tweets_delete'),
 	path('respond/tweets/create', views.respond_tweets_create, name='respond_tweets_create'),
+	path('respond/filter', views.respond_filter, name='respond_filter'),
 	path('logs', views.logs, name='logs'),
 	path('logs/query', views.logs_query, name='logs_query'),
+	path('logs/rollups', views.logs_rollups, name='logs_rollups'),
+	path('metrics', views.metrics, name='metrics'),
+	path('profiles', views.request_profiles, name='request_profiles'),
+	path('profiles/<str:profile_id>', views.request_profile, name='request_profile'),
 	path('register/admin', views.register_admin, name='register_admin'),
 ]
\ No newline at end of file
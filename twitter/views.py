@@ -2,22 +2,115 @@ import json
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.db import IntegrityError
-from django.http import JsonResponse
+from django.db.models import Q
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, HttpResponseRedirect, HttpResponse
 from django.urls import reverse
+from django.utils.dateparse import parse_datetime
 from django.views.decorators.csrf import csrf_exempt
 
-from .models import User, Tweet, UpdateTweet, DeleteTweet, CreateTweet, UpdateUser
+from .models import User, Tweet, UpdateTweet, DeleteTweet, CreateTweet, UpdateUser, LogRollup
+from .approvals import responses_error, respond_user_updates, respond_tweet_updates, respond_tweet_deletes, respond_tweet_creates, respond_by_filter, claim_requests
+from .metrics import registry, prometheus_text
+from .profiling import profiles
+from .logstore import LOG_FILE, TIME_BUCKETS, Aggregation, refresh_logs, query_logs, page_logs
+from .pagination import encode_cursor, decode_cursor, page_limit
+from .responses import StaticJson
+from .rollups import PERIODS, update_rollups
+from .timelines import invalidate_timelines, timeline_page
+from .submissions import SUBMIT_BATCH_MAX, submit_tweet_updates, submit_tweet_deletes, submit_tweet_creates, submit_user_updates
+from .serializers import USER_FIELDS, UPDATE_TWEET_FIELDS, DELETE_TWEET_FIELDS, CREATE_TWEET_FIELDS, UPDATE_USER_FIELDS, serialize_values
 from .saved_responses import *
+from itertools import islice
 import logging
 import pythonjsonlogger
 import os
 
 APP_DIR = os.path.dirname(os.path.abspath(__file__))
 
+#Page sizes of the logs view
+LOGS_PAGE_SIZE = 100
+LOGS_PAGE_MAX = 1000
+
+#Page sizes of the tweet timelines
+TIMELINE_PAGE_SIZE = 50
+TIMELINE_PAGE_MAX = 200
+
+#Page sizes of the user directory
+USERS_PAGE_SIZE = 100
+USERS_PAGE_MAX = 1000
+
+#Most profiles read by one batch lookup
+PROFILES_BATCH_MAX = 1000
+
+#Approximate size of a chunk of a streamed response
+STREAM_CHUNK = 65536
+
+#Urls shown to each role by index, encoded once
+ANONYMOUS_CATALOG = StaticJson(ANONYMOUS_USER)
+NORMAL_CATALOG = StaticJson(NORMAL_USER)
+ADMIN_CATALOG = StaticJson(ADMIN_USER)
+SUPER_ADMIN_CATALOG = StaticJson(SUPER_ADMIN_USER)
+
 #Initializing logger
 logger = logging.getLogger('twitter_logs')
 
+
+#Wait for queued log records to reach the file before reading it
+def flush_logs():
+	for handler in logger.handlers:
+		handler.flush()
+
+
+#Json encoded logs joined in chunks, positions are updated with every log written
+def log_chunks(stream, positions):
+	chunk = []
+	size = 0
+	for _, name, position, log in stream:
+		positions[name] = position
+		data = json.dumps(log)
+		chunk.append(data)
+		size += len(data)
+		if size >= STREAM_CHUNK:
+			yield ', '.join(chunk)
+			chunk = []
+			size = 0
+	if chunk:
+		yield ', '.join(chunk)
+
+
+#Timestamp and id of the last tweet of the previous timeline page, ValueError if malformed
+def timeline_cursor(request):
+	cursor = request.GET.get('cursor')
+	if cursor is None:
+		return None
+	try:
+		timestamp, tweet_id = decode_cursor(cursor)
+		timestamp = parse_datetime(timestamp)
+		tweet_id = int(tweet_id)
+	except (TypeError, ValueError):
+		raise ValueError('Invalid cursor.')
+	if timestamp is None or timestamp.tzinfo is None:
+		raise ValueError('Invalid cursor.')
+	return timestamp, tweet_id
+
+
+#Json array of logs written while they are read
+def stream_logs(stream):
+	yield b'['
+	for i, chunk in enumerate(log_chunks(stream, {})):
+		yield ((', ' if i else '') + chunk).encode('utf-8')
+	yield b']'
+
+
+#Page of logs followed by the cursor of the next page
+def stream_logs_page(stream, positions, limit):
+	yield b'{"logs": ['
+	for i, chunk in enumerate(log_chunks(islice(stream, limit), positions)):
+		yield ((', ' if i else '') + chunk).encode('utf-8')
+	cursor = encode_cursor(positions) if next(stream, None) is not None else None
+	yield '], "next": {}}}'.format(json.dumps(cursor)).encode('utf-8')
+
 # Create your views here.
 #default view
 def index(request):
@@ -25,13 +118,24 @@ def index(request):
 		u = request.user
 		#Show relevant urls to each user
 		if u.is_superuser:
-			return JsonResponse(SUPER_ADMIN_USER, safe=False)
+			return SUPER_ADMIN_CATALOG.response(request)
 		elif u.is_staff:
-			return JsonResponse(ADMIN_USER, safe=False)
+			return ADMIN_CATALOG.response(request)
 		else:
-			return JsonResponse(NORMAL_USER, safe=False)
+			return NORMAL_CATALOG.response(request)
 	else:
-		return JsonResponse(ANONYMOUS_USER, safe=False)
+		return ANONYMOUS_CATALOG.response(request)
+
+
+#Shown for GET requests of login_view
+LOGIN_HELP = StaticJson({
+	"message": "Please login to continue.",
+	"method": "POST",
+	"body": {
+		"username": "user_name",
+		"password": "password",
+	}
+})
 
 
 #Login controller
@@ -54,14 +158,7 @@ def login_view(request):
 			return HttpResponseRedirect(reverse('index'))
 		else:
 			return JsonResponse({"error": "Invalid username and/or password."})
-	return JsonResponse({
-		"message": "Please login to continue.",
-		"method": "POST",
-		"body": {
-			"username": "user_name",
-			"password": "password",
-			}
-		})
+	return LOGIN_HELP.response(request)
 
 
 #Logout controller
@@ -73,6 +170,21 @@ def logout_view(request):
 	return HttpResponseRedirect(reverse('index'))
 
 
+#Shown for GET requests of register
+REGISTER_HELP = StaticJson({
+	"method": "POST",
+	"body": {
+		"username": "user_name",
+		"email": "email",
+		"password": "password",
+		"confirmation": "repeat password",
+		"first_name": "first_name",
+		"last_name": "last_name",
+		"bio": "bio",
+	}
+})
+
+
 #Create new profile as a user
 @csrf_exempt
 def register(request):
@@ -114,18 +226,24 @@ def register(request):
 		except IntegrityError as e:
 			return JsonResponse({'error':'Email/Username address already taken.'})
 	else:
-		return JsonResponse({
-			"method": "POST",
-			"body": {
-				"username": "user_name",
-				"email": "email",
-				"password": "password",
-				"confirmation": "repeat password",
-				"first_name": "first_name",
-				"last_name": "last_name",
-				"bio": "bio",
-			}
-		})
+		return REGISTER_HELP.response(request)
+
+
+#Shown for GET requests of register_admin
+REGISTER_ADMIN_HELP = StaticJson({
+	"method": "POST",
+	"body": {
+		"username": "user_name",
+		"email": "email",
+		"password": "password",
+		"confirmation": "repeat password",
+		"first_name": "first_name",
+		"last_name": "last_name",
+		"bio": "bio",
+		"is_admin": "true or false without quotes",
+		"is_superadmin": "true or false without quotes",
+	},
+})
 
 
 #Superadmin creating new profile
@@ -178,20 +296,7 @@ def register_admin(request):
 			return JsonResponse({'error':'Email/Username address already taken.'})
 
 	else:
-		return JsonResponse({
-				"method": "POST",
-				"body": {
-					"username": "user_name",
-					"email": "email",
-					"password": "password",
-					"confirmation": "repeat password",
-					"first_name": "first_name",
-					"last_name": "last_name",
-					"bio": "bio",
-					"is_admin": "true or false without quotes",
-					"is_superadmin": "true or false without quotes",
-				},
-			})
+		return REGISTER_ADMIN_HELP.response(request)
 
 
 #Personal details
@@ -212,12 +317,19 @@ def stweets(request):
 	if u.is_staff or u.is_superuser:
 		return JsonResponse(BAD_REQUEST, safe=False)
 
-	#Getting all the tweets made by user in sorted order
-	tweets = Tweet.objects.filter(user=u).order_by("-timestamp").all()
+	#Check pagination
+	try:
+		cursor = timeline_cursor(request)
+		limit = page_limit(request, TIMELINE_PAGE_SIZE, TIMELINE_PAGE_MAX)
+	except ValueError:
+		return JsonResponse({"error": "Invalid limit or cursor."})
+
+	#Getting a page of the tweets made by user in sorted order
+	page = timeline_page(u.id, cursor, limit)
 
 	#log
 	logger.info('User:{} visits tweets page'.format(u.username), extra={'source': u.username, 'log_type': 'access'})
-	return JsonResponse([tweet.serialize() for tweet in tweets], safe=False)
+	return JsonResponse(page, safe=False)
 
 
 #Admin accessing all user profiles
@@ -228,12 +340,36 @@ def alluserprofile(request):
 	if (not u.is_staff) or u.is_superuser:
 		return JsonResponse(BAD_REQUEST, safe=False)
 	
-	#Get all user profiles
-	users = User.objects.filter(is_staff=False, is_superuser=False).all()
+	#Check pagination, the cursor is the id of the last user of the previous page
+	try:
+		after = int(decode_cursor(request.GET['cursor'])) if 'cursor' in request.GET else None
+		limit = page_limit(request, USERS_PAGE_SIZE, USERS_PAGE_MAX)
+	except (TypeError, ValueError):
+		return JsonResponse({"error": "Invalid limit or cursor."})
+
+	#Get a page of user profiles in order of id
+	users = User.objects.filter(is_staff=False, is_superuser=False)
+	if after is not None:
+		users = users.filter(id__gt=after)
+
+	#Prefix search, served by the case insensitive name indexes
+	q = request.GET.get('q', '').strip()
+	if q:
+		users = users.filter(Q(username__istartswith=q) | Q(first_name__istartswith=q) | Q(last_name__istartswith=q))
+	users = serialize_values(users.order_by('id')[:limit+1], USER_FIELDS)
+
+	#One more user than asked tells if there is a next page
+	next_cursor = None
+	if len(users) > limit:
+		users = users[:limit]
+		next_cursor = encode_cursor(users[-1]['id'])
 
 	#log
 	logger.info('Admin:{} accessing all user profiles.'.format(u.username), extra={'source': u.username, 'log_type': 'access',})
-	return JsonResponse([user.serialize() for user in users], safe=False)
+	return JsonResponse({
+			"users": users,
+			"next": next_cursor,
+		}, safe=False)
 
 
 #Admin accessing user details
@@ -259,6 +395,56 @@ def userprofile(request, user_id):
 		return JsonResponse(BAD_REQUEST, safe=False)
 
 
+#Shown for GET requests of userprofiles
+USERPROFILES_HELP = StaticJson({
+	"method": "POST",
+	"body": {
+		"user_ids": ["<int: user_id>"],
+	},
+})
+
+
+#Admin accessing the profiles of many users at once
+@csrf_exempt
+@login_required(login_url='/login')
+def userprofiles(request):
+	u = request.user
+
+	#Only admins read user profiles
+	if (not u.is_staff) or u.is_superuser:
+		return JsonResponse(BAD_REQUEST, safe=False)
+
+	if request.method == "POST":
+		data = json.loads(request.body.decode('utf-8'))
+		user_ids = data.get('user_ids') if isinstance(data, dict) else None
+		if not isinstance(user_ids, list) or not all(isinstance(user_id, int) and not isinstance(user_id, bool) for user_id in user_ids):
+			return JsonResponse({"error": "user_ids must be a list of user ids."})
+		if len(user_ids) > PROFILES_BATCH_MAX:
+			return JsonResponse({"error": "At most {} user ids allowed.".format(PROFILES_BATCH_MAX)})
+
+		#All users in one query, then the same checks as userprofile for each of them
+		users = User.objects.in_bulk(set(user_ids))
+		profiles = []
+		accessed = []
+		for user_id in user_ids:
+			user = users.get(user_id)
+			if user is None:
+				profiles.append({"id": user_id, "error": "user does not exist."})
+			elif user.is_staff or user.is_superuser:
+				profiles.append(dict(BAD_REQUEST, id=user_id))
+			else:
+				profiles.append(user.serialize())
+				accessed.append(user.username)
+
+		#log, a record per user so that queries on object find every access
+		for username in accessed:
+			logger.info('Admin:{} accesses User:{} profile in a batch'.format(u.username, username), extra={'source': u.username, 'log_type': 'access', 'object': 'user:{}'.format(username)})
+		return JsonResponse(profiles, safe=False)
+
+	else:
+		return USERPROFILES_HELP.response(request)
+
+
 #Admin accessing tweets posted by some user
 @login_required(login_url='/login')
 def usertweets(request, user_id):
@@ -272,19 +458,33 @@ def usertweets(request, user_id):
 
 	#admin accessing some other user tweets
 	if (u.id != user_id) and (u.is_staff and (not u.is_superuser) and (not user.is_staff) and (not user.is_superuser)):
-		tweets = Tweet.objects.filter(user=user).order_by("-timestamp").all()
+
+		#Check pagination
+		try:
+			cursor = timeline_cursor(request)
+			limit = page_limit(request, TIMELINE_PAGE_SIZE, TIMELINE_PAGE_MAX)
+		except ValueError:
+			return JsonResponse({"error": "Invalid limit or cursor."})
+		page = timeline_page(user.id, cursor, limit)
 
 		#log
 		logger.info('Admin:{} accesses User:{} tweets'.format(u.username, user.username), extra={'source': u.username, 'log_type': 'access', 'object': 'user:{}'.format(user.username)})
-		return JsonResponse({
-		 	"tweets": [tweet.serialize() for tweet in tweets],
-			}, safe=False)
+		return JsonResponse(page, safe=False)
 	
 	#Bad request
 	else:
 		return JsonResponse(BAD_REQUEST, safe=False)
 
 
+#Shown for GET requests of new_tweet
+NEW_TWEET_HELP = StaticJson({
+	"method": "POST",
+	"body": {
+		"tweet": "tweet",
+	},
+})
+
+
 #User posting new tweet
 @csrf_exempt
 @login_required(login_url='/login')
@@ -312,6 +512,7 @@ def new_tweet(request):
 		#Attempt to create new tweet
 		try:
 			t = Tweet.objects.create(user=user, tweet=tweet)
+			invalidate_timelines([user.id])
 
 			#log
 			logger.info('User:{} posted new tweet with id:{}'.format(user.username, t.id), extra={'source': user.username, 'log_type': 'action', 'object': 'tweet:{}'.format(t.id)})
@@ -320,12 +521,17 @@ def new_tweet(request):
 			return JsonResponse(REQUEST_FAILED, safe=False)
 
 	else:
-		return JsonResponse({
-				"method": "POST",
-				"body": {
-					"tweet": "tweet",
-				},
-			})
+		return NEW_TWEET_HELP.response(request)
+
+
+#Shown for GET requests of edit_tweet
+EDIT_TWEET_HELP = StaticJson({
+	"method": "PUT",
+	"body": {
+		"tweet_id": "<int: tweet_id>",
+		"new_tweet": "new_tweet",
+	},
+})
 
 
 #User editing his tweet
@@ -361,6 +567,7 @@ def edit_tweet(request):
 		try:
 			tweet.tweet = new_tweet
 			tweet.save()
+			invalidate_timelines([u.id])
 
 			#log
 			logger.info('User:{} edited his tweet with id:{}'.format(u.username, tweet.id), extra={'source': u.username, 'log_type': 'audit', 'object': 'tweet:{}'.format(tweet.id)})
@@ -369,13 +576,16 @@ def edit_tweet(request):
 			return JsonResponse(REQUEST_FAILED, safe=False)
 
 	else:
-		return JsonResponse({
-				"method": "PUT",
-				"body": {
-					"tweet_id": "<int: tweet_id>",
-					"new_tweet": "new_tweet",
-				},
-			})
+		return EDIT_TWEET_HELP.response(request)
+
+
+#Shown for GET requests of delete_tweet
+DELETE_TWEET_HELP = StaticJson({
+	"method": "PUT",
+	"body": {
+		"tweet_id": "<int: tweet_id>",
+	},
+})
 
 
 #User deleting his tweet
@@ -406,6 +616,7 @@ def delete_tweet(request):
 		try:
 			t_id = tweet.id
 			tweet.delete()
+			invalidate_timelines([u.id])
 
 			#log
 			logger.info('User:{} deleted his tweet with id:{}'.format(u.username, t_id), extra={'source': u.username, 'log_type': 'audit', 'object': 'tweet:{}'.format(t_id)})
@@ -414,12 +625,17 @@ def delete_tweet(request):
 			return JsonResponse(REQUEST_FAILED, safe=False)
 
 	else:
-		return JsonResponse({
-				"method": "PUT",
-				"body": {
-					"tweet_id": "<int: tweet_id>",
-				},
-			})
+		return DELETE_TWEET_HELP.response(request)
+
+
+#Shown for GET requests of update_tweet_request
+UPDATE_TWEET_REQUEST_HELP = StaticJson({
+	"method": "POST",
+	"body":{
+		"tweet_id":"<int: tweet_id>",
+		"new_tweet":"updated_tweet",
+	},
+})
 
 
 #Admin makes a request to update a tweet
@@ -435,42 +651,19 @@ def update_tweet_request(request):
 	if request.method == "POST":
 		data = json.loads(request.body.decode('utf-8'))
 
-		#Check if tweet_id is valid
-		try:
-			tweet = Tweet.objects.get(id=data.get('tweet_id'))
-		except:
-			return JsonResponse({"error": "tweet not present."})
-
-		#Check if new_tweet is valid
-		new_tweet = data.get('new_tweet')
-		if not new_tweet:
-			return JsonResponse({"error": "tweet cannot be empty."})
-
-		new_tweet = new_tweet.strip()
-		if len(new_tweet)>280 or len(new_tweet)==0:
-			return JsonResponse({"error": "tweet must be less than or equal to 280 characters and must not be empty."})
+		#Validated and saved by the same path as the batch endpoint
+		return JsonResponse(submit_tweet_updates(u, [data])[0], safe=False)
+	else:
+		return UPDATE_TWEET_REQUEST_HELP.response(request)
 
-		#Attempt to save update request
-		try:
-			ut = UpdateTweet.objects.create(
-					admin = u,
-					tweet = tweet,
-					new_tweet = new_tweet
-				)
 
-			#log
-			logger.info('Admin:{} requested an update of tweet with id:{}'.format(u.username, tweet.id), extra={'source': u.username, 'log_type': 'action', 'object': 'tweet:{}'.format(tweet.id)})
-			return JsonResponse(REQUEST_SUCCESS, safe=False)
-		except:
-			return JsonResponse(REQUEST_FAILED, safe=False)
-	else:
-		return JsonResponse({
-			"method": "POST",
-			"body":{
-				"tweet_id":"<int: tweet_id>",
-				"new_tweet":"updated_tweet",
-				},
-			})
+#Shown for GET requests of delete_tweet_request
+DELETE_TWEET_REQUEST_HELP = StaticJson({
+	"method": "POST",
+	"body": {
+		"tweet_id": "<int: tweet_id>",
+	},
+})
 
 
 #Admin makes a request to delete a tweet
@@ -486,32 +679,21 @@ def delete_tweet_request(request):
 	if request.method == "POST":
 		data = json.loads(request.body.decode('utf-8'))
 
-		#Check if tweet_id is valid
-		try:
-			tweet = Tweet.objects.get(id=data.get('tweet_id'))
-		except:
-			return JsonResponse({"error": "tweet not present."})
+		#Validated and saved by the same path as the batch endpoint
+		return JsonResponse(submit_tweet_deletes(u, [data])[0], safe=False)
 
-		#Attempt to save delete request
-		try:
-			DeleteTweet.objects.create(
-					admin=u,
-					tweet=tweet,
-				)
+	else:
+		return DELETE_TWEET_REQUEST_HELP.response(request)
 
-			#log
-			logger.info('Admin:{} requested deletion of tweet with id:{}'.format(u.username, tweet.id), extra={'source': u.username, 'log_type': 'action', 'object': 'tweet:{}'.format(tweet.id)})
-			return JsonResponse(REQUEST_SUCCESS, safe=False)
-		except:
-			return JsonResponse(REQUEST_FAILED, safe=False)
 
-	else:
-		return JsonResponse({
-				"method": "POST",
-				"body": {
-					"tweet_id": "<int: tweet_id>",
-				},
-			})
+#Shown for GET requests of create_tweet_request
+CREATE_TWEET_REQUEST_HELP = StaticJson({
+	"method": "POST",
+	"body": {
+		"user_id": "<int: user_id>",
+		"tweet": "tweet content",
+	},
+})
 
 
 #Admin makes a request to create a tweet
@@ -527,45 +709,23 @@ def create_tweet_request(request):
 	if request.method == "POST":
 		data = json.loads(request.body.decode('utf-8'))
 
-		#Check if user_id is valid
-		try:
-			user = User.objects.get(id=data.get('user_id'))
-		except:
-			return JsonResponse({"error": "user not present."})
-		if user.is_staff or user.is_superuser:
-			return JsonResponse({"error": "not have access to tweet from this user."})
-
-		#Check if tweet is valid
-		tweet = data.get('tweet')
-		if not tweet:
-			return JsonResponse({"error": "tweet not present."})
-
-		tweet = tweet.strip()
-		if len(tweet)==0 or len(tweet)>280:
-			return JsonResponse({"error": "tweet must be less than or equal to 280 characters and must not be empty."})
+		#Validated and saved by the same path as the batch endpoint
+		return JsonResponse(submit_tweet_creates(u, [data])[0], safe=False)
 
-		#Attempt to save create tweet request
-		try:
-			CreateTweet.objects.create(
-					admin=u,
-					userid=user.id,
-					tweet=tweet
-				)
+	else:
+		return CREATE_TWEET_REQUEST_HELP.response(request)
 
-			#log
-			logger.info('Admin:{} requested posting of tweet from User:{}'.format(u.username, user.username), extra={'source': u.username, 'log_type': 'action', 'object': 'user:{}'.format(user.username)})
-			return JsonResponse(REQUEST_SUCCESS, safe=False)
-		except:
-			return JsonResponse(REQUEST_FAILED, safe=False)
 
-	else:
-		return JsonResponse({
-				"method": "POST",
-				"body": {
-					"user_id": "<int: user_id>",
-					"tweet": "tweet content",
-				},
-			})
+#Shown for GET requests of update_user_request
+UPDATE_USER_REQUEST_HELP = StaticJson({
+	"method": "POST",
+	"body": {
+		"user_id": "<int: user_id>",
+		"new_bio": "new_bio",
+		"new_first_name": "new_first_name",
+		"new_last_name": "new_last_name",
+	},
+})
 
 
 #Admin makes a request to update user details
@@ -581,52 +741,103 @@ def update_user_request(request):
 	if request.method=="POST":
 		data = json.loads(request.body.decode('utf-8'))
 
-		#Check if user_id is valid
-		try:
-			user = User.objects.get(id=data.get('user_id'))
-		except:
-			return JsonResponse({"error": "user not present."})
-		if user.is_staff or user.is_superuser:
-			return JsonResponse({"error": "not have access to update this user."})
+		#Validated and saved by the same path as the batch endpoint
+		return JsonResponse(submit_user_updates(u, [data])[0], safe=False)
 
-		#Get updated details
-		new_first_name = data.get('new_first_name', '')
-		new_last_name = data.get('new_last_name', '')
-		new_bio = data.get('new_bio', '')
+	else:
+		return UPDATE_USER_REQUEST_HELP.response(request)
 
-		#Check if atleast one field is present
-		if not (len(new_bio) or len(new_first_name) or len(new_last_name)):
-			return JsonResponse({"error": "Provide atleast one updated field."})
 
-		#Attempt to save user details update request
-		try:
-			upuser = UpdateUser.objects.create(
-					admin=u,
-					user=user
-				)
-			if new_first_name:
-				upuser.new_first_name = new_first_name
-			if new_last_name:
-				upuser.new_last_name = new_last_name
-			if new_bio:
-				upuser.new_bio = new_bio
-			upuser.save()
-			#log
-			logger.info("Admin:{} requested an update of User:{}'s profile".format(u.username, user.username), extra={'source': u.username, 'log_type': 'action', 'object': 'user:{}'.format(user.username)})
-			return JsonResponse(REQUEST_SUCCESS, safe=False)
-		except:
-			return JsonResponse(REQUEST_FAILED, safe=False)
+
+#Admin submitting many requests of one kind, answered item by item
+def submit_batch(request, submit, form):
+	u = request.user
+
+	#Only admin allowed to make a request
+	if (not u.is_staff) or u.is_superuser:
+		return JsonResponse(BAD_REQUEST, safe=False)
+
+	if request.method == "POST":
+		items = json.loads(request.body.decode('utf-8'))
+		if not isinstance(items, list):
+			return JsonResponse({"error": "Body must be a list of requests."})
+		if len(items) > SUBMIT_BATCH_MAX:
+			return JsonResponse({"error": "At most {} requests allowed.".format(SUBMIT_BATCH_MAX)})
+		return JsonResponse(submit(u, items), safe=False)
 
 	else:
-		return JsonResponse({
-				"method": "POST",
-				"body": {
-					"user_id": "<int: user_id>",
-					"new_bio": "new_bio",
-					"new_first_name": "new_first_name",
-					"new_last_name": "new_last_name",
-				},
-			})
+		return form.response(request)
+
+
+#Shown for GET requests of the batch endpoints
+UPDATE_TWEET_REQUESTS_HELP = StaticJson({
+	"method": "POST",
+	"body": [
+		{
+			"tweet_id": "<int: tweet_id>",
+			"new_tweet": "updated_tweet",
+		},
+	],
+})
+
+DELETE_TWEET_REQUESTS_HELP = StaticJson({
+	"method": "POST",
+	"body": [
+		{
+			"tweet_id": "<int: tweet_id>",
+		},
+	],
+})
+
+CREATE_TWEET_REQUESTS_HELP = StaticJson({
+	"method": "POST",
+	"body": [
+		{
+			"user_id": "<int: user_id>",
+			"tweet": "tweet content",
+		},
+	],
+})
+
+UPDATE_USER_REQUESTS_HELP = StaticJson({
+	"method": "POST",
+	"body": [
+		{
+			"user_id": "<int: user_id>",
+			"new_bio": "new_bio",
+			"new_first_name": "new_first_name",
+			"new_last_name": "new_last_name",
+		},
+	],
+})
+
+
+#Admin makes requests to update many tweets
+@csrf_exempt
+@login_required(login_url='/login')
+def update_tweet_requests(request):
+	return submit_batch(request, submit_tweet_updates, UPDATE_TWEET_REQUESTS_HELP)
+
+
+#Admin makes requests to delete many tweets
+@csrf_exempt
+@login_required(login_url='/login')
+def delete_tweet_requests(request):
+	return submit_batch(request, submit_tweet_deletes, DELETE_TWEET_REQUESTS_HELP)
+
+
+#Admin makes requests to create many tweets
+@csrf_exempt
+@login_required(login_url='/login')
+def create_tweet_requests(request):
+	return submit_batch(request, submit_tweet_creates, CREATE_TWEET_REQUESTS_HELP)
+
+
+#Admin makes requests to update details of many users
+@csrf_exempt
+@login_required(login_url='/login')
+def update_user_requests(request):
+	return submit_batch(request, submit_user_updates, UPDATE_USER_REQUESTS_HELP)
 
 
 #Superadmin accessing requests related to user details
@@ -638,12 +849,13 @@ def request_user(request):
 	if not u.is_superuser:
 		return JsonResponse(BAD_REQUEST, safe=False)
 
-	#Get requests which are not responded till now in sorted order
-	ureqs = UpdateUser.objects.filter(responded=False).order_by("timestamp").all()
+	#Get requests which are not responded till now in sorted order, with their users joined in the same query
+	#responded=False with ordering on timestamp is served by the partial pending index of the table
+	ureqs = UpdateUser.objects.filter(responded=False).order_by("timestamp")
 
 	#log
 	logger.info('Superadmin:{} accesses requests related to user details'.format(u.username), extra={'source': u.username, 'log_type': 'access'})
-	return JsonResponse([ureq.serialize() for ureq in ureqs], safe=False)
+	return JsonResponse(serialize_values(ureqs, UPDATE_USER_FIELDS, action="update"), safe=False)
 
 
 #Superadmin accessing requests related to tweet CUD
@@ -655,20 +867,74 @@ def request_tweets(request):
 	if not u.is_superuser:
 		return JsonResponse(BAD_REQUEST, safe=False)
 
-	#Getting requests which are not responded till now in sorted order
-	ureqs = UpdateTweet.objects.filter(responded=False).order_by("timestamp").all()
-	dreqs = DeleteTweet.objects.filter(responded=False).order_by("timestamp").all()
-	creqs = CreateTweet.objects.filter(responded=False).order_by("timestamp").all()
+	#Getting requests which are not responded till now in sorted order, with their tweets and users joined in the same query
+	#Served by the partial pending indexes, so the cost follows the pending requests and not the history
+	ureqs = UpdateTweet.objects.filter(responded=False).order_by("timestamp")
+	dreqs = DeleteTweet.objects.filter(responded=False).order_by("timestamp")
+	creqs = CreateTweet.objects.filter(responded=False).order_by("timestamp")
 
 	#log
 	logger.info('Superadmin:{} accesses requests related to CUD of tweets'.format(u.username), extra={'source': u.username, 'log_type': 'access'})
 	return JsonResponse({
-			"update_request": [ureq.serialize() for ureq in ureqs],
-			"delete_request": [dreq.serialize() for dreq in dreqs],
-			"create_request": [creq.serialize() for creq in creqs],
+			"update_request": serialize_values(ureqs, UPDATE_TWEET_FIELDS, action="update"),
+			"delete_request": serialize_values(dreqs, DELETE_TWEET_FIELDS, action="delete"),
+			"create_request": serialize_values(creqs, CREATE_TWEET_FIELDS, action="create"),
 		}, safe=False)
 
 
+
+#Shown for GET requests of request_claim
+REQUEST_CLAIM_HELP = StaticJson({
+	"method": "POST",
+	"body": {
+		"type": "update_user, update_tweet, delete_tweet or create_tweet",
+		"count": "<int: number of requests to claim, at most 100>",
+	},
+})
+
+
+#Superadmin claiming a batch of pending requests so other superadmins skip them
+@csrf_exempt
+@login_required(login_url='/login')
+def request_claim(request):
+	u = request.user
+
+	#Check if superadmin or not
+	if not u.is_superuser:
+		return JsonResponse(BAD_REQUEST, safe=False)
+
+	if request.method == "POST":
+		data = json.loads(request.body.decode('utf-8'))
+		if not isinstance(data, dict):
+			return JsonResponse(BAD_REQUEST, safe=False)
+
+		try:
+			requests, expires = claim_requests(u, data.get('type'), data.get('count', 10))
+		except ValueError as e:
+			return JsonResponse({"error": str(e)})
+
+		return JsonResponse({
+				"type": data.get('type'),
+				"claimed_until": expires.strftime("%b %d %Y, %I:%M %p"),
+				"requests": requests,
+			})
+
+	else:
+		return REQUEST_CLAIM_HELP.response(request)
+
+
+#Shown for GET requests of respond_users
+RESPOND_USERS_HELP = StaticJson({
+	"method": "PUT",
+	"body": [
+		{
+			"request_id": "<int: request_id>",
+			"action_granted": "true or false without quotes",
+		},
+	],
+})
+
+
 #Superadmin responding to requests related to user details
 @csrf_exempt
 @login_required(login_url='/login')
@@ -681,79 +947,27 @@ def respond_users(request):
 
 	if request.method == "PUT":
 		responses = json.loads(request.body.decode('utf-8'))
+		error = responses_error(responses)
+		if error is not None:
+			return JsonResponse({"error": error})
 
-		return_json = []
-		for response in responses:
-			try:
-				upuser = UpdateUser.objects.get(id=response.get('request_id'))
-
-			#Check if request_id is valid
-			except:
-				return_json.append({
-						"request_id": response.get('request_id'),
-						"error": "Id not present.",
-					})
-				continue
-
-			#Attempt to update request_id if action is not granted
-			upuser.responded = True
-			user = upuser.user
-			if not response.get('action_granted', False):
-				try:
-					upuser.save()
-					return_json.append({
-						"request_id": response.get('request_id'),
-						"message": "Response saved.",
-					})
-
-					#log
-					logger.info('Superadmin:{} rejected request to update User:{} details from Admin:{}'.format(u.username, user.username, upuser.admin.username), extra={'source': u.username, 'log_type': 'audit', 'object': 'user:{}'.format(upuser.admin.username)})
-					continue
-				except:
-					return_json.append({
-						"request_id": response.get('request_id'),
-						"error": "Response failed.",
-					})
-					continue
-
-			#Assigning changes
-			upuser.action_granted = True
-			if len(upuser.new_first_name):
-				user.first_name = upuser.new_first_name
-			if len(upuser.new_last_name):
-				user.last_name = upuser.new_last_name
-			if len(upuser.new_bio):
-				user.bio = upuser.new_bio
-
-			#Attempt to update request_id and user details
-			try:
-				user.save()
-				upuser.save()
-				return_json.append({
-						"request_id": response.get('request_id'),
-						"message": "Response saved.",
-					})
-
-				#log
-				logger.info('Superadmin:{} approved request to update User:{} details from Admin:{}'.format(u.username, user.username, upuser.admin.username), extra={'source': u.username, 'log_type': 'audit', 'object': 'user:{}'.format(upuser.admin.username)})
-			except:
-				return_json.append({
-						"request_id": response.get('request_id'),
-						"error": "Response failed.",
-					})
-
-		return JsonResponse(return_json, safe=False)
+		#All responses are applied together in one transaction
+		return JsonResponse(respond_user_updates(u, responses), safe=False)
 
 	else:
-		return JsonResponse({
-				"method": "PUT",
-				"body": [
-					{
-						"request_id": "<int: request_id>",
-						"action_granted": "true or false without quotes",
-					},
-				],				
-			})
+		return RESPOND_USERS_HELP.response(request)
+
+
+#Shown for GET requests of respond_tweets_update
+RESPOND_TWEETS_UPDATE_HELP = StaticJson({
+	"method": "PUT",
+	"body": [
+		{
+			"request_id": "<int: request_id>",
+			"action_granted": "true or false without quotes",
+		},
+	],
+})
 
 
 #Superadmin responding to requests related to tweets update
@@ -767,51 +981,28 @@ def respond_tweets_update(request):
 		return JsonResponse(BAD_REQUEST, safe=False)
 
 	if request.method=="PUT":
-		return_json = []
 		responses = json.loads(request.body.decode('utf-8'))
+		error = responses_error(responses)
+		if error is not None:
+			return JsonResponse({"error": error})
 
-		for response in responses:
-
-			#Check if request_id is valid or not
-			try:
-				update_tweet = UpdateTweet.objects.get(id=response.get('request_id'))
-			except:
-				return_json.append({"request_id": response.get('request_id'), "error": "Id not present."})
-
-			update_tweet.responded = True
-			tweet = update_tweet.tweet
-
-			#if action granted then update tweet
-			if response.get('action_granted', False):
-				tweet.tweet = update_tweet.new_tweet
-				update_tweet.action_granted = True
-			else:
-				#log
-				logger.info('Superadmin:{} rejected request to update Tweet:{} from Admin:{}'.format(u.username, tweet.id, update_tweet.admin.username), extra={'source': u.username, 'log_type': 'audit', 'object': 'user:{}'.format(update_tweet.admin.username)})
+		#All responses are applied together in one transaction
+		return JsonResponse(respond_tweet_updates(u, responses), safe=False)
 
-			#Attempt to save the updated tweet and request_id
-			try:
-				update_tweet.save()
-				tweet.save()
-				return_json.append({"request_id": response.get('request_id'), "message": "Response saved."})
-				if update_tweet.action_granted:
-					#log
-					logger.info('Superadmin:{} approved request to update Tweet:{} from Admin:{}'.format(u.username, tweet.id, update_tweet.admin.username), extra={'source': u.username, 'log_type': 'audit', 'object': 'user:{}'.format(update_tweet.admin.username)})
-			except:
-				return_json.append({"request_id": response.get('request_id'), "error": "Response failed."})
+	else:
+		return RESPOND_TWEETS_UPDATE_HELP.response(request)
 
-		return JsonResponse(return_json, safe=False)
 
-	else:
-		return JsonResponse({
-				"method": "PUT",
-				"body": [
-					{
-						"request_id": "<int: request_id>",
-						"action_granted": "true or false without quotes",
-					},
-				],
-			})
+#Shown for GET requests of respond_tweets_delete
+RESPOND_TWEETS_DELETE_HELP = StaticJson({
+	"method": "PUT",
+	"body": [
+		{
+			"request_id": "<int: request_id>",
+			"action_granted": "true or false without quotes",
+		},
+	],
+})
 
 
 #Superadmin is responding to requests related to tweets delete
@@ -825,51 +1016,28 @@ def respond_tweets_delete(request):
 		return JsonResponse(BAD_REQUEST, safe=False)
 
 	if request.method == "PUT":
-		return_json = []
 		responses = json.loads(request.body.decode('utf-8'))
+		error = responses_error(responses)
+		if error is not None:
+			return JsonResponse({"error": error})
 
-		for response in responses:
+		#All responses are applied together in one transaction
+		return JsonResponse(respond_tweet_deletes(u, responses), safe=False)
 
-			#Check if request_id is valid
-			try:
-				delete_tweet = DeleteTweet.objects.get(id=response.get('request_id'))
-			except:
-				return_json.append({"request_id": response.get('request_id'), "error": "Id not present"})
-
-			delete_tweet.responded = True
-			tweet = delete_tweet.tweet
-			tweet_id = tweet.id
-			admin = delete_tweet.admin
-			if response.get('action_granted', False):
-				delete_tweet.action_granted = True
-			else:
-				#log
-				logger.info('Superadmin:{} rejected request to delete Tweet:{} from Admin:{}'.format(u.username, tweet_id, admin.username), extra={'source': u.username, 'log_type': 'audit', 'object': 'user:{}'.format(admin.username)})
+	else:
+		return RESPOND_TWEETS_DELETE_HELP.response(request)
 
-			#Attempt to save request_id and delete tweet if granted
-			try:
-				delete_tweet.save()
-				if response.get('action_granted', False):
-					tweet.delete()
-					#log
-					logger.info('Superadmin:{} approved request to delete Tweet:{} from Admin:{}'.format(u.username, tweet_id, admin.username), extra={'source': u.username, 'log_type': 'audit', 'object': 'user:{}'.format(admin.username)})
-				return_json.append({"request_id": response.get('request_id'), "message": "Response saved."})
-			except:
-				return_json.append({"request_id": response.get('request_id'), "error":
-					"Response failed."})
-
-		return JsonResponse(return_json, safe=False)
 
-	else:
-		return JsonResponse({
-				"method": "PUT",
-				"body": [
-					{
-						"request_id": "<int: request_id>",
-						"action_granted": "true or false without quotes",
-					},
-				],
-			})
+#Shown for GET requests of respond_tweets_create
+RESPOND_TWEETS_CREATE_HELP = StaticJson({
+	"method": "PUT",
+	"body": [
+		{
+			"request_id": "<int: request_id>",
+			"action_granted": "true or false without quotes",
+		},
+	],
+})
 
 
 #Superadmin is responding to requests related to tweets create
@@ -883,51 +1051,60 @@ def respond_tweets_create(request):
 		return JsonResponse(BAD_REQUEST, safe=False)
 
 	if request.method == "PUT":
-		return_json = []
 		responses = json.loads(request.body.decode('utf-8'))
+		error = responses_error(responses)
+		if error is not None:
+			return JsonResponse({"error": error})
 
-		for response in responses:
+		#All responses are applied together in one transaction
+		return JsonResponse(respond_tweet_creates(u, responses), safe=False)
 
-			#Check if request_id is valid
-			try:
-				create_tweet = CreateTweet.objects.get(id=response.get('request_id'))
-			except:
-				return_json.append({"request_id": response.get('request_id'), "error": "Id not present."})
+	else:
+		return RESPOND_TWEETS_CREATE_HELP.response(request)
 
-			create_tweet.responded = True
-			admin = create_tweet.admin
-			create_tweet.action_granted = response.get('action_granted', False)
 
-			#Attempt to save updated request_id and create tweet if granted
-			try:
-				#Posting new tweet if granted
-				if response.get('action_granted', False):
-					user = User.objects.get(id=create_tweet.userid)
-					t = Tweet.objects.create(user=user, tweet=create_tweet)
-
-					#log
-					logger.info('Superadmin:{} approved request to create new Tweet:{} from Admin:{}'.format(u.username, t.id, admin.username), extra={'source': u.username, 'log_type': 'audit', 'object': 'user:{}'.format(admin.username)})
-				else:
-					#log
-					logger.info('Superadmin:{} rejected request to create new Tweet from Admin:{}'.format(u.username, admin.username), extra={'source': u.username, 'log_type': 'audit', 'object': 'user:{}'.format(admin.username)})
-				create_tweet.save()
-				return_json.append({"request_id": response.get('request_id'), "message": "Response saved."})
-			except:
-				return_json.append({"request_id": response.get('request_id'), "error": "Response failed."})
-
-		return JsonResponse(return_json, safe=False)
 
-	else:
-		return JsonResponse({
-				"method": "PUT",
-				"body": [
-					{
-						"request_id": "<int: request_id>",
-						"action_granted": "true or false without quotes",
-					},
-				],
-			})
+#Shown for GET requests of respond_filter
+RESPOND_FILTER_HELP = StaticJson({
+	"method": "PUT",
+	"body": {
+		"type": "update_user, update_tweet, delete_tweet or create_tweet",
+		"action_granted": "true or false without quotes",
+		"filter": {
+			"admin": "username of the admin who made the requests",
+			"user": "username of the user the requests are made for",
+			"before": "requests made before this time, like 2020-12-20 14:18",
+			"after": "requests made after this time, like 2020-12-20 14:18",
+		},
+	},
+})
+
+
+#Superadmin responding to every pending request of a type matching a filter
+@csrf_exempt
+@login_required(login_url='/login')
+def respond_filter(request):
+	u = request.user
+
+	#Check if superadmin or not
+	if not u.is_superuser:
+		return JsonResponse(BAD_REQUEST, safe=False)
+
+	if request.method == "PUT":
+		data = json.loads(request.body.decode('utf-8'))
+		if not isinstance(data, dict):
+			return JsonResponse(BAD_REQUEST, safe=False)
+
+		#Only the oldest matching requests are answered per call, remaining tells how many are left
+		try:
+			summary = respond_by_filter(u, data.get('type'), bool(data.get('action_granted', False)), data.get('filter'))
+		except ValueError as e:
+			return JsonResponse({"error": str(e)})
+
+		return JsonResponse(summary)
 
+	else:
+		return RESPOND_FILTER_HELP.response(request)
 
 #Superadmin accessing logs
 @login_required(login_url='/login')
@@ -938,20 +1115,56 @@ def logs(request):
 	if not u.is_superuser:
 		return JsonResponse(BAD_REQUEST, safe=False)
 
-	#Trying to get the logs from file
+	#Check pagination, a cursor is the position reached in every log file
 	try:
-		with open(os.path.join(APP_DIR, 'twitter_logs.log'), 'r') as f:
-			j_dict = []
-			lines = f.readlines()
-			for line in lines:
-				j_dict.append(json.loads(line.strip()))
-
-			#log
-			logger.info('Superadmin:{} accessing logs'.format(u.username), extra={'source': u.username, 'log_type': 'access'})
-			return JsonResponse(j_dict, safe=False)
+		before = request.GET.get('before')
+		after = request.GET.get('after')
+		if before is not None and after is not None:
+			raise ValueError('Only one cursor allowed.')
+		positions = decode_cursor(before or after) if (before or after) else None
+		if positions is not None and not (isinstance(positions, dict) and all(isinstance(v, int) and not isinstance(v, bool) and v >= 0 for v in positions.values())):
+			raise ValueError('Invalid cursor.')
+		paginate = 'limit' in request.GET or positions is not None
+		limit = page_limit(request, LOGS_PAGE_SIZE, LOGS_PAGE_MAX)
+	except ValueError:
+		return JsonResponse({"error": "Invalid limit or cursor."})
+
+	#Newest first when asked for or when going back from a cursor
+	reverse = before is not None or request.GET.get('order') == 'desc'
+
+	#Trying to get the logs of every log file
+	flush_logs()
+	try:
+		positions, stream = page_logs(LOG_FILE, positions, reverse)
 	except:
 		return JsonResponse(REQUEST_FAILED, safe=False)
 
+	#log
+	logger.info('Superadmin:{} accessing logs'.format(u.username), extra={'source': u.username, 'log_type': 'access'})
+	if paginate:
+		return StreamingHttpResponse(stream_logs_page(stream, positions, limit), content_type='application/json')
+	return StreamingHttpResponse(stream_logs(stream), content_type='application/json')
+
+
+#Shown for GET requests of logs_query
+LOGS_QUERY_HELP = StaticJson({
+	"method": "POST",
+	"body": {
+		"show_logs": "true or false without quotes",
+		"query": {
+			"from": "oldest entry in query to be considered. Time must be in asctime format",
+			"to": "latest entry in query to be considered. Time must be in asctime format",
+			"log_type": "action or audit or access (any one)",
+			"source": "username of the user performing access/action/audit.",
+			"object": "user:username or tweet:tweet_id",
+			"message": "words that must be present in message of log",
+		},
+		"group_by": "source, log_type or object, or a list of them (optional)",
+		"bucket": "minute, hour or day to count per time bucket (optional)",
+		"top": "<int: only the N largest groups> (optional)",
+	},
+})
+
 
 #Superadmin generating insights from logs
 @csrf_exempt
@@ -966,69 +1179,135 @@ def logs_query(request):
 	if request.method == "POST":
 		data = json.loads(request.body.decode('utf-8'))
 
-		#Attempt to read logs from file
+		#Attempt to bring the log index up to date
+		flush_logs()
 		try:
-			with open(os.path.join(APP_DIR, 'twitter_logs.log'), 'r') as f:
-				lines = f.readlines()
+			refresh_logs(LOG_FILE)
 		except:
 			return JsonResponse(REQUEST_FAILED, safe=False)
 
-		#function to see if log satisfies query condition
-		def check_cond(log, query):
-			for key in query.keys():
-				if key == "message":
-					if query[key].lower() not in log[key].lower():
-						return False
-				elif key == "from":
-					if query[key]>log['asctime']:
-						return False
-				elif key == "to":
-					if query[key]<log['asctime']:
-						return False
-				elif query[key] != log.get(key, ''):
-					return False
-			return True
-
 		#Check if query present or not
 		if data.get('query') is None:
 			return JsonResponse({"error": "No query present in request."}) 
 
-		#Getting all log that satisfies query condition
+		#Check grouping of the counts
+		aggregation = None
+		if data.get('group_by') is not None or data.get('bucket') is not None:
+			group_by = data.get('group_by') or []
+			if isinstance(group_by, str):
+				group_by = [group_by]
+			try:
+				aggregation = Aggregation(group_by, data.get('bucket'), data.get('top'))
+			except (TypeError, ValueError) as e:
+				return JsonResponse({"error": str(e)})
+
+		#Getting all log that satisfies query condition from the indexes of every log file
 		j_dict = []
 		cnt = 0
-		for line in lines:
-			log = json.loads(line)
-			if check_cond(log, data['query']):
-				cnt += 1
-				if data.get('show_logs', False):
-					j_dict.append(log)
+		for log in query_logs(LOG_FILE, data['query']):
+			cnt += 1
+			if data.get('show_logs', False):
+				j_dict.append(log)
+			if aggregation is not None:
+				aggregation.add(log)
+
+		result = {
+			"count": cnt,
+			"logs": j_dict,
+		}
+		if aggregation is not None:
+			result["groups"] = aggregation.groups()
 
 		#log
 		logger.info('Superadmin:{} quering from logs'.format(u.username), extra={'source': u.username, 'log_type': 'access'})
-		return JsonResponse({
-				"count": cnt,
-				"logs": j_dict,
-			}, safe=False)
+		return JsonResponse(result, safe=False)
 
 	else:
-		return JsonResponse({
-				"method": "POST",
-				"body": {
-					"show_logs": "true or false without quotes",
-					"query": {
-						"from": "oldest entry in query to be considered. Time must be in asctime format",
-						"to": "latest entry in query to be considered. Time must be in asctime format",
-						"log_type": "action or audit or access (any one)",
-						"source": "username of the user performing access/action/audit.",
-						"object": "user:username or tweet:tweet_id",
-						"message": "words that must be present in message of log",
-					},
-				},
-			})
+		return LOGS_QUERY_HELP.response(request)
+
+
+#Superadmin reading hourly or daily counts of log records
+@login_required(login_url='/login')
+def logs_rollups(request):
+	u = request.user
+
+	#Check if superadmin or not
+	if not u.is_superuser:
+		return JsonResponse(BAD_REQUEST, safe=False)
+
+	period = request.GET.get('period', 'day')
+	if period not in PERIODS:
+		return JsonResponse({"error": "period must be hour or day."})
+
+	#Count the records written since the last update
+	flush_logs()
+	try:
+		update_rollups(LOG_FILE)
+	except:
+		return JsonResponse(REQUEST_FAILED, safe=False)
+
+	#Times use the asctime format of the log queries, cut to the bucket they fall in
+	rollups = LogRollup.objects.filter(period=period)
+	if request.GET.get('from'):
+		rollups = rollups.filter(bucket__gte=request.GET['from'][:TIME_BUCKETS[period]])
+	if request.GET.get('to'):
+		rollups = rollups.filter(bucket__lte=request.GET['to'][:TIME_BUCKETS[period]])
+	for key in ('source', 'log_type', 'action'):
+		if request.GET.get(key) is not None:
+			rollups = rollups.filter(**{key: request.GET[key]})
+	rollups = rollups.order_by('bucket', 'source', 'log_type', 'action')
+
+	#log
+	logger.info('Superadmin:{} accessing log rollups'.format(u.username), extra={'source': u.username, 'log_type': 'access'})
+	return JsonResponse([rollup.serialize() for rollup in rollups], safe=False)
+
+
+#Superadmin reading the per view histograms of every worker in the Prometheus text format
+@login_required(login_url='/login')
+def metrics(request):
+	u = request.user
+
+	#Check if superadmin or not
+	if not u.is_superuser:
+		return JsonResponse(BAD_REQUEST, safe=False)
+
+	try:
+		text = prometheus_text(registry.collect())
+	except:
+		return JsonResponse(REQUEST_FAILED, safe=False)
 
+	#log
+	logger.info('Superadmin:{} accessing metrics'.format(u.username), extra={'source': u.username, 'log_type': 'access'})
+	return HttpResponse(text, content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+#Superadmin listing the stored profiles of requests, newest first
+@login_required(login_url='/login')
+def request_profiles(request):
+	u = request.user
+
+	#Check if superadmin or not
+	if not u.is_superuser:
+		return JsonResponse(BAD_REQUEST, safe=False)
 
+	#log
+	logger.info('Superadmin:{} accessing request profiles'.format(u.username), extra={'source': u.username, 'log_type': 'access'})
+	return JsonResponse(profiles.summaries(), safe=False)
 
 
+#Superadmin downloading the .prof file of a profile, read it with pstats or snakeviz
+@login_required(login_url='/login')
+def request_profile(request, profile_id):
+	u = request.user
 
+	#Check if superadmin or not
+	if not u.is_superuser:
+		return JsonResponse(BAD_REQUEST, safe=False)
 
+	path = profiles.stats_path(profile_id)
+	if path is None:
+		return JsonResponse({"error": "profile not present."})
 
+	#log
+	logger.info('Superadmin:{} downloads request profile {}'.format(u.username, profile_id), extra={'source': u.username, 'log_type': 'access'})
+	return FileResponse(open(path, 'rb'), as_attachment=True, filename='{}.prof'.format(profile_id))